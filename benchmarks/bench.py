@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+"""Miflon görüntü işleme sıcak yollarının arayüzsüz ölçümü.
+
+Tk penceresi açılmaz; arayüz düğmelerinin çağırdığı çekirdek fonksiyonlar
+(pikselleştirme, bulanıklık + yumuşak maske, çoklu bölge, filigran karıştırma,
+ekran önizleme örneklemesi, kaydetme kodlayıcıları) sentetik 2 / 12 / 48 MP
+görüntülerde ölçülür. Her durum için en iyi süre, MP/s ve tracemalloc tepe
+belleği raporlanır; sonuçlar bir temel (baseline) JSON ile karşılaştırılabilir.
+Açılış süresi de ayrı süreçlerde ölçülür: çekirdeğin içe aktarılması, ağır
+kütüphanelerin yüklenmesi ve (ekran varsa) pencerenin ilk çizimi.
+
+benchmarks/baseline.json depoda tutulan başvuru temelidir; süreler makineye
+bağlı olduğundan yerel karşılaştırma için kendi temelinizi alın.
+
+Örnekler:
+    python benchmarks/bench.py --sizes 2,12
+    python benchmarks/bench.py --baseline benchmarks/baseline.json --tolerance 0.15
+    python benchmarks/bench.py --save-baseline baseline.local.json
+    python benchmarks/bench.py --baseline baseline.local.json
+"""
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import subprocess
+import tracemalloc
+
+import cv2
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import miflon_core as m  # noqa: E402
+
+# Megapiksel -> (genişlik, yükseklik); 4:3 fotoğraf oranları
+SIZES = {2: (1632, 1224), 12: (4000, 3000), 48: (8000, 6000)}
+DISPLAY_SIZE = (1600, 900)
+
+# ------------------------------------------------------------------------------
+# Sentetik görüntüler
+# ------------------------------------------------------------------------------
+def synthetic_image(w, h, seed=0):
+    # Yumuşak geçişler + kenarlar + gürültü: JPEG boyutu ve bulanıklık maliyeti gerçekçi kalır
+    rng = np.random.default_rng(seed)
+    yy, xx = np.mgrid[0:h, 0:w].astype(np.float32)
+    img = np.empty((h, w, 3), np.uint8)
+    img[..., 0] = (127 + 127 * np.sin(xx / 97.0)).astype(np.uint8)
+    img[..., 1] = (127 + 127 * np.cos(yy / 71.0)).astype(np.uint8)
+    img[..., 2] = ((xx + yy) * (255.0 / (w + h))).astype(np.uint8)
+    del xx, yy
+    for _ in range(40):
+        x, y = int(rng.integers(0, w)), int(rng.integers(0, h))
+        r = int(rng.integers(h // 40, h // 8))
+        color = tuple(int(c) for c in rng.integers(0, 256, 3))
+        cv2.circle(img, (x, y), r, color, -1, lineType=cv2.LINE_AA)
+    noise = rng.integers(-12, 13, size=(h, w, 3), dtype=np.int16)
+    img = np.clip(img.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+    return img
+
+def region_boxes(w, h, count, rel=0.18, seed=1):
+    # Görüntüye dağılmış, kısmen çakışan bölgeler (x1, y1, x2, y2)
+    rng = np.random.default_rng(seed)
+    bw, bh = int(w * rel), int(h * rel)
+    boxes = []
+    for _ in range(count):
+        x, y = int(rng.integers(0, w - bw)), int(rng.integers(0, h - bh))
+        boxes.append((x, y, x + bw, y + bh))
+    return boxes
+
+def synthetic_logo(path, size=512):
+    # Yarı saydam kenarlı RGBA logo
+    logo = np.zeros((size, size, 4), np.uint8)
+    cv2.circle(logo, (size // 2, size // 2), size // 2 - 8, (40, 160, 240, 255), -1, lineType=cv2.LINE_AA)
+    cv2.putText(logo, "M", (size // 4, 3 * size // 4), cv2.FONT_HERSHEY_SIMPLEX, size / 60, (255, 255, 255, 255), 20)
+    cv2.imwrite(path, logo)
+
+# ------------------------------------------------------------------------------
+# Ölçüm
+# ------------------------------------------------------------------------------
+def measure(func, repeat):
+    # (en iyi süre sn, tracemalloc tepe bayt); ilk çağrı ısınma olarak sayılmaz
+    func()
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - t0)
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+def cases(image, mp, tmpdir):
+    # (ad, çağrılabilir, işlenen piksel) üçlüleri
+    h, w = image.shape[:2]
+    box = region_boxes(w, h, 1, rel=0.3)[0]
+    box_px = (box[2] - box[0]) * (box[3] - box[1])
+    out = []
+
+    for px in (4, 16, 32):
+        out.append((f"pixelate/p{px}", lambda px=px: m.region_effect_patch(
+            image, box, effect_type="pixel", pixel_value=px, selection_type="rectangle", feather=0), box_px))
+
+    for k in (9, 31, 99):
+        for backend in ("gaussian", "box", "pyramid"):
+            out.append((f"blur/k{k}/{backend}", lambda k=k, b=backend: m.region_effect_patch(
+                image, box, effect_type="blur", blur_value=k, selection_type="rectangle",
+                feather=0, blur_backend=b), box_px))
+
+    for feather in (0, 8, 32):
+        out.append((f"blur_mask/oval/f{feather}", lambda f=feather: m.region_effect_patch(
+            image, box, effect_type="blur", blur_value=31, selection_type="oval",
+            feather=f, blur_backend="auto"), box_px))
+
+    for count in (1, 8, 32):
+        regions = [(b, "oval") for b in region_boxes(w, h, count, rel=0.08)]
+        area = sum((b[2] - b[0]) * (b[3] - b[1]) for b, _ in regions)
+        out.append((f"regions/n{count}", lambda r=regions: m.region_set_patches(
+            image, r, effect_type="blur", blur_value=31, feather=8), area))
+
+    logo_path = os.path.join(tmpdir, "logo.png")
+    if not os.path.exists(logo_path):
+        synthetic_logo(logo_path)
+    wm = {"enable_text": True, "text": "Miflon Benchmark", "text_size_percent": 3,
+          "opacity": 40, "enable_logo": True, "logo_path": logo_path, "logo_size_percent": 15}
+    out.append(("watermark/text+logo", lambda: m.watermark_patches(image, wm), w * h))
+
+    dw, dh = DISPLAY_SIZE
+    f = min(dw / w, dh / h)
+    disp = (max(1, int(w * f)), max(1, int(h * f)))
+    out.append(("display/pyramid_build+render", lambda: m.PreviewPyramid(image).render(*disp), w * h))
+    pyramid = m.PreviewPyramid(image)
+    pyramid.render(*disp)
+    out.append(("display/region_update", lambda: (pyramid.update_region(image, box),
+                                                  pyramid.render_region(disp[0], disp[1], box)), box_px))
+
+    for q in (85, 95):
+        out.append((f"encode/jpg_q{q}", lambda q=q: cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, q]), w * h))
+    out.append(("encode/png", lambda: cv2.imencode(".png", image), w * h))
+    target = int(mp * 300 * 1024)
+    out.append((f"encode/jpg_target_{target // 1024}kb", lambda: m.JpegSizeSearch(image).find(target), w * h))
+    return out
+
+def run(sizes, repeat, name_filter, log=print):
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="miflon_bench_") as tmpdir:
+        for mp in sizes:
+            w, h = SIZES[mp]
+            image = synthetic_image(w, h)
+            for name, func, pixels in cases(image, mp, tmpdir):
+                key = f"{mp}MP/{name}"
+                if name_filter and name_filter not in key:
+                    continue
+                best, peak = measure(func, repeat)
+                results[key] = {"seconds": best, "mp_per_s": pixels / 1e6 / best if best > 0 else 0.0,
+                                "peak_bytes": peak}
+                log(f"{key:<40} {best * 1000:9.2f} ms  {results[key]['mp_per_s']:9.1f} MP/s"
+                    f"  tepe {m.format_size(peak):>10}")
+            del image
+    return results
+
+# ------------------------------------------------------------------------------
+# Açılış süresi (her ölçüm yeni bir Python sürecinde)
+# ------------------------------------------------------------------------------
+STARTUP_SNIPPETS = {
+    "startup/import_core": "import miflon_core",
+    "startup/import_core+preload": "import miflon_core; miflon_core.preload()",
+    "startup/import_ui": "import miflon",
+}
+
+def _timed_run(cmd, env=None):
+    t0 = time.perf_counter()
+    proc = subprocess.run(cmd, cwd=ROOT, env=env, capture_output=True, text=True)
+    return time.perf_counter() - t0, proc
+
+def startup(repeat, name_filter, log=print):
+    results = {}
+    base, _ = _timed_run([sys.executable, "-c", "pass"])
+    for _ in range(repeat):
+        base = min(base, _timed_run([sys.executable, "-c", "pass"])[0])
+    for key, code in STARTUP_SNIPPETS.items():
+        if name_filter and name_filter not in key:
+            continue
+        best = float("inf")
+        for _ in range(repeat):
+            elapsed, proc = _timed_run([sys.executable, "-c", code])
+            if proc.returncode != 0:
+                log(f"{key:<40} atlandı: {proc.stderr.strip().splitlines()[-1:]}")
+                break
+            best = min(best, elapsed - base)
+        else:
+            results[key] = {"seconds": best, "mp_per_s": 0.0, "peak_bytes": 0}
+            log(f"{key:<40} {best * 1000:9.2f} ms  (yorumlayıcı açılışı hariç)")
+    # Pencerenin ilk çizimi yalnızca ekran varsa ölçülebilir
+    key = "startup/window"
+    if not name_filter or name_filter in key:
+        env = dict(os.environ, MIFLON_STARTUP_BENCH="1")
+        samples = []
+        for _ in range(repeat):
+            _, proc = _timed_run([sys.executable, os.path.join(ROOT, "miflon.py")], env=env)
+            try:
+                samples.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+            except (ValueError, IndexError):
+                log(f"{key:<40} atlandı (ekran yok)")
+                break
+        if samples:
+            window = min(s["window_ms"] for s in samples) / 1000
+            ready = min(s["ready_ms"] for s in samples) / 1000
+            results[key] = {"seconds": window, "mp_per_s": 0.0, "peak_bytes": 0}
+            results["startup/window+preload"] = {"seconds": ready, "mp_per_s": 0.0, "peak_bytes": 0}
+            log(f"{key:<40} {window * 1000:9.2f} ms  (kütüphaneler hazır: {ready * 1000:.0f} ms)")
+    return results
+
+def environment():
+    return {"python": platform.python_version(), "numpy": np.__version__, "opencv": cv2.__version__,
+            "machine": platform.machine(), "system": platform.system(), "cpus": os.cpu_count()}
+
+def compare(results, baseline, tolerance, log=print):
+    # Süre ya da tepe bellek temelin (1 + tolerans) katını aşan durumların listesi
+    regressions = []
+    log("")
+    log(f"{'durum':<40} {'süre':>9} {'bellek':>9}")
+    for key, cur in results.items():
+        ref = baseline.get("results", {}).get(key)
+        if ref is None:
+            continue
+        dt = cur["seconds"] / ref["seconds"] - 1 if ref["seconds"] > 0 else 0.0
+        dm = cur["peak_bytes"] / ref["peak_bytes"] - 1 if ref["peak_bytes"] > 0 else 0.0
+        flag = ""
+        if dt > tolerance or dm > tolerance:
+            flag = "  << GERİLEME"
+            regressions.append(key)
+        log(f"{key:<40} {dt * 100:+8.1f}% {dm * 100:+8.1f}%{flag}")
+    if baseline.get("environment") != environment():
+        log("Not: temel farklı bir ortamda (Python/numpy/OpenCV/işlemci) alınmış.")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Miflon arayüzsüz performans ölçümü")
+    parser.add_argument("--sizes", default="2,12,48", help="Megapiksel boyutları, ör. 2,12 (varsayılan: 2,12,48)")
+    parser.add_argument("--repeat", type=int, default=3, help="Durum başına tekrar (en iyisi alınır)")
+    parser.add_argument("--filter", default="", help="Yalnızca adında bu metin geçen durumlar, ör. blur")
+    parser.add_argument("--no-startup", action="store_true", help="Açılış süresi ölçümlerini atla")
+    parser.add_argument("--baseline", default=None, help="Karşılaştırılacak temel JSON")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="İzin verilen göreli artış (0.15 = %%15)")
+    parser.add_argument("--save-baseline", default=None, help="Sonuçları bu JSON dosyasına temel olarak yaz")
+    args = parser.parse_args(argv)
+
+    try:
+        sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    except ValueError:
+        parser.error("--sizes tamsayı listesi olmalı")
+    unknown = [s for s in sizes if s not in SIZES]
+    if unknown:
+        parser.error(f"Bilinmeyen boyut: {unknown} (seçenekler: {sorted(SIZES)})")
+
+    results = {}
+    if not args.no_startup:
+        results.update(startup(max(1, args.repeat), args.filter))
+    results.update(run(sizes, max(1, args.repeat), args.filter))
+
+    status = 0
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} durumda gerileme (> %{args.tolerance * 100:.0f}).")
+            status = 1
+        else:
+            print("\nGerileme yok.")
+    if args.save_baseline:
+        m.atomic_write(args.save_baseline, json.dumps(
+            {"environment": environment(), "results": results}, indent=2, ensure_ascii=False).encode("utf-8"))
+        print(f"Temel yazıldı: {args.save_baseline}")
+    return status
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,37 @@
+import time
+_T0 = time.perf_counter()  # Açılış süresi ölçümü için (MIFLON_STARTUP_BENCH)
+
 import tkinter as tk
 from tkinter import filedialog, messagebox, colorchooser, ttk
-from PIL import Image, ImageTk, ImageDraw, ImageFont
-import cv2
-import numpy as np
 import os
-import json
 import re
+import sys
+import copy
+import json
+import functools
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from datetime import datetime
+
+# Çekirdek Tk'dan bağımsızdır; OpenCV/numpy/PIL ilk kullanımda (ya da preload ile) yüklenir
+from miflon_core import (
+    BLUR_BACKENDS, CONFIG, DEFAULT_DETECT_KINDS, DEFAULT_TILED_THRESHOLD_MP, DEFAULT_WM_TEXT,
+    DOWNSCALE_STEPS, MASK_CACHE, OUTPUT_INDEX, PROFILER,
+    EditGraph, EditHistory, ImageDecodeCache, JpegSizeSearch, PreviewPyramid,
+    cli_main, compile_name_template, copy_image, crop_rect, detect_regions,
+    format_size, load_image_preview, load_image_tiled, make_proxy, materialize,
+    output_filename, parse_ratio, profiled, publish_free, recipe_from_ops,
+    region_effect_patch, region_set_patches, run_batch, scale_effect, snapshot,
+    watermark_patches, write_bytes, write_image,
+)
+from miflon_core import lazy_import, preload_async
+
+lazy_import("cv2", globals())
+lazy_import("numpy", globals(), "np")
+lazy_import("PIL.Image", globals())
+lazy_import("PIL.ImageTk", globals())
 
 # Opsiyonel: Drag&Drop
 try:
@@ -16,50 +40,6 @@ try:
 except Exception:
     DND_AVAILABLE = False
 
-# -------------------------------------------------------------
-# Yapılandırma (JSON) yardımcıları
-# -------------------------------------------------------------
-CONFIG_FILE = str(Path.home() / ".miflon_config.json")
-
-def _read_config():
-    try:
-        with open(CONFIG_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception:
-        return {}
-
-def _deep_update(dst, src):
-    for k, v in src.items():
-        if isinstance(v, dict) and isinstance(dst.get(k), dict):
-            _deep_update(dst[k], v)
-        else:
-            dst[k] = v
-
-def _write_config(patch):
-    data = _read_config()
-    _deep_update(data, patch)
-    try:
-        with open(CONFIG_FILE, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=4, ensure_ascii=False)
-    except Exception:
-        pass
-
-# -------------------------------------------------------------
-# Güvenli kırpma oranı parse (eval yerine)
-# -------------------------------------------------------------
-def parse_ratio(value: str):
-    if value == "original":
-        return None
-    try:
-        a, b = value.split(":")
-        a = float(a.strip())
-        b = float(b.strip())
-        if b == 0:
-            return None
-        return a / b
-    except Exception:
-        return None
-
 # -------------------------------------------------------------
 # Drag&Drop dosya listesi ayrıştırma
 # -------------------------------------------------------------
@@ -98,6 +78,16 @@ def center_window(parent, win):
 # KIRPMA DİYALOĞU (Uygula → Görseli günceller)
 # ==============================================================================
 class CropDialog:
+    """Kırpma oranı ve konumu seçimi.
+
+    Karartılmış arka plan ve parlak önizleme açılışta bir kez hazırlanır.
+    Sürüklerken yalnızca parlak pencere Tk içinde kopyalanır ve tuval öğeleri
+    coords() ile taşınır; fare olayları ekran tazeleme aralığında birleştirilir.
+    """
+
+    DIM_ALPHA = 140
+    REFRESH_MS = 16
+
     def __init__(self, parent, cv_image):
         self.top = tk.Toplevel(parent)
         self.top.title("Kırp")
@@ -107,14 +97,15 @@ class CropDialog:
         self.cv_image = cv_image
         self.h, self.w = self.cv_image.shape[:2]
 
-        cfg = _read_config().get("crop", {})
-        self.crop_var = tk.StringVar(value=cfg.get("ratio", "16:9"))
+        self.crop_var = tk.StringVar(value=CONFIG.get_str("crop", "ratio", "16:9"))
 
         self.crop_x_offset_preview = 0
         self.crop_y_offset_preview = 0
         self.dragging = False
         self.last_drag_x = 0
         self.last_drag_y = 0
+        self._redraw_job = None
+        self._window_size = None
 
         main = tk.Frame(self.top, padx=12, pady=12)
         main.pack(expand=True, fill="both")
@@ -140,24 +131,47 @@ class CropDialog:
                   command=self.apply).pack(fill="x", pady=(0,6))
         tk.Button(btns, text="İptal", command=self.top.destroy).pack(fill="x")
 
-        self.canvas = tk.Canvas(right, bg="gray20", cursor="fleur")
+        self.canvas = tk.Canvas(right, bg="gray20", cursor="fleur", highlightthickness=0)
         self.canvas.pack(expand=True, fill="both")
         self.canvas.bind("<ButtonPress-1>", self.start_drag)
         self.canvas.bind("<B1-Motion>", self.on_drag)
         self.canvas.bind("<ButtonRelease-1>", self.stop_drag)
+        self.top.bind("<Destroy>", self._on_destroy, add="+")
 
-        self.result_image = None
+        self.result_rect = None
 
         self._prepare_preview_image()
         self.update_preview()
 
+    @profiled("crop.prepare_preview")
     def _prepare_preview_image(self):
-        preview = cv2.cvtColor(self.cv_image, cv2.COLOR_BGR2RGB)
-        preview = Image.fromarray(preview)
-        preview.thumbnail((800, 550))
-        self.preview_img = preview
-        self.scale_w = self.w / self.preview_img.width if self.preview_img.width > 0 else 1
-        self.scale_h = self.h / self.preview_img.height if self.preview_img.height > 0 else 1
+        # Önizleme küçültmesi ve karartma yalnızca burada yapılır
+        ph, pw = self.h, self.w
+        f = min(1.0, 800 / pw, 550 / ph)
+        pw, ph = max(1, int(pw * f)), max(1, int(ph * f))
+        small = cv2.resize(self.cv_image, (pw, ph), interpolation=cv2.INTER_AREA) if f < 1 else self.cv_image
+        rgb = cv2.cvtColor(small, cv2.COLOR_BGR2RGB)
+        dim = (rgb.astype(np.uint16) * (255 - self.DIM_ALPHA) // 255).astype(np.uint8)
+        self.preview_size = (pw, ph)
+        self.tk_bright = ImageTk.PhotoImage(Image.fromarray(rgb))
+        self.tk_dim = ImageTk.PhotoImage(Image.fromarray(dim))
+        self.tk_window = None
+        self.scale_w = self.w / pw
+        self.scale_h = self.h / ph
+
+        self.canvas.config(width=pw, height=ph)
+        self.canvas.create_image(0, 0, anchor="nw", image=self.tk_dim)
+        self.window_item = self.canvas.create_image(0, 0, anchor="nw")
+        self.frame_item = self.canvas.create_rectangle(0, 0, 0, 0, outline="white")
+
+    def _crop_size(self):
+        pw, ph = self.preview_size
+        ratio = parse_ratio(self.crop_var.get())
+        if ratio is None:
+            return pw, ph
+        if pw / ph > ratio:
+            return max(1, int(ph * ratio)), ph
+        return pw, max(1, int(pw / ratio))
 
     def start_drag(self, e):
         self.dragging = True
@@ -166,73 +180,52 @@ class CropDialog:
     def on_drag(self, e):
         if not self.dragging:
             return
-        ratio = parse_ratio(self.crop_var.get())
-        if ratio is None:
-            return
+        # Konum hemen güncellenir; çizim bir sonraki tazeleme anına ertelenir
+        pw, ph = self.preview_size
+        cw, ch = self._crop_size()
         dx, dy = e.x - self.last_drag_x, e.y - self.last_drag_y
-        pw, ph = self.preview_img.size
-
-        if pw / ph > ratio:
-            crop_h = ph
-            crop_w = int(crop_h * ratio)
-            max_offset_x = pw - crop_w
-            self.crop_x_offset_preview = max(0, min(self.crop_x_offset_preview + dx, max_offset_x))
-        else:
-            crop_w = pw
-            crop_h = int(crop_w / ratio)
-            max_offset_y = ph - crop_h
-            self.crop_y_offset_preview = max(0, min(self.crop_y_offset_preview + dy, max_offset_y))
-
+        self.crop_x_offset_preview = max(0, min(self.crop_x_offset_preview + dx, pw - cw))
+        self.crop_y_offset_preview = max(0, min(self.crop_y_offset_preview + dy, ph - ch))
         self.last_drag_x, self.last_drag_y = e.x, e.y
-        self.update_preview()
+        if self._redraw_job is None:
+            self._redraw_job = self.top.after(self.REFRESH_MS, self.update_preview)
 
     def stop_drag(self, e):
         self.dragging = False
 
-    def update_preview(self):
-        base = self.preview_img.copy()
-        pw, ph = base.size
-        ratio = parse_ratio(self.crop_var.get())
+    def _on_destroy(self, e):
+        if e.widget is self.top and self._redraw_job is not None:
+            self.top.after_cancel(self._redraw_job)
+            self._redraw_job = None
 
-        draw_img = base.convert("RGBA")
-        if ratio is not None:
-            overlay = Image.new("RGBA", (pw, ph), (0, 0, 0, 140))
-            if pw / ph > ratio:
-                crop_h = ph
-                crop_w = int(crop_h * ratio)
-                self.crop_x_offset_preview = max(0, min(self.crop_x_offset_preview, pw - crop_w))
-                x0 = int(self.crop_x_offset_preview)
-                overlay.paste((0,0,0,0), (x0, 0, x0 + crop_w, crop_h))
-            else:
-                crop_w = pw
-                crop_h = int(crop_w / ratio)
-                self.crop_y_offset_preview = max(0, min(self.crop_y_offset_preview, ph - crop_h))
-                y0 = int(self.crop_y_offset_preview)
-                overlay.paste((0,0,0,0), (0, y0, crop_w, y0 + crop_h))
-            draw_img = Image.alpha_composite(draw_img, overlay)
-
-        self.tk_prev = ImageTk.PhotoImage(draw_img.convert("RGB"))
-        self.canvas.delete("all")
-        self.canvas.config(width=pw, height=ph)
-        self.canvas.create_image(0, 0, anchor="nw", image=self.tk_prev)
+    @profiled("crop.update_preview")
+    def update_preview(self):
+        self._redraw_job = None
+        pw, ph = self.preview_size
+        cw, ch = self._crop_size()
+        # Tek eksende kayar; diğer eksendeki ofset sıfırlanır
+        self.crop_x_offset_preview = max(0, min(int(self.crop_x_offset_preview), pw - cw))
+        self.crop_y_offset_preview = max(0, min(int(self.crop_y_offset_preview), ph - ch))
+        x0, y0 = self.crop_x_offset_preview, self.crop_y_offset_preview
+
+        if self._window_size != (cw, ch):
+            self.tk_window = tk.PhotoImage(master=self.canvas, width=cw, height=ch)
+            self.canvas.itemconfig(self.window_item, image=self.tk_window)
+            self._window_size = (cw, ch)
+        # Parlak pencere Tk içinde kopyalanır; Python tarafında piksel işlenmez
+        self.tk_window.tk.call(self.tk_window, "copy", str(self.tk_bright),
+                               "-from", x0, y0, x0 + cw, y0 + ch, "-to", 0, 0)
+        self.canvas.coords(self.window_item, x0, y0)
+        self.canvas.coords(self.frame_item, x0, y0, x0 + cw - 1, y0 + ch - 1)
 
     def apply(self):
+        # Yalnızca kırpma dikdörtgeni döner; tam çözünürlükte kopyalama arka planda yapılır
         ratio = parse_ratio(self.crop_var.get())
-        final = self.cv_image.copy()
-        if ratio is not None:
-            H, W = final.shape[:2]
-            if W / H > ratio:
-                new_h, new_w = H, int(H * ratio)
-            else:
-                new_w, new_h = W, int(W / ratio)
-            crop_x = int(self.crop_x_offset_preview * self.scale_w)
-            crop_y = int(self.crop_y_offset_preview * self.scale_h)
-            crop_x = max(0, min(crop_x, W - new_w))
-            crop_y = max(0, min(crop_y, H - new_h))
-            final = final[crop_y:crop_y+new_h, crop_x:crop_x+new_w]
-
-        _write_config({"crop": {"ratio": self.crop_var.get()}})
-        self.result_image = final
+        self.result_rect = crop_rect(
+            self.w, self.h, ratio,
+            self.crop_x_offset_preview * self.scale_w,
+            self.crop_y_offset_preview * self.scale_h)
+        CONFIG.update({"crop": {"ratio": self.crop_var.get()}})
         self.top.destroy()
 
 # ==============================================================================
@@ -245,11 +238,10 @@ class WatermarkSettingsDialog:
         self.top.transient(parent)
         self.top.grab_set()
 
-        cfg = _read_config()
-        wm = cfg.get("watermark", {})
+        wm = CONFIG.section("watermark")
         self.enable_text = tk.BooleanVar(value=wm.get("enable_text", True))
         self.enable_logo = tk.BooleanVar(value=wm.get("enable_logo", True))
-        self.text = tk.StringVar(value=wm.get("text", "* KVKK gereği bazı yüzler bulanıklaştırılmıştır."))
+        self.text = tk.StringVar(value=wm.get("text", DEFAULT_WM_TEXT))
         self.text_size_percent = tk.IntVar(value=int(wm.get("text_size_percent", 2)))  # %2 varsayılan
         self.opacity = tk.IntVar(value=int(wm.get("opacity", 40)))
         color = wm.get("color", [255, 255, 255])
@@ -303,7 +295,7 @@ class WatermarkSettingsDialog:
         p = filedialog.askopenfilename(filetypes=[("Image Files", "*.png;*.jpg;*.jpeg;*.bmp")])
         if p:
             self.logo_path.set(p)
-            _write_config({"watermark": {"logo_path": p}})  # hemen kaydet
+            CONFIG.update({"watermark": {"logo_path": p}})  # hemen kaydet
 
     def save(self):
         patch = {
@@ -318,7 +310,7 @@ class WatermarkSettingsDialog:
                 "logo_size_percent": int(self.logo_size_percent.get()),
             }
         }
-        _write_config(patch)
+        CONFIG.update(patch)
         self.top.destroy()
 
 # ==============================================================================
@@ -334,7 +326,7 @@ class SaveDialog:
         "{name}_wm_{index:02d}",
     ]
 
-    def __init__(self, parent, cv_image, original_path, batch_pos=None, batch_total=None):
+    def __init__(self, parent, cv_image, original_path, batch_pos=None, batch_total=None, jobs=None):
         self.top = tk.Toplevel(parent)
         self.top.title("Kaydet")
         self.top.transient(parent)
@@ -342,14 +334,24 @@ class SaveDialog:
 
         self.cv_image = cv_image
         self.original_path = original_path
+        self.jobs = jobs
         self.h, self.w = self.cv_image.shape[:2]
 
-        cfg = _read_config().get("save", {})
+        cfg = CONFIG.section("save")
         self.out_folder = tk.StringVar(value=cfg.get("folder", os.path.dirname(original_path) if original_path else str(Path.home())))
         self.format_var = tk.StringVar(value=cfg.get("format", "JPG"))
         self.jpg_quality = tk.IntVar(value=int(cfg.get("jpg_quality", 95)))
         self.template_var = tk.StringVar(value=cfg.get("template", "{name}_{index:03d}"))
         self.index_var = tk.IntVar(value=int(cfg.get("index", 1)))
+        self.target_enabled = tk.BooleanVar(value=bool(cfg.get("target_enabled", False)))
+        self.target_kb = tk.IntVar(value=int(cfg.get("target_kb", 800)))
+        self.allow_downscale = tk.BooleanVar(value=bool(cfg.get("allow_downscale", False)))
+
+        # Hedef boyut araması ve sonucu; kodlanmış denemeler arama nesnesinde saklanır
+        self._search = None
+        self._estimate = None
+        self._estimate_job = None
+        self.scale = 1.0
 
         main = tk.Frame(self.top, padx=12, pady=12)
         main.pack(expand=True, fill="both")
@@ -372,6 +374,19 @@ class SaveDialog:
         self.qscale.pack(side="left", padx=(6,0))
         self.format_var.trace_add("write", lambda *a: self.toggle_quality())
 
+        # Hedef dosya boyutu (JPG): sınırın altında kalan en yüksek kalite aranır
+        f2b = tk.Frame(main)
+        f2b.pack(fill="x", pady=(0,8))
+        self.chk_target = tk.Checkbutton(f2b, text="Hedef boyut (KB):", variable=self.target_enabled,
+                                         command=self.toggle_quality)
+        self.chk_target.pack(side="left")
+        self.spin_target = tk.Spinbox(f2b, from_=10, to=100000, increment=50, textvariable=self.target_kb, width=8)
+        self.spin_target.pack(side="left", padx=(4,12))
+        self.chk_downscale = tk.Checkbutton(f2b, text="Gerekirse küçült", variable=self.allow_downscale)
+        self.chk_downscale.pack(side="left")
+        self.size_lbl = tk.Label(f2b, text="", fg="#555555")
+        self.size_lbl.pack(side="right")
+
         # Şablon
         f3 = tk.LabelFrame(main, text="İsim Şablonu", padx=8, pady=8)
         f3.pack(fill="x", pady=(0,8))
@@ -389,62 +404,116 @@ class SaveDialog:
         bf.pack(fill="x")
         if batch_pos and batch_total:
             tk.Label(bf, text=f"Fotoğraf: {batch_pos}/{batch_total}").pack(side="left", padx=(0,8))
-        tk.Button(bf, text="Kaydet", bg="#4CAF50", fg="white", command=self.save).pack(side="right", padx=5)
-        tk.Button(bf, text="İptal", command=self.top.destroy).pack(side="right")
+        self.btn_save = tk.Button(bf, text="Kaydet", bg="#4CAF50", fg="white", command=self.save)
+        self.btn_save.pack(side="right", padx=5)
+        self.btn_cancel = tk.Button(bf, text="İptal", command=self.top.destroy)
+        self.btn_cancel.pack(side="right")
 
         self.saved = False
+        # Kaydet'e basılınca (etiket, iş) olur; yazma uygulamanın kayıt kuyruğunda yapılır
+        self.save_job = None
         self.toggle_quality()
         self.update_preview()
         self.template_var.trace_add("write", lambda *a: self.update_preview())
         self.index_var.trace_add("write", lambda *a: self.update_preview())
         self.format_var.trace_add("write", lambda *a: self.update_preview())
         self.out_folder.trace_add("write", lambda *a: self.update_preview())
+        for var in (self.format_var, self.jpg_quality, self.target_enabled, self.target_kb, self.allow_downscale):
+            var.trace_add("write", lambda *a: self.schedule_estimate())
+        self.top.bind("<Destroy>", self._on_destroy, add="+")
+        self.schedule_estimate()
         center_window(parent, self.top)
 
     def toggle_quality(self):
-        if self.format_var.get().upper() == "JPG":
-            self.qlab.configure(state="normal")
-            self.qscale.configure(state="normal")
+        jpg = self.format_var.get().upper() == "JPG"
+        target = jpg and self.target_enabled.get()
+        self.qlab.configure(state="normal" if jpg and not target else "disabled")
+        self.qscale.configure(state="normal" if jpg and not target else "disabled")
+        self.chk_target.configure(state="normal" if jpg else "disabled")
+        self.spin_target.configure(state="normal" if target else "disabled")
+        self.chk_downscale.configure(state="normal" if target else "disabled")
+
+    # ----- Boyut tahmini -----
+    def _on_destroy(self, event):
+        if event.widget is self.top and self._estimate_job is not None:
+            self.top.after_cancel(self._estimate_job)
+            self._estimate_job = None
+
+    def search(self):
+        if self._search is None:
+            self._search = JpegSizeSearch(self.cv_image)
+        return self._search
+
+    def estimate_key(self):
+        # Tahmini belirleyen ayarlar; JPG dışı biçimlerde None
+        if self.format_var.get().upper() != "JPG":
+            return None
+        try:
+            if self.target_enabled.get():
+                return ("target", int(self.target_kb.get()), bool(self.allow_downscale.get()))
+            return ("quality", int(self.jpg_quality.get()))
+        except (tk.TclError, ValueError):
+            return None
+
+    @staticmethod
+    def run_search(search, key, cancel=None):
+        # (kalite, ölçek, veri) ya da sınıra sığmıyorsa None
+        if key[0] == "quality":
+            return key[1], 1.0, search.encode(key[1])
+        _, kb, downscale = key
+        return search.find(kb * 1024, scales=DOWNSCALE_STEPS if downscale else (1.0,), cancel=cancel)
+
+    def schedule_estimate(self):
+        # Kaydırıcı sürüklenirken her adımda kodlanmasın diye ertelenir
+        if self._estimate_job is not None:
+            self.top.after_cancel(self._estimate_job)
+        self._estimate_job = self.top.after(300, self.estimate)
+
+    def estimate(self):
+        self._estimate_job = None
+        key = self.estimate_key()
+        if key is None or self.jobs is None:
+            self.size_lbl.config(text="")
+            self.scale = 1.0
+            self.update_preview()
+            return
+        if self._estimate is not None and self._estimate[0] == key:
+            self.show_estimate(*self._estimate)
+            return
+        self.size_lbl.config(text="Boyut hesaplanıyor...", fg="#555555")
+        search = self.search()
+
+        def done(result):
+            self._estimate = (key, result)
+            if self.top.winfo_exists() and key == self.estimate_key():
+                self.show_estimate(key, result)
+
+        def failed(e):
+            if self.top.winfo_exists():
+                self.size_lbl.config(text=f"Boyut hesaplanamadı: {e}", fg="#CC0000")
+
+        self.jobs.submit("Boyut hesaplanıyor", lambda cancel: self.run_search(search, key, cancel), done, failed)
+
+    def show_estimate(self, key, result):
+        if result is None:
+            self.scale = 1.0
+            self.size_lbl.config(text=f"{key[1]} KB sınırına sığmıyor", fg="#CC0000")
         else:
-            self.qlab.configure(state="disabled")
-            self.qscale.configure(state="disabled")
+            quality, self.scale, data = result
+            extra = f", %{int(self.scale * 100)} ölçek" if self.scale != 1.0 else ""
+            self.size_lbl.config(text=f"Tahmini boyut: {format_size(len(data))} (kalite {quality}{extra})", fg="#00AA55")
+        self.update_preview()
+
+    def output_size(self):
+        if self.scale == 1.0:
+            return self.w, self.h
+        return max(1, int(self.w * self.scale)), max(1, int(self.h * self.scale))
 
     def choose_folder(self):
         d = filedialog.askdirectory(parent=self.top,initialdir=self.out_folder.get() or str(Path.home()))
         if d:
             self.out_folder.set(d)
 
-    def _sanitize(self, name: str):
-        # Windows yasak karakterleri temizle
-        return re.sub(r'[\\/:*?"<>|]', '_', name)
-
-    def _render_template(self, tpl, name, index, w, h, ext):
-        # {index} veya {index:03d} gibi
-        def repl(match):
-            token = match.group(1)
-            fmt = match.group(2)
-            if token == "name":
-                return name
-            elif token == "date":
-                return datetime.now().strftime("%Y%m%d")
-            elif token == "time":
-                return datetime.now().strftime("%H%M%S")
-            elif token == "w":
-                return str(w)
-            elif token == "h":
-                return str(h)
-            elif token == "ext":
-                return ext
-            elif token == "index":
-                pad = 0
-                if fmt:
-                    m = re.match(r":0(\d+)d", fmt)
-                    if m:
-                        pad = int(m.group(1))
-                return str(index).zfill(pad) if pad > 0 else str(index)
-            return ""
-        return re.sub(r"\{(name|date|time|w|h|ext|index)(:[^}]*)?\}", repl, tpl)
-
     def update_preview(self):
         folder = self.out_folder.get().strip() or str(Path.home())
         ext = self.format_var.get().lower()
@@ -455,44 +524,336 @@ class SaveDialog:
             idx = int(self.index_var.get())
         except Exception:
             idx = 1
-        filename = self._render_template(self.template_var.get(), name, idx, self.w, self.h, ext)
-        filename = self._sanitize(filename) + f".{ext}"
-        self.preview_path = os.path.join(folder, filename)
-        self.preview_lbl.config(text=f"Örnek: {self.preview_path}")
-
+        out_w, out_h = self.output_size()
+        tpl = compile_name_template(self.template_var.get())
+        make = lambda i: output_filename(tpl, name, i, out_w, out_h, ext)
+        # Klasör dizini bellekte; dolu indeksler atlanır, indekssiz şablonda çakışma bildirilir
+        requested = idx
+        if tpl.uses_index:
+            idx = OUTPUT_INDEX.next_free(folder, make, idx)
+        self.preview_index = idx
+        self.preview_path = os.path.join(folder, make(idx))
+        self.collision = not tpl.uses_index and OUTPUT_INDEX.exists(self.preview_path)
+        text, color = f"Örnek: {self.preview_path}", "#00AA55"
+        if idx != requested:
+            text += f"  (index {requested}-{idx - 1} dolu)"
+        if self.collision:
+            text, color = text + "  — dosya var, üzerine yazılacak", "#CC0000"
+        self.preview_lbl.config(text=text, fg=color)
+
+    @profiled("save.save")
     def save(self):
+        self.update_preview()
+        if self.collision and not messagebox.askyesno(
+                "Dosya Var", f"{os.path.basename(self.preview_path)} zaten var. Üzerine yazılsın mı?", parent=self.top):
+            return
         # Ayarları kalıcı yap
-        _write_config({
+        CONFIG.update({
             "save": {
                 "folder": self.out_folder.get().strip(),
                 "format": self.format_var.get(),
                 "jpg_quality": int(self.jpg_quality.get()),
                 "template": self.template_var.get(),
-                "index": int(self.index_var.get())
+                "index": int(self.index_var.get()),
+                "target_enabled": bool(self.target_enabled.get()),
+                "target_kb": int(self.target_kb.get()),
+                "allow_downscale": bool(self.allow_downscale.get()),
             }
         })
-        # Kaydet
+        # Kaydet (kodlama ve yazma arka planda; pencere bu sırada yanıt verir)
         out_path = self.preview_path
-        os.makedirs(os.path.dirname(out_path), exist_ok=True)
+        image, quality = self.cv_image, int(self.jpg_quality.get())
+        key = self.estimate_key() if self.target_enabled.get() else None
+        cached = self._estimate[1] if self._estimate is not None and self._estimate[0] == key else None
+        search = self.search() if key is not None else None
+        folder, ext = os.path.dirname(out_path), os.path.splitext(out_path)[1]
+        name = os.path.splitext(os.path.basename(self.original_path))[0] if self.original_path else "image"
+        tpl, idx = self.template_var.get(), self.preview_index
+
+        def work(cancel):
+            os.makedirs(folder, exist_ok=True)
+            if key is None:
+                write_image(out_path, materialize(image), quality)
+                return out_path
+            # Hedef boyut: önizlemede bulunan kodlama varsa doğrudan yazılır
+            result = cached or self.run_search(search, key)
+            if result is None:
+                raise IOError(f"{key[1]} KB sınırına sığdırılamadı.")
+            _, scale, data = result
+            h, w = search.scaled(scale).shape[:2]
+            make = lambda i: output_filename(tpl, name, i, w, h, ext[1:])
+            if os.path.normcase(make(idx)) == os.path.normcase(os.path.basename(out_path)):
+                # Önizlemedeki ad: ayrılmış ya da üzerine yazma onaylanmış
+                write_bytes(out_path, data)
+                return out_path
+            # Küçültme {w}/{h} adını değiştirdi; yeni ad ayrılmadığından var olan dosyanın
+            # üzerine yazılmaz: dolu indeksler atlanır, indekssiz şablonda kayıt reddedilir
+            uses_index = compile_name_template(tpl).uses_index
+            start = OUTPUT_INDEX.next_free(folder, make, idx) if uses_index else idx
+            stage = os.path.join(folder, f".miflon_{os.getpid()}_{make(start)}")
+            write_bytes(stage, data)
+            path, _ = publish_free(stage, folder, make, start, uses_index)
+            return path
+
+        # index +1 ve kalıcı; sırada bekleyen kayıtlarla aynı adı almamak için hemen ilerletilir
+        CONFIG.update({"save": {"index": idx + 1}})
+        OUTPUT_INDEX.reserve(out_path)
+        self.save_job = (os.path.basename(out_path), work, out_path)
+        self.saved = True
+        self.top.destroy()
+
+# ==============================================================================
+# ŞABLON: MEVCUT DÜZENLEMELERİ KALAN DOSYALARA UYGULA
+# ==============================================================================
+class TemplateDialog:
+    """Arayüzde yapılan bölge/kırpma/filigran adımlarını tarif olarak gösterir;
+    JSON olarak kaydeder ya da toplu işin kalan dosyalarına süreç havuzunda uygular."""
+
+    POLL_MS = 100
+
+    def __init__(self, parent, recipe, files, original_path=None):
+        self.top = tk.Toplevel(parent)
+        self.top.title("Şablon")
+        self.top.transient(parent)
+        self.top.grab_set()
+
+        self.recipe = recipe
+        self.files = list(files)
+        self.applied = 0
+        self._thread = None
+        self._cancel = threading.Event()
+        self._log = deque()
+        self._progress = (0, len(self.files))
+
+        cfg = CONFIG.section("save")
+        self.save_cfg = cfg
+        self.out_folder = tk.StringVar(value=cfg.get("folder", os.path.dirname(original_path) if original_path else str(Path.home())))
+        self.template_var = tk.StringVar(value=cfg.get("template", "{name}_{index:03d}"))
+        self.index_var = tk.IntVar(value=int(cfg.get("index", 1)))
+
+        main = tk.Frame(self.top, padx=12, pady=12)
+        main.pack(expand=True, fill="both")
+
+        tk.Label(main, text=self.describe(recipe), justify="left", anchor="w").pack(fill="x", pady=(0,8))
+
+        f1 = tk.Frame(main)
+        f1.pack(fill="x", pady=(0,8))
+        tk.Label(f1, text="Kayıt Klasörü:").grid(row=0, column=0, sticky="w")
+        tk.Entry(f1, textvariable=self.out_folder, width=40).grid(row=0, column=1, sticky="ew", padx=(6,6))
+        tk.Button(f1, text="Seç...", command=self.choose_folder).grid(row=0, column=2)
+        tk.Label(f1, text="İsim Şablonu:").grid(row=1, column=0, sticky="w", pady=(6,0))
+        ttk.Combobox(f1, values=SaveDialog.DEFAULT_TEMPLATES, textvariable=self.template_var, width=30).grid(row=1, column=1, sticky="ew", padx=(6,6), pady=(6,0))
+        tk.Label(f1, text="Index başlangıcı:").grid(row=2, column=0, sticky="w", pady=(6,0))
+        tk.Spinbox(f1, from_=1, to=999999, textvariable=self.index_var, width=8).grid(row=2, column=1, sticky="w", padx=(6,0), pady=(6,0))
+        f1.grid_columnconfigure(1, weight=1)
+
+        self.bar = ttk.Progressbar(main, mode="determinate", maximum=max(1, len(self.files)))
+        self.bar.pack(fill="x", pady=(4,4))
+        self.status_lbl = tk.Label(main, text=f"Kalan dosya: {len(self.files)}", anchor="w")
+        self.status_lbl.pack(fill="x")
+        self.log_txt = tk.Text(main, height=8, width=70, state="disabled")
+        self.log_txt.pack(fill="both", expand=True, pady=(4,8))
+
+        bf = tk.Frame(main)
+        bf.pack(fill="x")
+        tk.Button(bf, text="JSON Olarak Kaydet...", command=self.export_json).pack(side="left")
+        self.btn_close = tk.Button(bf, text="Kapat", command=self.close)
+        self.btn_close.pack(side="right")
+        self.btn_run = tk.Button(bf, text=f"Kalan {len(self.files)} Dosyaya Uygula", bg="#4CAF50", fg="white",
+                                 command=self.run, state="normal" if self.files else "disabled")
+        self.btn_run.pack(side="right", padx=5)
+
+        self.top.protocol("WM_DELETE_WINDOW", self.close)
+        center_window(parent, self.top)
+
+    @staticmethod
+    def describe(recipe):
+        parts = [f"Bölge: {len(recipe.get('regions', []))}"]
+        if recipe.get("detect"):
+            parts.append("Otomatik algılama: " + ", ".join(recipe["detect"].get("kinds", [])))
+        crop = recipe.get("crop")
+        if crop:
+            parts.append(f"Kırpma: {crop.get('ratio', 'kutu')}")
+        parts.append("Filigran: " + ("var" if recipe.get("watermark") else "yok"))
+        return "\n".join(parts)
+
+    def choose_folder(self):
+        d = filedialog.askdirectory(parent=self.top, initialdir=self.out_folder.get() or str(Path.home()))
+        if d:
+            self.out_folder.set(d)
+
+    def full_recipe(self):
+        recipe = copy.deepcopy(self.recipe)
+        recipe["save"] = {
+            "format": self.save_cfg.get("format", "JPG"),
+            "jpg_quality": int(self.save_cfg.get("jpg_quality", 95)),
+            "template": self.template_var.get(),
+            "index": int(self.index_var.get()),
+        }
+        return recipe
+
+    def export_json(self):
+        path = filedialog.asksaveasfilename(parent=self.top, defaultextension=".json",
+                                            filetypes=[("Tarif", "*.json")], initialfile="miflon_tarif.json")
+        if not path:
+            return
         try:
-            ext = os.path.splitext(out_path)[1].lower()
-            if ext in (".jpg", ".jpeg"):
-                cv2.imwrite(out_path, self.cv_image, [cv2.IMWRITE_JPEG_QUALITY, int(self.jpg_quality.get())])
-            else:
-                cv2.imwrite(out_path, self.cv_image)
-            # index +1 ve kalıcı
-            new_idx = int(self.index_var.get()) + 1
-            _write_config({"save": {"index": new_idx}})
-            self.saved = True
-            messagebox.showinfo("Kaydedildi", f"Fotoğraf kaydedildi:\n{os.path.normpath(out_path)}", parent=self.top)
-            self.top.destroy()
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(self.full_recipe(), f, ensure_ascii=False, indent=2)
         except Exception as e:
-            messagebox.showerror("Hata", f"Kaydetme hatası: {e}", parent=self.top)
+            messagebox.showerror("Hata", f"Tarif kaydedilemedi: {e}", parent=self.top)
+
+    def append_log(self, lines):
+        self.log_txt.config(state="normal")
+        self.log_txt.insert("end", "\n".join(lines) + "\n")
+        self.log_txt.see("end")
+        self.log_txt.config(state="disabled")
+
+    def run(self):
+        folder = self.out_folder.get().strip()
+        if not folder:
+            messagebox.showerror("Hata", "Kayıt klasörü seçin.", parent=self.top)
+            return
+        recipe = self.full_recipe()
+        CONFIG.update({"save": {"folder": folder, "template": recipe["save"]["template"]}})
+        self.btn_run.config(state="disabled", text="Uygulanıyor...")
+        self.btn_close.config(text="İptal")
+
+        def progress(done, total):
+            self._progress = (done, total)
+
+        def worker():
+            try:
+                self._result = run_batch(self.files, recipe, folder, log=self._log.append,
+                                         progress=progress, cancel=self._cancel)
+            except Exception as e:
+                self._log.append(f"HATA: {e}")
+                self._result = (0, [], None)
+
+        self._result = None
+        self._thread = threading.Thread(target=worker, name="miflon-template", daemon=True)
+        self._thread.start()
+        self.top.after(self.POLL_MS, self._poll)
+
+    def _poll(self):
+        if not self.top.winfo_exists():
+            return
+        lines = []
+        while self._log:
+            lines.append(self._log.popleft())
+        if lines:
+            self.append_log(lines)
+        done, total = self._progress
+        self.bar.config(value=done)
+        self.status_lbl.config(text=f"İşlenen: {done}/{total}")
+        if self._thread.is_alive():
+            self.top.after(self.POLL_MS, self._poll)
+            return
+        # Sayaç gerçekten yazılan son indeksin bir sonrasına ilerler (iptal/hata/çakışma
+        # durumunda dosya sayısı kadar değil)
+        self.applied = done
+        last_index = self._result[2] if self._result else None
+        if last_index is not None:
+            CONFIG.update({"save": {"index": last_index + 1}})
+        self.btn_close.config(text="Kapat")
+        self.status_lbl.config(text=f"Bitti: {done}/{total}")
+
+    def close(self):
+        if self._thread is not None and self._thread.is_alive():
+            # Başlamamış dosyalar iptal edilir; çalışanların bitmesi beklenir
+            self._cancel.set()
+            self.btn_close.config(state="disabled", text="İptal ediliyor...")
+            return
+        self.top.destroy()
+
+# ==============================================================================
+# ARKA PLAN İŞ YÜRÜTÜCÜ (ağır tam çözünürlük işleri arayüzü kilitlemesin)
+# ==============================================================================
+class JobRunner:
+    """Ağır işleri tek bir arka plan iş parçacığında, gönderim sırasıyla çalıştırır.
+
+    İş fonksiyonu func(cancel) arka planda çalışır; sonucu Tk ana döngüsüne
+    root.after ile döner ve on_done(result) ana iş parçacığında çağrılır. Bir
+    işin sonucu işlenmeden sıradaki başlatılmaz, böylece her iş bir öncekinin
+    geçmişe işlenmiş halini görür. İptal edilen işlerin sonucu atılır; çekirdek
+    fonksiyonları cancel'ı döngü adımlarında denetler ve Cancelled ile erken
+    çıkar, böylece iptal edilen iş sıradakini de bekletmez.
+    """
+
+    POLL_MS = 20
+
+    def __init__(self, root, on_state_change=None):
+        self.root = root
+        self.on_state_change = on_state_change
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="miflon-job")
+        self._pending = deque()
+        self._current = None
+
+    @property
+    def busy(self):
+        return self._current is not None or bool(self._pending)
+
+    @property
+    def current_label(self):
+        return self._current[1]["label"] if self._current else ""
+
+    @property
+    def pending_count(self):
+        return len(self._pending)
+
+    def submit(self, label, func, on_done, on_error=None, cancellable=True):
+        job = {"label": label, "func": func, "on_done": on_done, "on_error": on_error,
+               "cancellable": cancellable, "cancel": threading.Event()}
+        self._pending.append(job)
+        self._start_next()
+        return job
+
+    def cancel(self):
+        # Bekleyen işleri at; çalışan iş iptal edilebilirse sonucu atılır
+        self._pending = deque(j for j in self._pending if not j["cancellable"])
+        if self._current and self._current[1]["cancellable"]:
+            self._current[1]["cancel"].set()
+        self._notify()
+
+    def shutdown(self):
+        self.cancel()
+        self._pool.shutdown(wait=False)
+
+    def _notify(self):
+        if self.on_state_change:
+            self.on_state_change()
+
+    def _start_next(self):
+        if self._current is None and self._pending:
+            job = self._pending.popleft()
+            self._current = (self._pool.submit(job["func"], job["cancel"]), job)
+            self.root.after(self.POLL_MS, self._poll)
+        self._notify()
+
+    def _poll(self):
+        future, job = self._current
+        if not future.done():
+            self.root.after(self.POLL_MS, self._poll)
+            return
+        self._current = None
+        if not job["cancel"].is_set():
+            try:
+                result = future.result()
+            except Exception as e:
+                if job["on_error"]:
+                    job["on_error"](e)
+                else:
+                    messagebox.showerror("Hata", f"{job['label']} başarısız: {e}")
+            else:
+                job["on_done"](result)
+        self._start_next()
 
 # ==============================================================================
 # ANA UYGULAMA (ID Photos Pro benzeri adım mantığı + DnD + şablonlu kaydet)
 # ==============================================================================
 class ImageToolApp:
+    PROFILE_OVERLAY_MS = 500
+
     def __init__(self, root):
         self.root = root
         self.root.title("Miflon - Görsel Araç Seti")
@@ -511,6 +872,34 @@ class ImageToolApp:
         self.display_image_w, self.display_image_h = 1, 1
         self.current_path = None
 
+        # Ekran önizleme piramidi ve pencere boyutlandırma erteleme
+        self._pyramid = None
+        self._resize_job = None
+        self._rendered_canvas_size = None
+        self._display_rgb = None
+        self._preview_image = None
+        # Görüntü başka bir kareyle değiştiğinde artar; bekleyen işler buna göre geçersiz sayılır
+        self._image_generation = 0
+
+        # Sürükleme sırasında canlı efekt önizlemesi
+        self._live_rect = None
+        self._live_job = None
+        self._live_item = None
+        self._live_photo = None
+
+        # Çoklu seçim kümesi: görüntü pikselinde {"box", "shape"}; "Tümünü Uygula" ile tek geçişte işlenir
+        self.region_set = []
+        self._drag_region = None
+        self._drag_origin = None
+
+        # Uygulanan işlemlerin kaydı (şablon ve yıkıcı olmayan kayıt için); geri al/yinele ile ilerler
+        self._ops = []
+        self._ops_redo = []
+        # Yıkıcı olmayan düzenlemede tam çözünürlüklü kaynak; cv_image onun vekilidir.
+        # proxy_scale: vekilin bir pikseli kaç kaynak pikseli (efekt değerleri kaynak pikselindedir)
+        self.source_image = None
+        self.proxy_scale = 1.0
+
         # Batch (çoklu dosya)
         self.batch_files = []
         self.batch_index = -1
@@ -533,25 +922,43 @@ class ImageToolApp:
 
         self.btn_open = tk.Button(step, text="1) Fotoğraf Aç", command=self.open_images)
         self.btn_open.pack(side="left", padx=8)
+        self.btn_prev = tk.Button(step, text="◀", command=lambda: self.go_batch(-1), state="disabled")
+        self.btn_prev.pack(side="left")
+        self.btn_next = tk.Button(step, text="▶", command=lambda: self.go_batch(1), state="disabled")
+        self.btn_next.pack(side="left", padx=(2,0))
   
         # Efekt/Seçim (2. adım)
-        fx_cfg = _read_config().get("app", {})
-        self.effect_type = tk.StringVar(value=fx_cfg.get("effect_type", "blur"))
-        self.selection_type = tk.StringVar(value=fx_cfg.get("selection_type", "oval"))
-        self.blur_value = tk.IntVar(value=int(fx_cfg.get("blur_value", 19)))
-        self.pixel_value = tk.IntVar(value=int(fx_cfg.get("pixel_value", 7)))
-        self.feather_value = tk.IntVar(value=int(fx_cfg.get("feather_value", 8)))
+        self.effect_type = tk.StringVar(value=CONFIG.get_str("app", "effect_type", "blur"))
+        self.selection_type = tk.StringVar(value=CONFIG.get_str("app", "selection_type", "oval"))
+        self.blur_value = tk.IntVar(value=CONFIG.get_int("app", "blur_value", 19))
+        self.pixel_value = tk.IntVar(value=CONFIG.get_int("app", "pixel_value", 7))
+        self.feather_value = tk.IntVar(value=CONFIG.get_int("app", "feather_value", 8))
+        self.blur_backend = tk.StringVar(value=CONFIG.get_str("app", "blur_backend", "auto"))
+        self.multi_select = tk.BooleanVar(value=CONFIG.get_bool("app", "multi_select", False))
+        # Yıkıcı olmayan düzenleme: işlemler vekilde gösterilir, tam çözünürlük kaydederken işlenir
+        self.lazy_edits = tk.BooleanVar(value=CONFIG.get_bool("app", "lazy_edits", False))
+        self.proxy_max_side = CONFIG.get_int("app", "proxy_max_side", 2048)
 
         fx = tk.LabelFrame(step, text="2) Bulanıklaştırma/Piksel", padx=6, pady=4)
         fx.pack(side="left", padx=6)
         tk.Radiobutton(fx, text="Blur", variable=self.effect_type, value="blur").pack(side="left")
         tk.Radiobutton(fx, text="Pixel", variable=self.effect_type, value="pixel").pack(side="left")
         tk.Scale(fx, from_=3, to=99, orient="horizontal", label="Blur", resolution=2, length=120, variable=self.blur_value).pack(side="left", padx=4)
+        ttk.Combobox(fx, textvariable=self.blur_backend, values=BLUR_BACKENDS, width=8, state="readonly").pack(side="left", padx=(0,4))
         tk.Scale(fx, from_=2, to=50, orient="horizontal", label="Pixel", length=120, variable=self.pixel_value).pack(side="left", padx=4)
         tk.Label(fx, text="Seçim:").pack(side="left", padx=(6,0))
         tk.Radiobutton(fx, text="Kare", variable=self.selection_type, value="rectangle").pack(side="left")
         tk.Radiobutton(fx, text="Oval", variable=self.selection_type, value="oval").pack(side="left")
         tk.Scale(fx, from_=0, to=50, orient="horizontal", label="Kenar Yumuşatma", length=140, variable=self.feather_value).pack(side="left", padx=4)
+        multi = tk.Frame(fx)
+        multi.pack(side="left", padx=(6,0))
+        tk.Checkbutton(multi, text="Çoklu seçim", variable=self.multi_select).pack(anchor="w")
+        self.btn_apply_regions = tk.Button(multi, text="Tümünü Uygula", command=self.apply_region_set, state="disabled")
+        self.btn_apply_regions.pack(side="left")
+        self.btn_clear_regions = tk.Button(multi, text="Temizle", command=self.clear_region_set, state="disabled")
+        self.btn_clear_regions.pack(side="left", padx=(2,0))
+        self.btn_detect = tk.Button(multi, text="Yüz/Plaka Bul", command=self.auto_detect, state="disabled")
+        self.btn_detect.pack(side="left", padx=(2,0))
 
         # 3) Kırp
         self.btn_crop = tk.Button(step, text="3) Kırp...", command=self.open_crop, state="disabled")
@@ -562,45 +969,158 @@ class ImageToolApp:
         self.btn_wm_settings.pack(side="left", padx=4)
         self.btn_apply_wm = tk.Button(step, text="Filigran ve Logo Ekle", command=self.apply_wm_logo_now, state="disabled")
         self.btn_apply_wm.pack(side="left", padx=4)
+        self.btn_template = tk.Button(step, text="Şablon...", command=self.open_template, state="disabled")
+        self.btn_template.pack(side="left", padx=4)
 
         # 5) Kaydet
         self.btn_save = tk.Button(step, text="5) Kaydet...", command=self.save_current, state="disabled")
         self.btn_save.pack(side="left", padx=8)
 
-        # Sağ: geri al
+        # Sağ: geri al / yinele
         right = tk.Frame(step)
         right.pack(side="right", padx=8)
-        self.btn_undo = tk.Button(right, text="Geri Al (Ctrl+Z)", command=self.undo, state="disabled")
-        self.btn_undo.pack()
 
-        # Undo
-        self.history, self.current_step = [], -1
-        self.max_history = 20
+        # Meşgul göstergesi (arka plan işleri)
+        busy = tk.Frame(step)
+        busy.pack(side="right", padx=8)
+        self.save_lbl = tk.Label(busy, text="", fg="#00AA55", cursor="hand2")
+        self.save_lbl.pack(side="left", padx=(0,8))
+        self.save_lbl.bind("<Button-1>", self.show_save_failures)
+        self.busy_lbl = tk.Label(busy, text="", fg="#CC6600")
+        self.busy_lbl.pack(side="left")
+        self.busy_bar = ttk.Progressbar(busy, mode="indeterminate", length=80)
+        self.btn_cancel_job = tk.Button(busy, text="İptal (Esc)", command=self.cancel_jobs)
+        tk.Checkbutton(right, text="Kaydederken işle", variable=self.lazy_edits).pack(side="left", padx=(0,8))
+        self.btn_undo = tk.Button(right, text="Geri Al (Ctrl+Z)", command=self.undo, state="disabled")
+        self.btn_undo.pack(side="left")
+        self.btn_redo = tk.Button(right, text="Yinele (Ctrl+Y)", command=self.redo, state="disabled")
+        self.btn_redo.pack(side="left", padx=(4,0))
+
+        # Undo/Redo (bellek bütçesi MB cinsinden)
+        MASK_CACHE.budget_bytes = CONFIG.get_int("app", "mask_cache_mb", 32) * 1024 * 1024
+        budget_mb = CONFIG.get_int("app", "history_budget_mb", 512)
+        self.history = EditHistory(budget_mb * 1024 * 1024)
+        self.jobs = JobRunner(root, on_state_change=self.on_jobs_changed)
+        # Kayıtlar ayrı kuyrukta yazılır; kodlama süresi sıradaki fotoğrafla çalışırken geçer
+        self.saver = JobRunner(root, on_state_change=self.on_jobs_changed)
+        self.save_failures = []
+
+        # Toplu işte sıradaki dosyaları önceden çöz
+        self.prefetch_count = CONFIG.get_int("app", "prefetch_count", 2)
+        # Bu kadar megapikselin üzerindeki görüntüler diske eşlenmiş döşemeli olarak tutulur
+        self.tiled_threshold_mp = CONFIG.get_int("app", "tiled_threshold_mp", DEFAULT_TILED_THRESHOLD_MP)
+        self.decoder = ImageDecodeCache(CONFIG.get_int("app", "decode_cache_mb", 1024) * 1024 * 1024,
+                                        loader=functools.partial(load_image_tiled, threshold_mp=self.tiled_threshold_mp))
 
         # Olaylar
         self.canvas.bind("<ButtonPress-1>", self.on_button_press)
         self.canvas.bind("<B1-Motion>", self.on_mouse_drag)
         self.canvas.bind("<ButtonRelease-1>", self.on_button_release)
+        self.canvas.bind("<Double-Button-1>", self.on_region_double_click)
+        self.canvas.bind("<Button-3>", self.on_region_right_click)
         self.root.bind('<Configure>', self.on_window_resize)
         self.root.bind('<Control-z>', self.undo)
+        self.root.bind('<Control-y>', self.redo)
+        self.root.bind('<Control-Shift-Z>', self.redo)
+        self.root.bind('<Escape>', self.cancel_jobs)
+        self.root.bind('<Return>', self.apply_region_set)
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
 
+        # Profil açıksa F12 izi kaydeder; tuvalin köşesinde son işlemlerin süreleri gösterilir
+        if PROFILER is not None:
+            self.root.bind('<F12>', self.export_trace)
+            if CONFIG.get_bool("profile", "overlay", True):
+                self.root.after(self.PROFILE_OVERLAY_MS, self.draw_profile_overlay)
+
     # ----- Genel ayarlar kaydet -----
     def save_app_settings(self):
-        _write_config({
+        # Yalnızca bellekteki depoyu günceller; diske yazma gecikmeli ve topludur
+        CONFIG.update({
             "app": {
                 "effect_type": self.effect_type.get(),
                 "selection_type": self.selection_type.get(),
                 "blur_value": int(self.blur_value.get()),
                 "pixel_value": int(self.pixel_value.get()),
                 "feather_value": int(self.feather_value.get()),
+                "blur_backend": self.blur_backend.get(),
+                "multi_select": bool(self.multi_select.get()),
+                "lazy_edits": bool(self.lazy_edits.get()),
             }
         })
 
     def on_closing(self):
+        if self.saver.busy:
+            # Sıradaki kayıtlar bitmeden çıkılmaz
+            self.save_lbl.config(text=f"Kayıtlar tamamlanıyor ({self.saver.pending_count + 1})...", fg="#CC6600")
+            self.root.after(100, self.on_closing)
+            return
         self.save_app_settings()
+        CONFIG.flush()
+        self.jobs.shutdown()
+        self.saver.shutdown()
+        self.decoder.shutdown()
         self.root.destroy()
 
+    # ----- Profil -----
+    def export_trace(self, event=None):
+        try:
+            path = PROFILER.export()
+        except Exception as e:
+            messagebox.showerror("Profil", f"İz kaydedilemedi: {e}")
+            return
+        messagebox.showinfo("Profil", f"İz kaydedildi ({len(PROFILER.events)} olay):\n{path}\n\n"
+                                      "chrome://tracing ya da ui.perfetto.dev ile açılabilir.")
+
+    def draw_profile_overlay(self):
+        # Tuval her çizimde temizlendiğinden katman periyodik olarak yeniden çizilir
+        self.canvas.delete("profile")
+        lines = []
+        for ev in PROFILER.recent(8):
+            a = ev["args"]
+            size = f" {a['w']}x{a['h']}" if "w" in a else ""
+            mem = f" {format_size(a['alloc_peak'])}" if "alloc_peak" in a else ""
+            lines.append(f"{ev['dur'] / 1000:8.1f} ms  {ev['name']}{size}{mem}")
+        if lines:
+            text = self.canvas.create_text(10, 10, anchor="nw", text="\n".join(lines), fill="#FFE066",
+                                           font=("Courier", 9), tags="profile")
+            x1, y1, x2, y2 = self.canvas.bbox(text)
+            bg = self.canvas.create_rectangle(x1 - 4, y1 - 4, x2 + 4, y2 + 4, fill="black",
+                                              outline="", stipple="gray50", tags="profile")
+            self.canvas.tag_lower(bg, text)
+        self.root.after(self.PROFILE_OVERLAY_MS, self.draw_profile_overlay)
+
+    # ----- Arka plan işleri -----
+    def on_jobs_changed(self):
+        if self.saver.busy:
+            self.save_lbl.config(text=f"Kaydediliyor ({self.saver.pending_count + 1})...", fg="#CC6600")
+        busy = self.jobs.busy
+        if busy:
+            extra = f" (+{self.jobs.pending_count} sırada)" if self.jobs.pending_count else ""
+            self.busy_lbl.config(text=f"{self.jobs.current_label}...{extra}")
+            if not self.busy_bar.winfo_ismapped():
+                self.busy_bar.pack(side="left", padx=4)
+                self.btn_cancel_job.pack(side="left")
+                self.busy_bar.start(15)
+        else:
+            self.busy_lbl.config(text="")
+            self.busy_bar.stop()
+            self.busy_bar.pack_forget()
+            self.btn_cancel_job.pack_forget()
+        # İş sürerken yalnızca yeni seçimler sıraya alınabilir
+        state = "disabled" if busy or self.cv_image is None else "normal"
+        for btn in (self.btn_crop, self.btn_apply_wm, self.btn_save):
+            btn.config(state=state)
+        self.btn_open.config(state="disabled" if busy else "normal")
+        self.update_batch_buttons()
+        if busy:
+            self.btn_undo.config(state="disabled")
+            self.btn_redo.config(state="disabled")
+        else:
+            self.update_history_buttons()
+
+    def cancel_jobs(self, event=None):
+        self.jobs.cancel()
+
     # ----- Drag & Drop -----
     def on_drop_files(self, event):
         paths = parse_dnd_paths(event.data)
@@ -619,70 +1139,174 @@ class ImageToolApp:
         self.batch_index = 0
         self.load_image_from_path(self.batch_files[self.batch_index])
 
+    @profiled("app.load_image_from_path")
     def load_image_from_path(self, filepath):
+        self.jobs.cancel()
+        cached = self.decoder.peek(filepath)
+        if cached is not None:
+            self._show_loaded_image(filepath, cached)
+            return
+        # Önce küçültülmüş önizleme hemen gösterilir, tam çözünürlük arka planda gelir
         try:
-            pil_image = Image.open(filepath)
-            if pil_image.mode == 'RGBA':
-                self.cv_image = cv2.cvtColor(np.array(pil_image), cv2.COLOR_RGBA2BGR)
-            else:
-                self.cv_image = cv2.cvtColor(np.array(pil_image.convert('RGB')), cv2.COLOR_RGB2BGR)
-            self.current_path = filepath
-
-            self.update_window_title(filepath)
-            self.history = []
-            self.current_step = -1
-            self.add_to_history(self.cv_image)
-            self.update_display_image()
-
-            # Adım butonlarını aktif et
-            self.btn_crop.config(state="normal")
-            self.btn_wm_settings.config(state="normal")
-            self.btn_apply_wm.config(state="normal")
-            self.btn_save.config(state="normal")
-            self.btn_undo.config(state="disabled")
+            max_side = max(self.root.winfo_screenwidth(), self.root.winfo_screenheight())
+            preview = load_image_preview(filepath, max_side)
         except Exception as e:
             messagebox.showerror("Hata", f"Resim açılırken hata oluştu: {str(e)}")
+            return
+        self.cv_image = None
+        self.source_image = None
+        self.proxy_scale = 1.0
+        self._image_generation += 1
+        self._preview_image = preview
+        self.current_path = filepath
+        self.update_window_title(filepath)
+        self.history.clear()
+        self.clear_ops()
+        self.clear_region_set()
+        self.update_display_image()
+
+        def done(image):
+            if self.current_path == filepath:
+                self._show_loaded_image(filepath, image)
+
+        self.jobs.submit("Yükleniyor", lambda cancel: self.decoder.get(filepath), done,
+                         lambda e: self._on_load_failed(filepath, e))
+
+    def _on_load_failed(self, filepath, error):
+        # Yalnızca bu dosyanın önizlemesi kaldırılır; toplu iş listesi ve konumu korunur,
+        # kullanıcı bozuk dosyayı geçip sıradakine ilerleyebilir
+        if self.current_path == filepath:
+            self.clear_image()
+        messagebox.showerror("Hata", f"Resim açılırken hata oluştu: {str(error)}")
+
+    @profiled("app.show_loaded_image")
+    def _show_loaded_image(self, filepath, image):
+        # Önbellekteki dizi salt okunurdur; ilk yerinde düzenlemede kopyalanır.
+        # "Kaydederken işle" açıksa düzenlemeler küçük vekilde yapılır (görüntü açılırken seçilir).
+        self.source_image = None
+        self.proxy_scale = 1.0
+        if self.lazy_edits.get():
+            proxy = make_proxy(image, self.proxy_max_side)
+            if proxy is not image:
+                self.source_image = image
+                self.proxy_scale = image.shape[1] / proxy.shape[1]
+                image = proxy
+        self.cv_image = image
+        self._image_generation += 1
+        self._preview_image = None
+        self.current_path = filepath
+        self.prefetch_batch()
+
+        self.update_window_title(filepath)
+        self.history.clear()
+        self.clear_ops()
+        self.clear_region_set()
+        self.update_display_image()
+
+        # Adım butonlarını aktif et
+        self.btn_crop.config(state="normal")
+        self.btn_detect.config(state="normal")
+        self.btn_wm_settings.config(state="normal")
+        self.btn_apply_wm.config(state="normal")
+        self.btn_template.config(state="normal")
+        self.btn_save.config(state="normal")
+        self.update_history_buttons()
+        self.update_batch_buttons()
+
+    def prefetch_batch(self):
+        # Sıradaki N dosya ve geri dönüş için bir önceki önbelleğe alınır
+        if not self.batch_files or self.prefetch_count <= 0:
+            return
+        nxt = self.batch_files[self.batch_index + 1:self.batch_index + 1 + self.prefetch_count]
+        prev = self.batch_files[self.batch_index - 1:self.batch_index] if self.batch_index > 0 else []
+        self.decoder.prefetch(nxt + prev)
+
+    def update_batch_buttons(self):
+        idle = not self.jobs.busy
+        has_prev = idle and self.batch_index > 0
+        has_next = idle and 0 <= self.batch_index < len(self.batch_files) - 1
+        self.btn_prev.config(state="normal" if has_prev else "disabled")
+        self.btn_next.config(state="normal" if has_next else "disabled")
+
+    def go_batch(self, delta):
+        target = self.batch_index + delta
+        if self.jobs.busy or not (0 <= target < len(self.batch_files)):
+            return
+        if self.history.can_undo and not messagebox.askyesno(
+                "Kaydedilmemiş Değişiklikler", "Bu fotoğraftaki değişiklikler kaydedilmedi. Devam edilsin mi?"):
+            return
+        self.batch_index = target
+        self.load_image_from_path(self.batch_files[self.batch_index])
 
     def after_save_flow(self):
+        # Kayıt arka planda sürerken sıradaki fotoğraf hemen açılır; sonuç durum satırında görünür
         if self.batch_files and 0 <= self.batch_index < len(self.batch_files) - 1:
             self.batch_index += 1
             self.load_image_from_path(self.batch_files[self.batch_index])
-            messagebox.showinfo("Sıradaki Fotoğraf", f"Kaydedildi. ({self.batch_index + 1}/{len(self.batch_files)}) sıradaki fotoğraf yüklendi.")
         else:
             self.reset_to_initial_state()
-            messagebox.showinfo("Bitti", "Kaydetme tamamlandı. Yeni bir fotoğraf açabilirsiniz.")
 
     def reset_to_initial_state(self):
+        self.clear_image()
+        self.batch_files = []
+        self.batch_index = -1
+        self.update_batch_buttons()
+
+    def clear_image(self):
+        # Görüntüye bağlı tüm durum; toplu iş listesine dokunulmaz
         self.cv_image = None
+        self.source_image = None
+        self.proxy_scale = 1.0
+        self._image_generation += 1
+        self._preview_image = None
+        self._pyramid = None
+        self._display_rgb = None
+        self._clear_live_preview()
         self.current_path = None
-        self.history, self.current_step = [], -1
+        self.history.clear()
+        self.clear_ops()
+        self.clear_region_set()
         self.canvas.delete("all")
         self.update_window_title(None)
         self.btn_crop.config(state="disabled")
+        self.btn_detect.config(state="disabled")
         self.btn_wm_settings.config(state="disabled")
         self.btn_apply_wm.config(state="disabled")
+        self.btn_template.config(state="disabled")
         self.btn_save.config(state="disabled")
-        self.btn_undo.config(state="disabled")
-        self.batch_files = []
-        self.batch_index = -1
+        self.update_history_buttons()
 
     # ----- Undo -----
-    def add_to_history(self, image_state):
-        if self.current_step < len(self.history) - 1:
-            self.history = self.history[:self.current_step + 1]
-        self.history.append(image_state.copy())
-        if len(self.history) > self.max_history:
-            self.history.pop(0)
-        self.current_step = len(self.history) - 1
-        self.btn_undo.config(state="normal")
+    def update_history_buttons(self):
+        self.btn_undo.config(state="normal" if self.history.can_undo else "disabled")
+        self.btn_redo.config(state="normal" if self.history.can_redo else "disabled")
 
+    @profiled("app.undo")
     def undo(self, event=None):
-        if self.current_step > 0:
-            self.current_step -= 1
-            self.cv_image = self.history[self.current_step].copy()
+        if self.cv_image is not None and self.history.can_undo and not self.jobs.busy:
+            if self._ops:
+                self._ops_redo.append(self._ops.pop())
+            self._show_history_step(*self.history.undo(self.cv_image))
+
+    @profiled("app.redo")
+    def redo(self, event=None):
+        if self.cv_image is not None and self.history.can_redo and not self.jobs.busy:
+            if self._ops_redo:
+                self._ops.append(self._ops_redo.pop())
+            self._show_history_step(*self.history.redo(self.cv_image))
+
+    def _show_history_step(self, image, boxes):
+        if image is not self.cv_image:
+            self._image_generation += 1
+            # Kare değişti (ör. kırpma geri alındı); kümedeki koordinatlar artık geçersiz
+            self.clear_region_set()
+        self.cv_image = image
+        if boxes is not None:
+            for box in boxes:
+                self.refresh_display_region(box)
+        else:
             self.update_display_image()
-            if self.current_step == 0:
-                self.btn_undo.config(state="disabled")
+        self.update_history_buttons()
 
     # ----- UI yardımcıları -----
     def update_window_title(self, filepath=None):
@@ -693,20 +1317,35 @@ class ImageToolApp:
             self.root.title(base_title)
 
     def on_window_resize(self, event=None):
-        if self.cv_image is not None:
+        # <Configure> sürükleme boyunca art arda gelir; yalnızca son boyut çizilir
+        if self.cv_image is None and self._preview_image is None:
+            return
+        if self._resize_job is not None:
+            self.root.after_cancel(self._resize_job)
+        self._resize_job = self.root.after(80, self._on_resize_settled)
+
+    def _on_resize_settled(self):
+        self._resize_job = None
+        size = (self.canvas.winfo_width(), self.canvas.winfo_height())
+        if size != self._rendered_canvas_size:
             self.update_display_image()
 
+    @profiled("app.update_display_image")
     def update_display_image(self):
-        if self.cv_image is None:
+        # Tam çözünürlük henüz yüklenmediyse küçültülmüş önizleme gösterilir
+        source = self.cv_image if self.cv_image is not None else self._preview_image
+        if source is None:
             return
-        image_rgb = cv2.cvtColor(self.cv_image, cv2.COLOR_BGR2RGB)
-        pil_image = Image.fromarray(image_rgb)
-
         canvas_width, canvas_height = self.canvas.winfo_width(), self.canvas.winfo_height()
         if canvas_width < 10 or canvas_height < 10:
             return
 
-        img_ratio = pil_image.width / pil_image.height if pil_image.height > 0 else 1
+        # Piramit her görüntü durumu için bir kez kurulur
+        if self._pyramid is None or self._pyramid.source is not source:
+            self._pyramid = PreviewPyramid(source)
+
+        img_h, img_w = source.shape[:2]
+        img_ratio = img_w / img_h if img_h > 0 else 1
         canvas_ratio = canvas_width / canvas_height if canvas_height > 0 else 1
 
         if img_ratio > canvas_ratio:
@@ -716,56 +1355,140 @@ class ImageToolApp:
             new_height = max(1, canvas_height - 10)
             new_width = max(1, int(new_height * img_ratio))
 
-        resized_pil_image = pil_image.resize((new_width, new_height), Image.Resampling.LANCZOS)
+        self._display_rgb = self._pyramid.render(new_width, new_height)
+        resized_pil_image = Image.fromarray(self._display_rgb)
 
         self.display_image_w, self.display_image_h = resized_pil_image.size
         self.tk_image = ImageTk.PhotoImage(resized_pil_image)
+        self._rendered_canvas_size = (canvas_width, canvas_height)
 
         self.canvas.delete("all")
+        self._live_item = None
         self.image_offset_x = (canvas_width - self.display_image_w) // 2
         self.image_offset_y = (canvas_height - self.display_image_h) // 2
         self.canvas.create_image(self.image_offset_x, self.image_offset_y, anchor="nw", image=self.tk_image)
+        self.draw_region_set()
+
+    @profiled("app.refresh_display_region")
+    def refresh_display_region(self, box):
+        # Yalnızca değişen dikdörtgeni yeniden örnekleyip ekrandaki fotoğrafa yamar
+        if (self._pyramid is None or self.tk_image is None
+                or self._pyramid.source.shape != self.cv_image.shape):
+            self.update_display_image()
+            return
+        self._pyramid.update_region(self.cv_image, box)
+        region = self._pyramid.render_region(self.display_image_w, self.display_image_h, box)
+        if region is None:
+            return
+        dx, dy, patch = region
+        self._display_rgb[dy:dy + patch.shape[0], dx:dx + patch.shape[1]] = patch
+        patch_photo = ImageTk.PhotoImage(Image.fromarray(patch))
+        self.canvas.tk.call(str(self.tk_image), "copy", str(patch_photo), "-to", dx, dy)
 
     # ----- Seçim ve efekt (2. adım) -----
     def on_button_press(self, event):
         self.start_x = self.canvas.canvasx(event.x)
         self.start_y = self.canvas.canvasy(event.y)
+        # Çoklu seçimde var olan bir bölgeye basılırsa bölge taşınır
+        self._drag_region = self.region_at(self.start_x, self.start_y) if self.multi_select.get() else None
+        self._drag_origin = (self.start_x, self.start_y)
+        if self._drag_region is not None:
+            return
         if self.selection_rect:
             self.canvas.delete(self.selection_rect)
+        self._clear_live_preview()
 
     def on_mouse_drag(self, event):
         if self.cv_image is None:
             return
         cur_x, cur_y = self.canvas.canvasx(event.x), self.canvas.canvasy(event.y)
+        if self._drag_region is not None:
+            # Yalnızca tuval öğesi kaydırılır; görüntü koordinatları bırakınca güncellenir
+            ox, oy = self._drag_origin
+            self.canvas.move(self._drag_region["item"], cur_x - ox, cur_y - oy)
+            self._drag_origin = (cur_x, cur_y)
+            return
         if self.selection_rect:
             self.canvas.delete(self.selection_rect)
         shape_method = self.canvas.create_oval if self.selection_type.get() == "oval" else self.canvas.create_rectangle
         self.selection_rect = shape_method(self.start_x, self.start_y, cur_x, cur_y, outline='red', width=2)
+        # Hareket olayları birleştirilir; önizleme boşta kalındığında bir kez çizilir
+        self._live_rect = (self.start_x, self.start_y, cur_x, cur_y)
+        if self._live_job is None:
+            self._live_job = self.root.after_idle(self._render_live_preview)
+
+    def _render_live_preview(self):
+        # Efekti tam çözünürlük yerine ekrandaki küçültülmüş görüntüye uygular
+        self._live_job = None
+        if self._live_rect is None or self._display_rgb is None or self.cv_image is None:
+            return
+        sx, sy, ex, ey = self._live_rect
+        x1, y1 = max(0, int(min(sx, ex) - self.image_offset_x)), max(0, int(min(sy, ey) - self.image_offset_y))
+        x2 = min(self.display_image_w, int(max(sx, ex) - self.image_offset_x))
+        y2 = min(self.display_image_h, int(max(sy, ey) - self.image_offset_y))
+        if (x2 - x1) < 3 or (y2 - y1) < 3:
+            if self._live_item is not None:
+                self.canvas.itemconfig(self._live_item, state="hidden")
+            return
+
+        scale = self.display_image_w / (self.cv_image.shape[1] * self.proxy_scale)
+        roi = region_effect_patch(
+            self._display_rgb, (x1, y1, x2, y2),
+            effect_type=self.effect_type.get(),
+            blur_value=max(1, int(round(int(self.blur_value.get()) * scale))),
+            pixel_value=max(1, int(round(int(self.pixel_value.get()) * scale))),
+            selection_type=self.selection_type.get(),
+            feather=int(round(int(self.feather_value.get()) * scale)),
+            blur_backend=self.blur_backend.get(),
+            cache_mask=False)
+
+        self._live_photo = ImageTk.PhotoImage(Image.fromarray(roi))
+        pos = (self.image_offset_x + x1, self.image_offset_y + y1)
+        if self._live_item is None:
+            self._live_item = self.canvas.create_image(*pos, anchor="nw", image=self._live_photo)
+        else:
+            self.canvas.itemconfig(self._live_item, image=self._live_photo, state="normal")
+            self.canvas.coords(self._live_item, *pos)
+        if self.selection_rect:
+            self.canvas.tag_raise(self.selection_rect)
+
+    def _clear_live_preview(self):
+        if self._live_job is not None:
+            self.root.after_cancel(self._live_job)
+            self._live_job = None
+        if self._live_item is not None:
+            self.canvas.delete(self._live_item)
+            self._live_item = None
+        self._live_rect = None
+        self._live_photo = None
 
     def on_button_release(self, event):
         if self.cv_image is not None and self.start_x is not None:
             end_x, end_y = self.canvas.canvasx(event.x), self.canvas.canvasy(event.y)
+            if self._drag_region is not None:
+                self.move_region(self._drag_region, end_x - self.start_x, end_y - self.start_y)
+                self._drag_region = None
+                self.start_x, self.start_y = None, None
+                return
             if self.selection_rect:
                 self.canvas.delete(self.selection_rect)
                 self.selection_rect = None
-            self.apply_effect_to_selection(self.start_x, self.start_y, end_x, end_y)
+            self._clear_live_preview()
+            if self.multi_select.get():
+                self.add_region(self.start_x, self.start_y, end_x, end_y)
+            else:
+                self.apply_effect_to_selection(self.start_x, self.start_y, end_x, end_y)
             self.start_x, self.start_y = None, None
             self.save_app_settings()
 
-    def apply_pixelate(self, img, pixel_size):
-        h, w = img.shape[:2]
-        if w < pixel_size or h < pixel_size or pixel_size <= 0:
-            return img
-        small = cv2.resize(img, (max(1, w // pixel_size), max(1, h // pixel_size)), interpolation=cv2.INTER_AREA)
-        return cv2.resize(small, (w, h), interpolation=cv2.INTER_NEAREST)
-
-    def apply_effect_to_selection(self, start_x, start_y, end_x, end_y):
+    def canvas_to_image_box(self, start_x, start_y, end_x, end_y):
+        # Tuval koordinatlarındaki sürüklemeyi görüntü pikseline çevirir; çok küçükse None
         x1, y1 = min(start_x, end_x) - self.image_offset_x, min(start_y, end_y) - self.image_offset_y
         x2, y2 = max(start_x, end_x) - self.image_offset_x, max(start_y, end_y) - self.image_offset_y
         x1, y1 = max(0, int(x1)), max(0, int(y1))
         x2, y2 = min(self.display_image_w, int(x2)), min(self.display_image_h, int(y2))
         if (x2 - x1) < 3 or (y2 - y1) < 3:
-            return
+            return None
 
         h_orig, w_orig = self.cv_image.shape[:2]
         w_ratio = w_orig / self.display_image_w if self.display_image_w > 0 else 1
@@ -774,36 +1497,215 @@ class ImageToolApp:
         x1_orig, x2_orig = int(x1 * w_ratio), int(x2 * w_ratio)
         y1_orig, y2_orig = int(y1 * h_ratio), int(y2 * h_ratio)
 
-        image_copy = self.cv_image.copy()
-        roi_original = image_copy[y1_orig:y2_orig, x1_orig:x2_orig]
-        if roi_original.size == 0:
+        if x2_orig <= x1_orig or y2_orig <= y1_orig:
+            return None
+        return (x1_orig, y1_orig, x2_orig, y2_orig)
+
+    def image_to_canvas_box(self, box):
+        sx = self.display_image_w / self.cv_image.shape[1]
+        sy = self.display_image_h / self.cv_image.shape[0]
+        x1, y1, x2, y2 = box
+        return (self.image_offset_x + x1 * sx, self.image_offset_y + y1 * sy,
+                self.image_offset_x + x2 * sx, self.image_offset_y + y2 * sy)
+
+    def effect_params(self):
+        return dict(
+            effect_type=self.effect_type.get(),
+            blur_value=int(self.blur_value.get()),
+            pixel_value=int(self.pixel_value.get()),
+            feather=int(self.feather_value.get()),
+            blur_backend=self.blur_backend.get())
+
+    def working_params(self, fx):
+        # Efekt değerleri kaynak pikselindedir; vekilde düzenlerken vekil boyutuna indirilir
+        return scale_effect(fx, 1.0 / self.proxy_scale)
+
+    @profiled("app.apply_effect_to_selection")
+    def apply_effect_to_selection(self, start_x, start_y, end_x, end_y):
+        box = self.canvas_to_image_box(start_x, start_y, end_x, end_y)
+        if box is None:
             return
+        fx = self.effect_params()
+        shape = self.selection_type.get()
+        params = dict(self.working_params(fx), selection_type=shape)
+        gen = self._image_generation
+        op = {"op": "regions", "size": self.image_size(), "fx": fx, "fx_scale": self.proxy_scale,
+              "regions": [{"box": box, "shape": shape}]}
+
+        def work(cancel):
+            # Bölge ve çevresi, iş başladığında (önceki işler işlendikten sonra) okunur
+            return region_effect_patch(self.cv_image, box, cancel=cancel, **params)
+
+        label = "Bulanıklaştırma" if params["effect_type"] == "blur" else "Pikselleştirme"
+        self.jobs.submit(label, work, lambda roi: self._commit_patch(gen, box, roi, op))
+
+    # ----- Çoklu seçim kümesi -----
+    def update_region_buttons(self):
+        n = len(self.region_set)
+        self.btn_apply_regions.config(text=f"Tümünü Uygula ({n})" if n else "Tümünü Uygula",
+                                      state="normal" if n else "disabled")
+        self.btn_clear_regions.config(state="normal" if n else "disabled")
+
+    def draw_region_set(self):
+        # Bölgeler tuvalde çerçeve olarak gösterilir; görüntü yeniden çizildiğinde tekrar kurulur
+        self.canvas.delete("region")
+        if self.cv_image is None:
+            return
+        for region in self.region_set:
+            shape_method = self.canvas.create_oval if region["shape"] == "oval" else self.canvas.create_rectangle
+            region["item"] = shape_method(*self.image_to_canvas_box(region["box"]),
+                                          outline="orange", width=2, dash=(4, 2), tags=("region",))
 
-        if self.effect_type.get() == "blur":
-            k = int(self.blur_value.get()); k = k if k % 2 == 1 else k + 1
-            processed_roi = cv2.GaussianBlur(roi_original, (k, k), 0)
-        else:
-            processed_roi = self.apply_pixelate(roi_original, int(self.pixel_value.get()))
+    def region_at(self, cx, cy):
+        # Üstte çizilen bölge önceliklidir
+        if self.cv_image is None:
+            return None
+        for region in reversed(self.region_set):
+            x1, y1, x2, y2 = self.image_to_canvas_box(region["box"])
+            if x1 <= cx <= x2 and y1 <= cy <= y2:
+                return region
+        return None
 
-        mask = np.zeros(roi_original.shape[:2], dtype=np.uint8)
-        if self.selection_type.get() == "oval":
-            center = (roi_original.shape[1] // 2, roi_original.shape[0] // 2)
-            axes = (roi_original.shape[1] // 2, roi_original.shape[0] // 2)
-            cv2.ellipse(mask, center, axes, 0, 0, 360, 255, -1)
-        else:
-            mask[:] = 255
+    def add_region(self, start_x, start_y, end_x, end_y):
+        box = self.canvas_to_image_box(start_x, start_y, end_x, end_y)
+        if box is None:
+            return
+        self.region_set.append({"box": box, "shape": self.selection_type.get()})
+        self.draw_region_set()
+        self.update_region_buttons()
 
-        feather = int(self.feather_value.get())
-        if feather > 0:
-            mask = cv2.GaussianBlur(mask, (0, 0), sigmaX=feather, sigmaY=feather)
+    def move_region(self, region, dx, dy):
+        # Tuvaldeki kayma görüntü pikseline çevrilir; bölge boyutu korunup görüntü içinde tutulur
+        h_orig, w_orig = self.cv_image.shape[:2]
+        x1, y1, x2, y2 = region["box"]
+        ddx = int(round(dx * w_orig / self.display_image_w))
+        ddy = int(round(dy * h_orig / self.display_image_h))
+        ddx = min(max(ddx, -x1), w_orig - x2)
+        ddy = min(max(ddy, -y1), h_orig - y2)
+        region["box"] = (x1 + ddx, y1 + ddy, x2 + ddx, y2 + ddy)
+        self.draw_region_set()
+
+    def on_region_double_click(self, event):
+        if not self.multi_select.get():
+            return
+        region = self.region_at(self.canvas.canvasx(event.x), self.canvas.canvasy(event.y))
+        if region is None:
+            return
+        region["shape"] = "rectangle" if region["shape"] == "oval" else "oval"
+        self.draw_region_set()
 
-        mask_f = (mask.astype(np.float32) / 255.0)[..., None]
-        final_roi = (processed_roi.astype(np.float32) * mask_f + roi_original.astype(np.float32) * (1 - mask_f)).astype(np.uint8)
+    def on_region_right_click(self, event):
+        region = self.region_at(self.canvas.canvasx(event.x), self.canvas.canvasy(event.y))
+        if region is None:
+            return
+        self.region_set.remove(region)
+        self.draw_region_set()
+        self.update_region_buttons()
+
+    def clear_region_set(self):
+        self.region_set = []
+        self.canvas.delete("region")
+        self.update_region_buttons()
+
+    @profiled("app.apply_region_set")
+    def apply_region_set(self, event=None):
+        # Tüm bölgeler tek işte işlenir: pencere başına bir kopya ve tek geçmiş adımı
+        if self.cv_image is None or not self.region_set:
+            return
+        regions = [(r["box"], r["shape"]) for r in self.region_set]
+        fx = self.effect_params()
+        params = self.working_params(fx)
+        gen = self._image_generation
+        op = {"op": "regions", "size": self.image_size(), "fx": fx, "fx_scale": self.proxy_scale,
+              "regions": [{"box": r["box"], "shape": r["shape"], "auto": r.get("auto", False)}
+                          for r in self.region_set]}
+
+        def work(cancel):
+            return region_set_patches(self.cv_image, regions, cancel=cancel, **params)
+
+        def done(patches):
+            if self._commit_patches(gen, patches, op):
+                self.clear_region_set()
+
+        self.jobs.submit(f"{len(regions)} bölge işleniyor", work, done)
+        self.save_app_settings()
 
-        image_copy[y1_orig:y2_orig, x1_orig:x2_orig] = final_roi
-        self.cv_image = image_copy
-        self.add_to_history(self.cv_image)
+    def auto_detect(self):
+        # Bulunan yüz/plakalar seçim kümesine eklenir; operatör gözden geçirip "Tümünü Uygula" der
+        if self.cv_image is None:
+            return
+        det = CONFIG.section("detect")
+        kinds = det.get("kinds", list(DEFAULT_DETECT_KINDS))
+        max_side = int(det.get("max_side", 1280))
+        gen = self._image_generation
+
+        def work(cancel):
+            return detect_regions(self.cv_image, kinds=kinds, max_side=max_side, cancel=cancel)
+
+        def done(found):
+            if gen != self._image_generation:
+                return
+            known = {r["box"] for r in self.region_set}
+            self.region_set.extend({"box": box, "shape": shape, "auto": True}
+                                   for box, shape in found if box not in known)
+            self.multi_select.set(True)
+            self.draw_region_set()
+            self.update_region_buttons()
+            if not found:
+                messagebox.showinfo("Otomatik Algılama", "Yüz veya plaka bulunamadı.")
+
+        def failed(e):
+            messagebox.showerror("Otomatik Algılama", f"Algılama başarısız: {e}")
+
+        self.jobs.submit("Yüz/plaka algılanıyor", work, done, failed)
+
+    def image_size(self):
+        h, w = self.cv_image.shape[:2]
+        return (w, h)
+
+    def clear_ops(self):
+        self._ops = []
+        self._ops_redo = []
+
+    def _record_op(self, op):
+        if op is not None:
+            self._ops.append(op)
+        self._ops_redo = []
+
+    def _commit_patch(self, gen, box, roi, op=None):
+        return self._commit_patches(gen, [(box, roi)], op)
+
+    @profiled("app.commit_patches")
+    def _commit_patches(self, gen, patches, op=None):
+        # Tam kopya yerine yalnızca bölgelerin önceki hali tek geçmiş adımı olarak yazılır
+        if gen != self._image_generation or not patches:
+            return False
+        if not self.cv_image.flags.writeable:
+            # Önbellekten gelen salt okunur dizi ilk düzenlemede kopyalanır
+            self.cv_image = copy_image(self.cv_image, self.tiled_threshold_mp)
+        befores = []
+        for (x1, y1, x2, y2), roi in patches:
+            befores.append(((x1, y1, x2, y2), snapshot(self.cv_image[y1:y2, x1:x2])))
+            self.cv_image[y1:y2, x1:x2] = roi
+        self.history.push_patches(befores)
+        self._record_op(op)
+        self.update_history_buttons()
+        for box, _ in patches:
+            self.refresh_display_region(box)
+        return True
+
+    @profiled("app.commit_frame")
+    def _commit_frame(self, gen, new_image, op=None):
+        if gen != self._image_generation:
+            return False
+        self.history.push_frame(self.cv_image)
+        self._record_op(op)
+        self.cv_image = new_image
+        self._image_generation += 1
+        self.clear_region_set()
+        self.update_history_buttons()
         self.update_display_image()
+        return True
 
     # ----- 3) Kırp -----
     def open_crop(self):
@@ -811,113 +1713,128 @@ class ImageToolApp:
             return
         dlg = CropDialog(self.root, self.cv_image)
         self.root.wait_window(dlg.top)
-        if dlg.result_image is not None:
-            self.cv_image = dlg.result_image
-            self.add_to_history(self.cv_image)
-            self.update_display_image()
+        if dlg.result_rect is None:
+            return
+        x, y, w, h = dlg.result_rect
+        op = {"op": "crop", "size": self.image_size(), "rect": (x, y, w, h), "ratio": dlg.crop_var.get()}
+        # Kopyasız görünüm: önceki kare geçmişte zaten tutulduğundan bellek ikiye katlanmaz.
+        # Salt okunur işaretlenir; ilk düzenlemede yalnızca kırpılan alan kopyalanır.
+        cropped = self.cv_image[y:y+h, x:x+w]
+        cropped.flags.writeable = False
+        if self._commit_frame(self._image_generation, cropped, op):
             messagebox.showinfo("Kırpma", "Kırpma uygulandı.")
 
     # ----- 4) Filigran -----
     def open_wm_settings(self):
         WatermarkSettingsDialog(self.root)
 
-    def _load_font(self, size):
-        for fp in ["arial.ttf", "DejaVuSans.ttf", "/System/Library/Fonts/Supplemental/Arial.ttf"]:
-            try:
-                return ImageFont.truetype(fp, size)
-            except Exception:
-                continue
-        return ImageFont.load_default()
-
-    def _measure_text(self, draw, text, font):
-        try:
-            l, t, r, b = draw.textbbox((0, 0), text, font=font)
-            return r - l, b - t
-        except Exception:
-            try:
-                return draw.textsize(text, font=font)
-            except Exception:
-                return len(text) * font.size, font.size
-
+    @profiled("app.apply_wm_logo_now")
     def apply_wm_logo_now(self):
         if self.cv_image is None:
             return
-        cfg = _read_config()
-        wm = cfg.get("watermark", {})
-        enable_text = wm.get("enable_text", True)
-        enable_logo = wm.get("enable_logo", True)
-        text = wm.get("text", "* KVKK gereği bazı yüzler bulanıklaştırılmıştır.").strip()
-        text_size_pct = int(wm.get("text_size_percent", 2))
-        opacity = int(wm.get("opacity", 40))
-        color = wm.get("color", [255, 255, 255])
-        text_color = (int(color[0]), int(color[1]), int(color[2]))
-        logo_path = wm.get("logo_path", "")
-        logo_size_pct = int(wm.get("logo_size_percent", 15))
+        wm = CONFIG.section("watermark")
+        gen = self._image_generation
 
-        base = Image.fromarray(cv2.cvtColor(self.cv_image, cv2.COLOR_BGR2RGB)).convert("RGBA")
-        w, h = base.size
-        layer = Image.new("RGBA", (w, h), (0,0,0,0))
+        def work(cancel):
+            # Yalnızca logo ve metin kutuları işlenir; geçmişe de yalnızca onlar yazılır
+            warnings = []
+            return watermark_patches(self.cv_image, wm, warn=warnings.append, cancel=cancel), warnings
 
-        # Logo merkez
-        if enable_logo and logo_path and os.path.isfile(logo_path):
-            try:
-                logo = Image.open(logo_path).convert("RGBA")
-                target_w = max(1, int(w * (logo_size_pct / 100.0)))
-                ratio = target_w / logo.width
-                target_h = max(1, int(logo.height * ratio))
-                logo = logo.resize((target_w, target_h), Image.Resampling.LANCZOS)
-                if opacity < 100:
-                    data = np.array(logo)
-                    data[..., 3] = (data[..., 3].astype(np.float32) * (opacity/100.0)).astype(np.uint8)
-                    logo = Image.fromarray(data, mode="RGBA")
-                lw, lh = logo.size
-                pos = ((w - lw)//2, (h - lh)//2)
-                layer.paste(logo, pos, mask=logo)
-            except Exception as e:
-                messagebox.showwarning("Logo", f"Logo uygulanamadı: {e}")
-
-        # Metin sağ alt
-        if enable_text and text:
-            draw = ImageDraw.Draw(layer)
-            desired_h = max(8, int(h * (text_size_pct / 100.0)))
-            font_size = max(8, desired_h)
-            font = self._load_font(font_size)
-            tw, th = self._measure_text(draw, text, font)
-            max_w = int(w * 0.94)
-            if tw > max_w and tw > 0:
-                scale = max_w / tw
-                font_size = max(8, int(font_size * scale))
-                font = self._load_font(font_size)
-                tw, th = self._measure_text(draw, text, font)
-            col = (text_color[0], text_color[1], text_color[2], int(255 * (opacity/100.0)))
-            margin = 12
-            pos = (w - tw - margin, h - th - margin)
-            draw.text(pos, text, font=font, fill=col)
-
-        final_pil = Image.alpha_composite(base, layer).convert("RGB")
-        self.cv_image = cv2.cvtColor(np.array(final_pil), cv2.COLOR_RGB2BGR)
-        self.add_to_history(self.cv_image)
-        self.update_display_image()
-        messagebox.showinfo("Filigran", "Filigran ve logo uygulandı.")
+        def done(result):
+            patches, warnings = result
+            for msg in warnings:
+                messagebox.showwarning("Logo", msg)
+            if self._commit_patches(gen, patches, {"op": "watermark", "size": self.image_size(), "wm": wm}):
+                messagebox.showinfo("Filigran", "Filigran ve logo uygulandı.")
+
+        self.jobs.submit("Filigran ekleniyor", work, done)
+
+    # ----- Şablon -----
+    def open_template(self):
+        if self.cv_image is None:
+            return
+        if not self._ops:
+            messagebox.showinfo("Şablon", "Şablona alınacak bir düzenleme yok. Önce bölge, kırpma veya filigran uygulayın.")
+            return
+        remaining = self.batch_files[self.batch_index + 1:] if self.batch_index >= 0 else []
+        source_size = None
+        if self.source_image is not None:
+            h, w = self.source_image.shape[:2]
+            source_size = (w, h)
+        try:
+            recipe = recipe_from_ops(self._ops, source_size=source_size)
+        except ValueError as e:
+            messagebox.showwarning("Şablon", str(e))
+            return
+        TemplateDialog(self.root, recipe, remaining, self.current_path)
 
     # ----- 5) Kaydet -----
+    @profiled("app.save_current")
     def save_current(self):
         if self.cv_image is None:
             return
-        dlg = SaveDialog(self.root, self.cv_image, self.current_path,
+        # Yıkıcı olmayan düzenlemede işlem kaydı tam çözünürlükte, kayıt işinde tek geçişte işlenir
+        image = self.cv_image
+        if self.source_image is not None:
+            image = EditGraph(self.source_image, self._ops, self.tiled_threshold_mp)
+        dlg = SaveDialog(self.root, image, self.current_path,
                          batch_pos=(self.batch_index + 1) if self.batch_index >= 0 else None,
-                         batch_total=len(self.batch_files) if self.batch_files else None)
+                         batch_total=len(self.batch_files) if self.batch_files else None,
+                         jobs=self.jobs)
         self.root.wait_window(dlg.top)
-        if dlg.saved:
-            self.after_save_flow()
+        if dlg.save_job is None:
+            return
+        name, work, reserved = dlg.save_job
+        # Kaydedilen dizi artık değişmemeli; yine düzenlenirse ilk yazmada kopyalanır
+        self.cv_image.flags.writeable = False
+
+        def done(out_path):
+            # Hedef boyutta küçültme adı değiştirdiyse klasör bir sonraki sorguda yeniden okunur
+            OUTPUT_INDEX.release(reserved, ok=os.path.normcase(out_path) == os.path.normcase(reserved))
+            self.save_lbl.config(text=f"Kaydedildi: {os.path.basename(out_path)}", fg="#00AA55")
+
+        def failed(e):
+            OUTPUT_INDEX.release(reserved, ok=False)
+            self.save_failures.append((name, str(e)))
+            self.save_lbl.config(text=f"Kaydedilemedi: {name} (ayrıntı için tıklayın)", fg="#CC0000")
+            self.root.bell()
+
+        self.saver.submit(f"Kaydediliyor: {name}", work, done, failed, cancellable=False)
+        self.after_save_flow()
+
+    def show_save_failures(self, event=None):
+        if not self.save_failures:
+            return
+        lines = "\n".join(f"{name}: {err}" for name, err in self.save_failures)
+        self.save_failures = []
+        self.save_lbl.config(text="")
+        messagebox.showerror("Kaydetme Hataları", lines)
 
 # ==============================================================================
 # Uygulamayı başlat
 # ==============================================================================
+def report_startup(root, preload_thread):
+    # MIFLON_STARTUP_BENCH=1: pencere çizilene ve görüntü kütüphaneleri yüklenene kadar
+    # geçen süreyi (ms) JSON olarak yazar ve çıkar; paketlenmiş sürümde de çalışır
+    root.update()
+    window_ms = (time.perf_counter() - _T0) * 1000
+    preload_thread.join()
+    ready_ms = (time.perf_counter() - _T0) * 1000
+    print(json.dumps({"window_ms": round(window_ms, 1), "ready_ms": round(ready_ms, 1)}), flush=True)
+    root.destroy()
+
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    if len(sys.argv) > 1:
+        sys.exit(cli_main())
     if DND_AVAILABLE:
         root = TkinterDnD.Tk()
     else:
         root = tk.Tk()
     app = ImageToolApp(root)
-    root.mainloop()
\ No newline at end of file
+    # OpenCV/numpy/PIL pencere açılırken arka planda yüklenir
+    preloader = preload_async()
+    if os.environ.get("MIFLON_STARTUP_BENCH"):
+        report_startup(root, preloader)
+    else:
+        root.mainloop()
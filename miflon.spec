@@ -1,12 +1,20 @@
 # -*- mode: python ; coding: utf-8 -*-
+import os
+
+import cv2
+
+# Otomatik algılamanın Haar sınıflandırıcıları (opencv-python 4.x, bkz. requirements.txt)
+CASCADES = ['haarcascade_frontalface_default.xml', 'haarcascade_profileface.xml',
+            'haarcascade_russian_plate_number.xml']
 
 
 a = Analysis(
     ['miflon.py'],
     pathex=[],
     binaries=[],
-    datas=[],
-    hiddenimports=[],
+    datas=[(os.path.join(cv2.data.haarcascades, name), 'cascades') for name in CASCADES],
+    # Çekirdek OpenCV/numpy/PIL'i importlib ile gecikmeli yüklediğinden analiz bunları göremez
+    hiddenimports=['miflon_core', 'cv2', 'numpy', 'PIL.Image', 'PIL.ImageTk', 'PIL.ImageDraw', 'PIL.ImageFont', 'PIL.ImageOps', 'tracemalloc'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
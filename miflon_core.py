@@ -0,0 +1,2471 @@
+"""Miflon görüntü işleme çekirdeği (Tk gerektirmez).
+
+Yapılandırma, profil, görüntü işleme, tarif/toplu işleme ve komut satırı bu
+modüldedir; arayüz (miflon.py) ve betikler/hizmetler ortak kullanır. OpenCV,
+numpy ve PIL ilk kullanımda yüklenir: modülü içe aktarmak bu kütüphaneleri
+yüklemez, böylece pencere hemen açılır. preload() hepsini arka planda yükler.
+
+    import miflon_core as core
+    img = core.load_image("foto.jpg")
+    core.apply_watermark(img, {"text": "..."})
+"""
+import io
+import os
+import sys
+import json
+import re
+import copy
+import math
+import time
+import atexit
+import signal
+import stat
+import tempfile
+import argparse
+import functools
+import importlib
+import threading
+import multiprocessing
+from collections import deque, OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from pathlib import Path
+from datetime import datetime
+
+# -------------------------------------------------------------
+# Ağır kütüphanelerin gecikmeli yüklenmesi
+# -------------------------------------------------------------
+class _LazyModule:
+    """İlk öznitelik erişiminde modülü yükler ve ad alanındaki yerini modülün kendisine bırakır.
+
+    Sonraki erişimler doğrudan modüle gider; yalnızca ilk erişim bu sınıftan geçer.
+    """
+
+    def __init__(self, name, namespace, alias):
+        self._name, self._namespace, self._alias = name, namespace, alias
+
+    def _load(self):
+        module = importlib.import_module(self._name)
+        if self._namespace.get(self._alias) is self:
+            self._namespace[self._alias] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        return f"<gecikmeli modül {self._name}>"
+
+_LAZY_MODULES = []
+
+def lazy_import(name, namespace, alias=None):
+    # namespace[alias] yerine ilk kullanımda yüklenecek bir vekil koyar
+    proxy = _LazyModule(name, namespace, alias or name.rsplit(".", 1)[-1])
+    namespace[proxy._alias] = proxy
+    _LAZY_MODULES.append(proxy)
+    return proxy
+
+def preload():
+    # Kayıtlı tüm gecikmeli modülleri yükler (uygulama açılışında arka plan iş parçacığında)
+    for proxy in list(_LAZY_MODULES):
+        try:
+            proxy._load()
+        except ImportError:
+            pass
+
+def preload_async():
+    thread = threading.Thread(target=preload, name="miflon-preload", daemon=True)
+    thread.start()
+    return thread
+
+lazy_import("cv2", globals())
+lazy_import("numpy", globals(), "np")
+lazy_import("PIL.Image", globals())
+lazy_import("PIL.ImageDraw", globals())
+lazy_import("PIL.ImageFont", globals())
+lazy_import("PIL.ImageOps", globals())
+
+# -------------------------------------------------------------
+# Yapılandırma (JSON) yardımcıları
+# -------------------------------------------------------------
+CONFIG_FILE = str(Path.home() / ".miflon_config.json")
+
+def replace_file(tmp, path, attempts=5):
+    for attempt in range(attempts):
+        try:
+            os.replace(tmp, path)
+            return
+        except PermissionError:
+            # Windows'ta hedef başka bir süreçte kısa süre açık olabilir
+            if attempt == attempts - 1:
+                raise
+            time.sleep(0.05)
+
+# Süreç umask'ı modül yüklenirken bir kez okunur (os.umask okurken değiştirir; iş parçacıklarında güvenli değil)
+_UMASK = os.umask(0o022)
+os.umask(_UMASK)
+
+def match_file_mode(tmp, path):
+    # mkstemp geçici dosyayı 0600 açar ve os.replace bunu korur. Hedef varsa onun
+    # izinleri, yoksa open() ile oluşturulmuş gibi 0666 & ~umask uygulanır.
+    try:
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        mode = 0o666 & ~_UMASK
+    try:
+        os.chmod(tmp, mode)
+    except OSError:
+        pass  # izin değiştirilemeyen dosya sistemleri (ör. bazı ağ paylaşımları)
+
+def publish_once(tmp, path):
+    # Hazır dosyayı path adıyla yayımlar; path zaten varsa dokunmaz (FileExistsError).
+    # Sabit bağlantı (link) varlık denetimi ile yayımlamayı tek adımda yapar;
+    # desteklemeyen dosya sistemlerinde denetleyip yeniden adlandırmaya düşülür.
+    try:
+        os.link(tmp, path)
+    except FileExistsError:
+        raise FileExistsError(f"Çıktı zaten var, üzerine yazılmadı: {path}") from None
+    except OSError:
+        if os.path.exists(path):
+            raise FileExistsError(f"Çıktı zaten var, üzerine yazılmadı: {path}") from None
+        replace_file(tmp, path)
+        return
+    os.remove(tmp)
+
+def publish_free(tmp, folder, make_name, index, uses_index):
+    # tmp'yi make_name(index) adıyla yayımlar; ad doluysa ve şablonda indeks varsa
+    # sıradaki indeks denenir, yoksa FileExistsError. Yayımlanamazsa tmp silinir.
+    # Döndürür: (yol, kullanılan indeks)
+    try:
+        while True:
+            path = os.path.join(folder, make_name(index))
+            try:
+                publish_once(tmp, path)
+                return path, index
+            except FileExistsError:
+                if not uses_index:
+                    raise
+                index += 1
+    except Exception:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+def atomic_write(path, data, prefix=".miflon_"):
+    # Aynı klasörde geçici dosyaya yazılır, diske işlenir ve tek adımda yerine konur;
+    # yarıda kalan yazma hedefte bozuk bir dosya bırakmaz
+    folder = os.path.dirname(path) or "."
+    fd, tmp = tempfile.mkstemp(dir=folder, prefix=prefix, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        match_file_mode(tmp, path)
+        replace_file(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+def _deep_update(dst, src):
+    for k, v in src.items():
+        if isinstance(v, dict) and isinstance(dst.get(k), dict):
+            _deep_update(dst[k], v)
+        else:
+            dst[k] = copy.deepcopy(v)
+
+def _is_applied(dst, src):
+    # src'deki tüm değerler dst'de zaten aynıysa True
+    for k, v in src.items():
+        if isinstance(v, dict) and isinstance(dst.get(k), dict):
+            if not _is_applied(dst[k], v):
+                return False
+        elif k not in dst or dst[k] != v:
+            return False
+    return True
+
+class ConfigStore:
+    """Süreç genelinde tek yapılandırma nesnesi.
+
+    Dosya ilk erişimde bir kez okunur, sonraki okumalar bellekten yapılır.
+    Değişiklikler bellekte hemen geçerli olur; diske kısa bir gecikmeyle
+    toplu ve atomik (geçici dosya + os.replace) yazılır. Yazmadan önce dosya
+    yeniden okunur ve yalnızca bu süreçte değişen anahtarlar işlenir, böylece
+    aynı anda açık iki örnek birbirinin ayarlarını ezmez.
+    """
+
+    def __init__(self, path, delay=1.0):
+        self.path = path
+        self.delay = delay
+        self._data = None
+        self._pending = {}
+        self._timer = None
+        self._lock = threading.RLock()
+
+    def _load_file(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except Exception:
+            return {}
+
+    @property
+    def data(self):
+        with self._lock:
+            if self._data is None:
+                self._data = self._load_file()
+            return self._data
+
+    def section(self, name):
+        # Bölümün kopyası (çağıran değiştirse de depo etkilenmez)
+        value = self.data.get(name, {})
+        return copy.deepcopy(value) if isinstance(value, dict) else {}
+
+    def get(self, section, key, default=None):
+        value = self.data.get(section, {})
+        return value.get(key, default) if isinstance(value, dict) else default
+
+    def get_int(self, section, key, default=0):
+        try:
+            return int(self.get(section, key, default))
+        except (TypeError, ValueError):
+            return default
+
+    def get_bool(self, section, key, default=False):
+        value = self.get(section, key, default)
+        return value if isinstance(value, bool) else default
+
+    def get_str(self, section, key, default=""):
+        value = self.get(section, key, default)
+        return value if isinstance(value, str) else default
+
+    def update(self, patch):
+        with self._lock:
+            if _is_applied(self.data, patch):
+                return
+            _deep_update(self._data, patch)
+            _deep_update(self._pending, patch)
+            self._schedule()
+
+    def _schedule(self):
+        if self._timer is None:
+            self._timer = threading.Timer(self.delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, {}
+            locked = self._acquire_file_lock()
+            try:
+                data = self._load_file()
+                _deep_update(data, pending)
+                self._write_atomic(data)
+                self._data = data
+            except Exception as e:
+                # Değişiklikler kaybolmasın: bekleyenlere geri katılır, yazma yeniden denenir
+                _deep_update(pending, self._pending)
+                self._pending = pending
+                self._schedule()
+                print(f"Ayarlar kaydedilemedi ({self.path}): {e}", file=sys.stderr)
+            finally:
+                if locked:
+                    self._release_file_lock()
+
+    def _acquire_file_lock(self, timeout=2.0, stale=10.0):
+        # Süreçler arası basit kilit: oku-birleştir-yaz adımı aynı anda yapılmasın
+        lock_path = self.path + ".lock"
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                return True
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(lock_path) > stale:
+                        os.remove(lock_path)
+                        continue
+                except OSError:
+                    continue
+                if time.monotonic() > deadline:
+                    return False
+                time.sleep(0.02)
+            except OSError:
+                return False
+
+    def _release_file_lock(self):
+        try:
+            os.remove(self.path + ".lock")
+        except OSError:
+            pass
+
+    def _write_atomic(self, data):
+        atomic_write(self.path, json.dumps(data, indent=4, ensure_ascii=False).encode("utf-8"),
+                     prefix=".miflon_config.")
+
+CONFIG = ConfigStore(CONFIG_FILE)
+atexit.register(CONFIG.flush)
+
+# -------------------------------------------------------------
+# İşlem profili (MIFLON_PROFILE=1 ya da yapılandırmada "profile.enabled")
+# -------------------------------------------------------------
+# Açıkken @profiled ile işaretli her çağrı için süre, görüntü boyutu ve
+# tracemalloc ile ayrılan tepe bellek kaydedilir; kayıtlar Chrome/Perfetto iz
+# biçiminde (chrome://tracing, ui.perfetto.dev) dışa aktarılır. Karar modül
+# yüklenirken bir kez verilir: kapalıyken dekoratör fonksiyonu olduğu gibi
+# döndürür, yani hiçbir ek maliyet yoktur. MIFLON_PROFILE bir .json yolu da
+# olabilir; iz çıkışta oraya yazılır.
+class Profiler:
+    """İşlem sürelerini Chrome iz olayları ("ph": "X") olarak toplar.
+
+    İç içe çağrılar aynı iş parçacığında üst olayın içinde görünür. Bellek,
+    olay başında tracemalloc tepesi sıfırlanarak ölçülür; iç olayın tepesi üst
+    olaya da eklenir. Paralel iş parçacıklarının ayırmaları birbirine karışabilir;
+    değerler yaklaşık olarak okunmalıdır.
+    """
+
+    def __init__(self, trace_path=None, track_alloc=True, max_events=200000):
+        self.trace_path = trace_path
+        self.track_alloc = track_alloc
+        self.events = deque(maxlen=max_events)
+        self._t0 = time.perf_counter_ns()
+        self._local = threading.local()
+        if track_alloc:
+            import tracemalloc
+            self._tm = tracemalloc
+            tracemalloc.start()
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def begin(self):
+        # Açık olay çerçevesi: [başlangıç ns, başlangıç belleği, görülen en yüksek bellek]
+        frame = [time.perf_counter_ns(), 0, 0]
+        if self.track_alloc:
+            cur, peak = self._tm.get_traced_memory()
+            stack = self._stack()
+            if stack:
+                stack[-1][2] = max(stack[-1][2], peak)
+            self._tm.reset_peak()
+            frame[1] = frame[2] = cur
+        self._stack().append(frame)
+        return frame
+
+    def end(self, frame, name, args):
+        t1 = time.perf_counter_ns()
+        stack = self._stack()
+        stack.pop()
+        if self.track_alloc:
+            cur, peak = self._tm.get_traced_memory()
+            peak = max(peak, frame[2])
+            args["alloc_peak"] = peak - frame[1]
+            args["alloc_net"] = cur - frame[1]
+            if stack:
+                stack[-1][2] = max(stack[-1][2], peak)
+        self.events.append({
+            "name": name, "cat": name.split(".", 1)[0], "ph": "X",
+            "ts": (frame[0] - self._t0) / 1000.0, "dur": (t1 - frame[0]) / 1000.0,
+            "pid": os.getpid(), "tid": threading.get_ident(), "args": args,
+        })
+
+    def recent(self, n=8):
+        # Son tamamlanan n olay (yeniden eskiye)
+        return list(self.events)[-n:][::-1]
+
+    def export(self, path=None):
+        path = path or self.trace_path or os.path.join(
+            os.path.dirname(CONFIG_FILE), f"miflon_trace_{datetime.now():%Y%m%d_%H%M%S}.json")
+        names = [{"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": t.ident,
+                  "args": {"name": t.name}} for t in threading.enumerate()]
+        data = {"traceEvents": names + list(self.events), "displayTimeUnit": "ms"}
+        atomic_write(path, json.dumps(data, ensure_ascii=False).encode("utf-8"))
+        return path
+
+def _image_args(args):
+    # Olay ayrıntısı: ilk ndarray argümanın ya da nesnenin cv_image'ının boyutu
+    for a in args[:3]:
+        img = a if isinstance(a, np.ndarray) else getattr(a, "cv_image", None)
+        if isinstance(img, np.ndarray):
+            h, w = img.shape[:2]
+            return {"w": w, "h": h, "mp": round(w * h / 1e6, 2)}
+    return {}
+
+def profiled(name):
+    # Profil kapalıyken fonksiyonun kendisini döndürür
+    def decorate(func):
+        if PROFILER is None:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            frame = PROFILER.begin()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                PROFILER.end(frame, name, _image_args(args))
+        return wrapper
+    return decorate
+
+def _make_profiler():
+    env = os.environ.get("MIFLON_PROFILE", "").strip()
+    cfg = CONFIG.section("profile")
+    if env.lower() in ("", "0", "false", "no") and not cfg.get("enabled", False):
+        return None
+    trace_path = env if env.lower().endswith(".json") else (cfg.get("trace_path") or None)
+    profiler = Profiler(trace_path, track_alloc=bool(cfg.get("track_alloc", True)))
+    if multiprocessing.parent_process() is None:
+        # Toplu işin alt süreçleri kendi izini yazmaz
+        atexit.register(lambda: profiler.events and profiler.export())
+    return profiler
+
+PROFILER = _make_profiler()
+
+# -------------------------------------------------------------
+# Güvenli kırpma oranı parse (eval yerine)
+# -------------------------------------------------------------
+def parse_ratio(value: str):
+    if value == "original":
+        return None
+    try:
+        a, b = value.split(":")
+        a = float(a.strip())
+        b = float(b.strip())
+        if b == 0:
+            return None
+        return a / b
+    except Exception:
+        return None
+
+# ==============================================================================
+# GÖRÜNTÜ İŞLEME ÇEKİRDEĞİ (arayüzden bağımsız; GUI ve komut satırı ortak kullanır)
+# ==============================================================================
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".bmp")
+
+DEFAULT_WM_TEXT = "* KVKK gereği bazı yüzler bulanıklaştırılmıştır."
+
+class Cancelled(Exception):
+    """Uzun iş, cancel olayı kurulduğu için yarıda bırakıldı."""
+
+def check_cancel(cancel):
+    # cancel: threading.Event ya da None; uzun döngülerin her adımında çağrılır
+    if cancel is not None and cancel.is_set():
+        raise Cancelled()
+
+# OpenCV gecikmeli yüklendiğinden bayraklar adla tutulur
+_REDUCED_FLAGS = {2: "IMREAD_REDUCED_COLOR_2", 4: "IMREAD_REDUCED_COLOR_4", 8: "IMREAD_REDUCED_COLOR_8"}
+
+def _load_image_pil(source):
+    # source: dosya yolu ya da bellekteki bayt akışı. EXIF yönü cv2.imdecode'daki gibi uygulanır
+    with Image.open(source) as pil_image:
+        pil_image = ImageOps.exif_transpose(pil_image)
+        if pil_image.mode == 'RGBA':
+            return cv2.cvtColor(np.array(pil_image), cv2.COLOR_RGBA2BGR)
+        return cv2.cvtColor(np.array(pil_image.convert('RGB')), cv2.COLOR_RGB2BGR)
+
+@profiled("core.load_image")
+def load_image(filepath):
+    # Doğrudan BGR'ye tek ayırmayla çözülür; EXIF yönü çözme sırasında uygulanır.
+    # Dosya önce bayt dizisi olarak okunur (cv2.imread Windows'ta Türkçe karakterli yollarda başarısız)
+    image = cv2.imdecode(np.fromfile(filepath, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        image = _load_image_pil(filepath)
+    return image
+
+@profiled("core.load_image_preview")
+def load_image_preview(filepath, max_side=2048):
+    # Uzun kenarı max_side'dan küçük düşmeyecek şekilde 1/2, 1/4 veya 1/8 ölçekte çözer;
+    # JPEG'de bu DCT ölçeklemesiyle yapıldığından tam çözmeden çok daha hızlıdır.
+    # Dosya bir kez okunur; boyut yoklaması (yalnızca başlık) ve çözme aynı baytları kullanır
+    data = np.fromfile(filepath, dtype=np.uint8)
+    with Image.open(io.BytesIO(data)) as im:
+        longest = max(im.size)
+    factor = next((f for f in (8, 4, 2) if longest // f >= max_side), 1)
+    image = cv2.imdecode(data, getattr(cv2, _REDUCED_FLAGS.get(factor, "IMREAD_COLOR")))
+    if image is None:
+        image = _load_image_pil(io.BytesIO(data))
+    return image
+
+class ImageDecodeCache:
+    """Çözülmüş görsellerin bayt sınırlı LRU önbelleği ve ileriye dönük çözücü.
+
+    prefetch() sıradaki dosyaları arka planda çözer; get() önbellekte varsa
+    hemen, çözülmekteyse o işi bekleyerek, yoksa doğrudan çözerek döner.
+    Önbellekteki diziler salt okunurdur; düzenlemeden önce kopyalanmalıdır.
+    """
+
+    def __init__(self, budget_bytes=1024 * 1024 * 1024, workers=2, loader=None):
+        self.budget_bytes = int(budget_bytes)
+        self.loader = loader or load_image
+        self._items = OrderedDict()
+        self._inflight = {}
+        self._nbytes = 0
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="miflon-decode")
+
+    @staticmethod
+    def _key(path):
+        try:
+            st = os.stat(path)
+            return (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+        except OSError:
+            return (os.path.abspath(path), None, None)
+
+    def peek(self, path):
+        # Beklemeden yalnızca önbellekte hazırsa döner
+        key = self._key(path)
+        with self._lock:
+            image = self._items.get(key)
+            if image is not None:
+                self._items.move_to_end(key)
+            return image
+
+    def get(self, path):
+        key = self._key(path)
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                return self._items[key]
+            future = self._inflight.get(key)
+        if future is not None:
+            return future.result()
+        return self._decode(key, path)
+
+    def prefetch(self, paths):
+        for path in paths:
+            key = self._key(path)
+            with self._lock:
+                if key in self._items or key in self._inflight:
+                    continue
+                self._inflight[key] = self._pool.submit(self._decode, key, path)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._nbytes = 0
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _decode(self, key, path):
+        try:
+            image = self.loader(path)
+            image.flags.writeable = False
+            with self._lock:
+                if key not in self._items:
+                    self._items[key] = image
+                    self._nbytes += image.nbytes
+                self._items.move_to_end(key)
+                while self._nbytes > self.budget_bytes and len(self._items) > 1:
+                    _, old = self._items.popitem(last=False)
+                    self._nbytes -= old.nbytes
+            return image
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+# -------------------------------------------------------------
+# Büyük görüntüler: diske eşlenmiş, döşemeli işleme
+# -------------------------------------------------------------
+# Eşiği aşan görüntüler RAM yerine geçici bir dosyaya eşlenmiş np.memmap olarak
+# tutulur. memmap bir ndarray olduğundan dilimleme kullanan tüm kod değişmeden
+# çalışır; sayfalar işletim sistemi tarafından gerektiğinde okunup geri verilir.
+# Tam görüntü boyunda ara dizi üreten adımlar (kopyalama, büyük bölge efektleri,
+# önizleme piramidi) döşeme döşeme yapılır; bellekte en fazla birkaç döşeme kalır.
+TILE_SIZE = 1024
+DEFAULT_TILED_THRESHOLD_MP = 100
+# Diskteki bir görüntüden alınan bundan büyük kopyalar (geçmiş yamaları vb.) da diske yazılır
+SPILL_BYTES = 64 * 1024 * 1024
+SCRATCH_DIR = None  # None: sistemin geçici klasörü
+
+def scratch_array(shape, dtype="uint8"):
+    # Geçici dosyaya eşlenmiş dizi; dosya adı hemen silinir, eşleme kapanınca alan geri verilir
+    f = tempfile.TemporaryFile(prefix="miflon_", suffix=".raw", dir=SCRATCH_DIR)
+    return np.memmap(f, dtype=dtype, mode="w+", shape=tuple(shape))
+
+def is_disk_backed(a):
+    return isinstance(a, np.memmap) and a._mmap is not None
+
+def use_tiled(shape, threshold_mp=DEFAULT_TILED_THRESHOLD_MP):
+    return threshold_mp > 0 and shape[0] * shape[1] > threshold_mp * 1000000
+
+def iter_tiles(h, w, tile=TILE_SIZE):
+    for y in range(0, h, tile):
+        for x in range(0, w, tile):
+            yield x, y, min(w, x + tile), min(h, y + tile)
+
+def copy_tiled(src, dst=None):
+    # Satır şeritleriyle kopyalar; dst verilmezse geçici dosyada yeni bir dizi açılır
+    if dst is None:
+        dst = scratch_array(src.shape, src.dtype)
+    row_bytes = max(1, src.nbytes // max(1, src.shape[0]))
+    rows = max(1, (TILE_SIZE * TILE_SIZE * 3) // row_bytes)
+    for y in range(0, src.shape[0], rows):
+        dst[y:y + rows] = src[y:y + rows]
+    return dst
+
+def copy_image(src, threshold_mp=DEFAULT_TILED_THRESHOLD_MP):
+    # Tam kare kopyası (kırpma, yazma öncesi kopya): büyükse diske, değilse RAM'e
+    if is_disk_backed(src) or use_tiled(src.shape, threshold_mp):
+        return copy_tiled(src)
+    return src.copy()
+
+def snapshot(a, spill_bytes=SPILL_BYTES):
+    # Bölge kopyası; diskteki görüntülerden gelen büyük bölgeler yine diske yazılır
+    if a.nbytes > spill_bytes and is_disk_backed(a):
+        return copy_tiled(a)
+    return np.array(a)
+
+def load_image_tiled(filepath, threshold_mp=DEFAULT_TILED_THRESHOLD_MP):
+    # Çözücüler (OpenCV/Pillow) parça parça çözme sunmadığından çözme bir kez tam
+    # bellekte yapılır; eşiği aşan sonuç hemen diske taşınıp bellekteki kopya bırakılır
+    image = load_image(filepath)
+    if use_tiled(image.shape, threshold_mp):
+        image = copy_tiled(image)
+    return image
+
+JPEG_MAX_SIDE = 65535
+
+@profiled("core.write_image")
+def write_image(out_path, image, jpg_quality=95):
+    # Kodlanan veri geçici dosyaya yazılıp yerine konur (atomik). Diskteki çok büyük
+    # görüntülerde kodlayıcı doğrudan geçici dosyaya yazar; kodlanmış veri de bellekte
+    # tutulmaz ve sayfalar kodlayıcı satırları okudukça diskten gelir
+    ext = os.path.splitext(out_path)[1].lower()
+    jpg = ext in (".jpg", ".jpeg")
+    if jpg and max(image.shape[:2]) > JPEG_MAX_SIDE:
+        raise IOError(f"JPEG en fazla {JPEG_MAX_SIDE} piksel kenarı destekler; PNG seçin.")
+    params = [cv2.IMWRITE_JPEG_QUALITY, int(jpg_quality)] if jpg else []
+    if not is_disk_backed(image):
+        ok, buf = cv2.imencode(ext, image, params)
+        if not ok:
+            raise IOError(f"Dosya yazılamadı: {out_path}")
+        atomic_write(out_path, buf)
+        return
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(out_path) or ".", prefix=".miflon_", suffix=ext)
+    os.close(fd)
+    try:
+        if not cv2.imwrite(tmp, image, params):
+            raise IOError(f"Dosya yazılamadı: {out_path}")
+        match_file_mode(tmp, out_path)
+        replace_file(tmp, out_path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+# -------------------------------------------------------------
+# Hedef dosya boyutlu JPEG
+# -------------------------------------------------------------
+DOWNSCALE_STEPS = (1.0, 0.9, 0.8, 0.7, 0.6, 0.5)
+
+def format_size(nbytes):
+    return f"{nbytes / (1024 * 1024):.2f} MB" if nbytes >= 1024 * 1024 else f"{nbytes / 1024:.0f} KB"
+
+class JpegSizeSearch:
+    """Bayt sınırının altında kalan en yüksek JPEG kalitesini bulur.
+
+    Kodlama bellekte (cv2.imencode) yapılır; her turda aralıktaki birkaç kalite
+    paralel kodlanır (imencode GIL'i bırakır) ve aralık en büyük uygun ile en
+    küçük aşan kalite arasına daraltılır. Denenen her (ölçek, kalite) kodlaması
+    saklandığından önizlemede gösterilen boyut kaydederken yeniden hesaplanmaz.
+    Kalite yetmezse sırayla küçültülmüş ölçekler denenir.
+    """
+
+    def __init__(self, image, workers=None):
+        # image bir EditGraph de olabilir; tam çözünürlük ilk kodlamada (iş parçacığında) üretilir
+        self.image = image
+        self.workers = max(1, workers or min(4, os.cpu_count() or 1))
+        self._scaled = {}
+        self._encoded = {}
+        self._lock = threading.Lock()
+
+    def scaled(self, scale):
+        with self._lock:
+            img = self._scaled.get(scale)
+        if img is None:
+            base = materialize(self.image)
+            h, w = base.shape[:2]
+            img = base if scale == 1.0 else cv2.resize(
+                base, (max(1, int(w * scale)), max(1, int(h * scale))), interpolation=cv2.INTER_AREA)
+            with self._lock:
+                self._scaled[scale] = img
+        return img
+
+    @profiled("encode.jpeg_search")
+    def encode(self, quality, scale=1.0):
+        key = (scale, int(quality))
+        with self._lock:
+            data = self._encoded.get(key)
+        if data is None:
+            ok, buf = cv2.imencode(".jpg", self.scaled(scale), [cv2.IMWRITE_JPEG_QUALITY, int(quality)])
+            if not ok:
+                raise IOError("JPEG kodlanamadı.")
+            data = buf.tobytes()
+            with self._lock:
+                self._encoded[key] = data
+        return data
+
+    def _encode_many(self, qualities, scale):
+        todo = [q for q in qualities if (scale, q) not in self._encoded]
+        if len(todo) > 1 and self.workers > 1:
+            with ThreadPoolExecutor(max_workers=min(self.workers, len(todo))) as ex:
+                list(ex.map(lambda q: self.encode(q, scale), todo))
+        return {q: len(self.encode(q, scale)) for q in qualities}
+
+    def best_quality(self, max_bytes, scale=1.0, lo=40, hi=100, cancel=None):
+        # Boyut kaliteyle (neredeyse) monoton artar; k'lı ikili arama
+        best = None
+        while lo <= hi:
+            check_cancel(cancel)
+            k = self.workers + 1
+            qs = sorted({int(round(lo + (hi - lo) * i / max(1, k - 1))) for i in range(k)})
+            sizes = self._encode_many(qs, scale)
+            fits = [q for q in qs if sizes[q] <= max_bytes]
+            if not fits:
+                break  # aralığın en düşüğü bile sığmıyor
+            best = max(fits)
+            over = [q for q in qs if q > best]
+            lo, hi = best + 1, (min(over) - 1 if over else hi)
+        return best
+
+    def find(self, max_bytes, lo=40, hi=100, scales=(1.0,), cancel=None):
+        # (kalite, ölçek, veri) ya da hiçbir ölçekte sığmıyorsa None
+        for scale in scales:
+            q = self.best_quality(max_bytes, scale, lo, hi, cancel=cancel)
+            if q is not None:
+                return q, scale, self.encode(q, scale)
+        return None
+
+@profiled("core.write_bytes")
+def write_bytes(out_path, data):
+    atomic_write(out_path, data)
+
+def apply_pixelate(img, pixel_size):
+    h, w = img.shape[:2]
+    if w < pixel_size or h < pixel_size or pixel_size <= 0:
+        return img
+    small = cv2.resize(img, (max(1, w // pixel_size), max(1, h // pixel_size)), interpolation=cv2.INTER_AREA)
+    return cv2.resize(small, (w, h), interpolation=cv2.INTER_NEAREST)
+
+def oval_mask(h, w, rows, cols):
+    # (h, w) kutusuna oturan elipsin rows × cols dizinlerindeki uint8 maskesi. Her satırın
+    # yarı genişliği analitik hesaplanır; kutunun hangi parçası istenirse istensin aynı
+    # pikseller seçilir (döşemeli yol tam maskeyle birebir aynı sonucu verir)
+    cx, cy = w // 2, h // 2
+    ax, ay = max(1, w // 2), max(1, h // 2)
+    dy = (np.asarray(rows, dtype=np.float64) - cy) / ay
+    half = np.where(np.abs(dy) <= 1.0, np.floor(ax * np.sqrt(np.clip(1.0 - dy * dy, 0.0, None))), -1.0)
+    inside = np.abs(np.asarray(cols) - cx)[None, :] <= half[:, None]
+    return inside.view(np.uint8) * np.uint8(255)
+
+class MaskCache:
+    """Yumuşatılmış seçim maskelerinin bayt sınırlı LRU önbelleği.
+
+    Anahtar (yükseklik, genişlik, yumuşatma) olup değer tek kanallı uint8 maskedir
+    (piksel başına 1 bayt, salt okunur). Aynı boyutta tekrarlanan seçimlerde elips
+    çizimi ve Gauss yumuşatması yeniden yapılmaz. Canlı önizleme gibi her seferinde
+    farklı boyutta gelen maskeler store=False ile saklanmadan üretilir.
+    """
+
+    def __init__(self, budget_bytes=32 * 1024 * 1024):
+        self.budget_bytes = int(budget_bytes)
+        self._items = OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.Lock()
+
+    def mask(self, h, w, selection_type, feather, store=True):
+        # Dikdörtgen maske her yerde 255'tir (yumuşatma kenarda yansıdığı için de
+        # değişmez); bu durumda karışıma gerek yoktur ve None döner
+        if selection_type != "oval":
+            return None
+        key = (h, w, feather)
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                return self._items[key]
+        mask = oval_mask(h, w, np.arange(h), np.arange(w))
+        if feather > 0:
+            mask = cv2.GaussianBlur(mask, (0, 0), sigmaX=feather, sigmaY=feather)
+        if not store:
+            return mask
+        mask.flags.writeable = False
+        with self._lock:
+            if key not in self._items:
+                self._items[key] = mask
+                self._nbytes += mask.nbytes
+            while self._nbytes > self.budget_bytes and len(self._items) > 1:
+                _, old = self._items.popitem(last=False)
+                self._nbytes -= old.nbytes
+        return mask
+
+MASK_CACHE = MaskCache()
+
+def blend_masked(dst, src, mask):
+    # dst = (src * m + dst * (255 - m)) / 255, yerinde ve sabit noktalı: mask uint8, iki
+    # ölçekli çarpım ve toplama; kayan nokta ağırlık ya da görüntü kopyası oluşmaz
+    # (kayan noktalı karışımdan en fazla 1 birim fark). mask None ise src doğrudan kopyalanır.
+    if mask is None:
+        dst[...] = src
+        return dst
+    if dst.ndim == 3 and dst.shape[2] > 1:
+        mask = cv2.merge([mask] * dst.shape[2])
+    part = cv2.multiply(src, mask, scale=1.0 / 255)
+    cv2.multiply(dst, cv2.bitwise_not(mask), dst=dst, scale=1.0 / 255)
+    cv2.add(dst, part, dst=dst)
+    return dst
+
+# -------------------------------------------------------------
+# Bulanıklaştırma motorları
+# -------------------------------------------------------------
+# gaussian: cv2.GaussianBlur (ayrılabilir iki geçiş, birebir sonuç)
+# box:      eşdeğer sigmalı üç kutu filtresi; maliyet çekirdek boyutundan bağımsız
+# pyramid:  küçült → küçük çekirdekle bulanıklaştır → büyüt; büyük çekirdeklerde en hızlısı
+# auto:     küçük çekirdekte gaussian, büyükte pyramid
+BLUR_BACKENDS = ("auto", "gaussian", "box", "pyramid")
+AUTO_BLUR_MAX_GAUSSIAN_K = 21
+
+def _gaussian_sigma(k):
+    # OpenCV'nin sigma=0 verildiğinde k'dan türettiği değer
+    return 0.3 * ((k - 1) * 0.5 - 1) + 0.8
+
+def resolve_blur_backend(k, backend="auto"):
+    if backend not in BLUR_BACKENDS or backend == "auto":
+        return "gaussian" if k <= AUTO_BLUR_MAX_GAUSSIAN_K else "pyramid"
+    return backend
+
+def _box_sizes(sigma, n=3):
+    # n kutu filtresi ile verilen sigmaya en yakın tek genişlikler
+    ideal = math.sqrt(12 * sigma * sigma / n + 1)
+    wl = int(ideal)
+    if wl % 2 == 0:
+        wl -= 1
+    wl = max(1, wl)
+    wu = wl + 2
+    m = round((12 * sigma * sigma - n * wl * wl - 4 * n * wl - 3 * n) / (-4 * wl - 4))
+    return [wl if i < m else wu for i in range(n)]
+
+def _pyramid_factor(sigma):
+    # Küçük görüntüde sigma 2 pikselin altına düşmeyecek en büyük 2'nin kuvveti
+    f = 1
+    while sigma / (f * 2) >= 2.0:
+        f *= 2
+    return f
+
+def _blur_pad(k, backend):
+    pad = k // 2 + 1
+    if backend == "pyramid":
+        pad += _pyramid_factor(_gaussian_sigma(k))
+    return pad
+
+@profiled("core.blur_image")
+def blur_image(img, k, backend="gaussian"):
+    backend = resolve_blur_backend(k, backend)
+    sigma = _gaussian_sigma(k)
+    if backend == "box":
+        out = img
+        for size in _box_sizes(sigma):
+            out = cv2.blur(out, (size, size), borderType=cv2.BORDER_REFLECT_101)
+        return out
+    if backend == "pyramid":
+        f = _pyramid_factor(sigma)
+        h, w = img.shape[:2]
+        if f > 1 and min(h, w) >= f * 4:
+            small = cv2.resize(img, (max(1, w // f), max(1, h // f)), interpolation=cv2.INTER_AREA)
+            small = cv2.GaussianBlur(small, (0, 0), sigma / f)
+            return cv2.resize(small, (w, h), interpolation=cv2.INTER_LINEAR)
+    return cv2.GaussianBlur(img, (k, k), 0)
+
+def _processed_roi(image, box, effect_type, blur_value, pixel_value, blur_backend):
+    x1, y1, x2, y2 = box
+    if effect_type == "blur":
+        # Bölge çevresindeki bağlamla birlikte bulanıklaştırılır; kenarlar yansıtılmış
+        # pikseller yerine gerçek komşularla karışır
+        k = int(blur_value); k = k if k % 2 == 1 else k + 1
+        backend = resolve_blur_backend(k, blur_backend)
+        pad = _blur_pad(k, backend)
+        H, W = image.shape[:2]
+        cx1, cy1 = max(0, x1 - pad), max(0, y1 - pad)
+        cx2, cy2 = min(W, x2 + pad), min(H, y2 + pad)
+        blurred = blur_image(image[cy1:cy2, cx1:cx2], k, backend)
+        return blurred[y1 - cy1:y2 - cy1, x1 - cx1:x2 - cx1]
+    return apply_pixelate(image[y1:y2, x1:x2], int(pixel_value))
+
+# Bundan büyük bölgeler döşeme döşeme işlenir (maske de döşeme başına hesaplanır)
+TILED_REGION_PIXELS = 4096 * 4096
+
+def _reflect101(idx, n):
+    # cv2.BORDER_REFLECT_101 dizin eşlemesi (GaussianBlur'un varsayılan kenarı)
+    if n == 1:
+        return np.zeros_like(idx)
+    period = 2 * (n - 1)
+    idx = np.abs(idx) % period
+    return np.where(idx >= n, period - idx, idx)
+
+def _mask_tile(h, w, selection_type, feather, tx, ty, tw, th):
+    # (h, w) kutusunun oval maskesinin (tx, ty, tw, th) parçası; tam maske üretilmez.
+    # Yumuşatma için parça çevresinde pay bırakılır; kutu dışındaki pay, tam maskedeki
+    # GaussianBlur kenar kuralıyla (yansıtma) doldurulur, böylece MaskCache ile birebir aynıdır
+    if selection_type != "oval":
+        return None
+    pad = int(3 * feather) + 1 if feather > 0 else 0
+    rows = _reflect101(np.arange(ty - pad, ty + th + pad), h)
+    cols = _reflect101(np.arange(tx - pad, tx + tw + pad), w)
+    mask = oval_mask(h, w, rows, cols)
+    if feather > 0:
+        mask = cv2.GaussianBlur(mask, (0, 0), sigmaX=feather, sigmaY=feather)
+    return np.ascontiguousarray(mask[pad:pad + th, pad:pad + tw])
+
+def _region_effect_tiled(image, box, out, effect_type, blur_value, pixel_value,
+                         selection_type, feather, blur_backend, cancel=None):
+    # out: bölgenin (y2-y1, x2-x1) boyutlu hedefi; kaynak image'den bağlamla okunur
+    x1, y1, x2, y2 = box
+    h, w = y2 - y1, x2 - x1
+    if effect_type != "blur":
+        # Blok ızgarası tüm bölge için bir kez küçültülerek çıkarılır (küçük dizi);
+        # döşemeler bu ızgaradan en yakın komşuyla doldurulur, apply_pixelate ile aynı sonuç
+        p = max(1, int(pixel_value))
+        small = cv2.resize(image[y1:y2, x1:x2], (max(1, w // p), max(1, h // p)), interpolation=cv2.INTER_AREA)
+        xmap = (np.arange(w) * small.shape[1] // w).astype(np.intp)
+        ymap = (np.arange(h) * small.shape[0] // h).astype(np.intp)
+    for tx1, ty1, tx2, ty2 in iter_tiles(h, w):
+        check_cancel(cancel)
+        mask = _mask_tile(h, w, selection_type, feather, tx1, ty1, tx2 - tx1, ty2 - ty1)
+        if mask is not None and not mask.any():
+            continue  # oval dışındaki köşe döşemeleri değişmez
+        if effect_type == "blur":
+            processed = _processed_roi(image, (x1 + tx1, y1 + ty1, x1 + tx2, y1 + ty2),
+                                       effect_type, blur_value, pixel_value, blur_backend)
+        else:
+            processed = small[ymap[ty1:ty2][:, None], xmap[tx1:tx2][None, :]]
+        blend_masked(out[ty1:ty2, tx1:tx2], processed, mask)
+    return out
+
+@profiled("core.region_effect_patch")
+def region_effect_patch(image, box, effect_type="blur", blur_value=19, pixel_value=7,
+                        selection_type="oval", feather=8, blur_backend="auto", cache_mask=True,
+                        cancel=None):
+    # Görüntüye dokunmadan efektli bölgenin yeni halini döndürür. cache_mask=False:
+    # maske önbelleğe yazılmaz (sürükleme önizlemesi gibi her seferinde yeni boyutlar).
+    # cancel kurulursa döşemeli yol sıradaki döşemede Cancelled ile durur
+    x1, y1, x2, y2 = box
+    out = snapshot(image[y1:y2, x1:x2])
+    if out.size == 0:
+        return out
+    h, w = out.shape[:2]
+    if h * w > TILED_REGION_PIXELS:
+        return _region_effect_tiled(image, box, out, effect_type, blur_value, pixel_value,
+                                    selection_type, int(feather), blur_backend, cancel)
+    processed = _processed_roi(image, box, effect_type, blur_value, pixel_value, blur_backend)
+    return blend_masked(out, processed, MASK_CACHE.mask(h, w, selection_type, int(feather), store=cache_mask))
+
+def apply_region_effect(image, box, effect_type="blur", blur_value=19, pixel_value=7,
+                        selection_type="oval", feather=8, blur_backend="auto", cancel=None):
+    # box: görüntü pikselinde (x1, y1, x2, y2); görüntü yerinde güncellenir
+    x1, y1, x2, y2 = box
+    roi_original = image[y1:y2, x1:x2]
+    if roi_original.size == 0:
+        return image
+    if roi_original.shape[0] * roi_original.shape[1] > TILED_REGION_PIXELS:
+        # Döşemeler komşularının özgün pikselleriyle bulanıklaşsın diye önce ayrı hedefe yazılır
+        patch = region_effect_patch(image, box, effect_type, blur_value, pixel_value,
+                                    selection_type, feather, blur_backend, cancel=cancel)
+        copy_tiled(patch, roi_original)
+        return image
+    processed = _processed_roi(image, box, effect_type, blur_value, pixel_value, blur_backend)
+    h, w = roi_original.shape[:2]
+    blend_masked(roi_original, processed, MASK_CACHE.mask(h, w, selection_type, int(feather)))
+    return image
+
+@profiled("core.region_set_patches")
+def region_set_patches(image, regions, effect_type="blur", blur_value=19, pixel_value=7,
+                       feather=8, blur_backend="auto", cancel=None):
+    # regions: [((x1, y1, x2, y2), seçim_tipi)]; görüntüye dokunmadan [(kutu, bölge)] döndürür.
+    # Bulanıklık bağlamıyla birlikte çakışan bölgeler tek pencerede toplanır; her pencere
+    # bir kez kopyalanır ve bölgeler çizim sırasıyla işlenir. cancel kurulursa sıradaki
+    # bölgede Cancelled ile durulur
+    if not regions:
+        return []
+    H, W = image.shape[:2]
+    pad = 0
+    if effect_type == "blur":
+        k = int(blur_value); k = k if k % 2 == 1 else k + 1
+        pad = _blur_pad(k, resolve_blur_backend(k, blur_backend))
+
+    def grow(b):
+        return (max(0, b[0] - pad), max(0, b[1] - pad), min(W, b[2] + pad), min(H, b[3] + pad))
+
+    patches = []
+    for window in merge_boxes([grow(b) for b, _ in regions]):
+        wx1, wy1, wx2, wy2 = window
+        members = [(b, shape) for b, shape in regions if _boxes_intersect(grow(b), window)]
+        work = snapshot(image[wy1:wy2, wx1:wx2])
+        for (x1, y1, x2, y2), shape in members:
+            check_cancel(cancel)
+            apply_region_effect(work, (x1 - wx1, y1 - wy1, x2 - wx1, y2 - wy1),
+                                effect_type=effect_type, blur_value=blur_value,
+                                pixel_value=pixel_value, selection_type=shape,
+                                feather=feather, blur_backend=blur_backend, cancel=cancel)
+        ux1 = min(b[0] for b, _ in members); uy1 = min(b[1] for b, _ in members)
+        ux2 = max(b[2] for b, _ in members); uy2 = max(b[3] for b, _ in members)
+        patches.append(((ux1, uy1, ux2, uy2), work[uy1 - wy1:uy2 - wy1, ux1 - wx1:ux2 - wx1]))
+    return patches
+
+# -------------------------------------------------------------
+# Otomatik algılama (KVKK: yüz ve plaka)
+# -------------------------------------------------------------
+# OpenCV ile gelen Haar sınıflandırıcıları kullanılır. Algılama küçültülmüş gri
+# kopyada yapılır; büyük görüntüler örtüşen karolara bölünüp iş parçacıklarında
+# taranır (detectMultiScale GIL'i bırakır). Karolara sığmayacak kadar büyük
+# nesneler için ayrıca yarım çözünürlükte tek bir kaba tarama yapılır.
+DETECT_KINDS = {
+    # tür: (dosya, seçim şekli, minNeighbors, aynalı tarama)
+    "face": ("haarcascade_frontalface_default.xml", "oval", 5, False),
+    "profile": ("haarcascade_profileface.xml", "oval", 5, True),
+    "plate": ("haarcascade_russian_plate_number.xml", "rectangle", 4, False),
+}
+# Profil taraması aynalı geçişle birlikte ön yüzün ~3 katı sürer; istenirse açıkça eklenir
+DEFAULT_DETECT_KINDS = ("face", "plate")
+_CASCADE_LOCAL = threading.local()
+
+def _cascade_path(name):
+    # Paketlenmiş sürümde dosyalar miflon.spec ile "cascades" klasörüne konur;
+    # kaynaktan çalışırken opencv-python ile gelen kopya kullanılır
+    base = getattr(sys, "_MEIPASS", os.path.dirname(os.path.abspath(__file__)))
+    bundled = os.path.join(base, "cascades", name)
+    if os.path.exists(bundled):
+        return bundled
+    data = getattr(cv2, "data", None)
+    if data is None:
+        raise RuntimeError(f"Sınıflandırıcı dosyası bulunamadı: {name}")
+    return os.path.join(data.haarcascades, name)
+
+def _cascade(kind):
+    # CascadeClassifier iş parçacığı güvenli değildir; her iş parçacığı kendi kopyasını tutar
+    cache = getattr(_CASCADE_LOCAL, "cache", None)
+    if cache is None:
+        cache = _CASCADE_LOCAL.cache = {}
+    if kind not in cache:
+        if not hasattr(cv2, "CascadeClassifier"):
+            raise RuntimeError("Bu OpenCV kurulumunda Haar sınıflandırıcıları yok; "
+                               "requirements.txt ile opencv-python 4.x kurun.")
+        path = _cascade_path(DETECT_KINDS[kind][0])
+        clf = cv2.CascadeClassifier(path)
+        if clf.empty():
+            raise RuntimeError(f"Sınıflandırıcı yüklenemedi: {path}")
+        cache[kind] = clf
+    return cache[kind]
+
+def _detect_tile(gray, kind, min_size, max_size=None):
+    _, _, neighbors, mirrored = DETECT_KINDS[kind]
+    clf = _cascade(kind)
+    kw = dict(scaleFactor=1.1, minNeighbors=neighbors, minSize=(min_size, min_size))
+    if max_size:
+        kw["maxSize"] = (max_size, max_size)
+    found = [tuple(int(v) for v in r) for r in clf.detectMultiScale(gray, **kw)]
+    if mirrored:
+        # Profil sınıflandırıcısı tek yöne bakan yüzleri bulur; diğer yön aynalanarak taranır
+        w = gray.shape[1]
+        for x, y, rw, rh in clf.detectMultiScale(cv2.flip(gray, 1), **kw):
+            found.append((int(w - x - rw), int(y), int(rw), int(rh)))
+    return found
+
+def _dedupe_boxes(boxes, overlap=0.5):
+    # Karo sınırlarında ve farklı türlerde tekrar bulunan kutular: küçük kutunun
+    # belirtilen oranı büyükle örtüşüyorsa ikisi birleştirilir
+    kept = []
+    for box, shape in sorted(boxes, key=lambda b: -(b[0][2] - b[0][0]) * (b[0][3] - b[0][1])):
+        x1, y1, x2, y2 = box
+        area = max(1, (x2 - x1) * (y2 - y1))
+        for i, (k, kshape) in enumerate(kept):
+            iw = min(x2, k[2]) - max(x1, k[0])
+            ih = min(y2, k[3]) - max(y1, k[1])
+            if iw > 0 and ih > 0 and iw * ih >= overlap * area:
+                kept[i] = ((min(x1, k[0]), min(y1, k[1]), max(x2, k[2]), max(y2, k[3])), kshape)
+                break
+        else:
+            kept.append((box, shape))
+    return kept
+
+@profiled("core.detect_regions")
+def detect_regions(image, kinds=DEFAULT_DETECT_KINDS, max_side=1280, tile=640,
+                   margin=0.15, workers=None, cancel=None):
+    # Döndürür: [((x1, y1, x2, y2), seçim_tipi)] (görüntü pikselinde, region_set_patches girdisi)
+    kinds = [k for k in kinds if k in DETECT_KINDS]
+    if not kinds:
+        return []
+    H, W = image.shape[:2]
+    scale = min(1.0, float(max_side) / max(H, W))
+    small = image if scale >= 1.0 else cv2.resize(image, (max(1, int(W * scale)), max(1, int(H * scale))),
+                                                  interpolation=cv2.INTER_AREA)
+    gray = cv2.equalizeHist(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small)
+    sh, sw = gray.shape[:2]
+    min_size = 20
+
+    tasks = []
+    if max(sh, sw) <= tile * 1.5:
+        tasks = [(0, 0, 1, gray, kind, min_size, None) for kind in kinds]
+    else:
+        # Örtüşme, karolarda aranan en büyük nesne boyutudur; daha büyükleri kaba taramaya kalır
+        overlap = tile // 4
+        step = tile - overlap
+        for ty in range(0, max(1, sh - overlap), step):
+            for tx in range(0, max(1, sw - overlap), step):
+                sub = gray[ty:ty + tile, tx:tx + tile]
+                tasks.extend((tx, ty, 1, sub, kind, min_size, overlap) for kind in kinds)
+        coarse = cv2.resize(gray, (sw // 2, sh // 2), interpolation=cv2.INTER_AREA)
+        tasks.extend((0, 0, 2, coarse, kind, max(min_size, overlap // 3), None) for kind in kinds)
+
+    def run(task):
+        check_cancel(cancel)
+        ox, oy, f, g, kind, lo, hi = task
+        return [((ox + x * f, oy + y * f, w * f, h * f), kind)
+                for x, y, w, h in _detect_tile(g, kind, lo, hi)]
+
+    if workers is None:
+        workers = min(len(tasks), os.cpu_count() or 1, 8)
+    if workers <= 1:
+        results = [run(t) for t in tasks]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as ex:
+            results = list(ex.map(run, tasks))
+
+    boxes = []
+    for found in results:
+        for (x, y, w, h), kind in found:
+            # Küçük görüntüden tam çözünürlüğe; kenar payı saç/çene ve plaka çerçevesini de kapsar
+            mx, my = w * margin, h * margin
+            x1 = max(0, int((x - mx) / scale)); y1 = max(0, int((y - my) / scale))
+            x2 = min(W, int(round((x + w + mx) / scale))); y2 = min(H, int(round((y + h + my) / scale)))
+            if x2 - x1 >= 3 and y2 - y1 >= 3:
+                boxes.append(((x1, y1, x2, y2), DETECT_KINDS[kind][1]))
+    return _dedupe_boxes(boxes)
+
+def crop_rect(W, H, ratio, crop_x=0, crop_y=0):
+    # Oran için en büyük kırpma alanı; ofsetler görüntü sınırına kıstırılır
+    if ratio is None:
+        return 0, 0, W, H
+    if W / H > ratio:
+        new_h, new_w = H, int(H * ratio)
+    else:
+        new_w, new_h = W, int(W / ratio)
+    crop_x = max(0, min(int(crop_x), W - new_w))
+    crop_y = max(0, min(int(crop_y), H - new_h))
+    return crop_x, crop_y, new_w, new_h
+
+FONT_CANDIDATES = ["arial.ttf", "DejaVuSans.ttf", "/System/Library/Fonts/Supplemental/Arial.ttf"]
+
+@functools.lru_cache(maxsize=1)
+def _resolve_font_path():
+    # Dosya sistemi bir kez yoklanır; bulunamazsa varsayılan bitmap yazı tipi kullanılır
+    for fp in FONT_CANDIDATES:
+        try:
+            ImageFont.truetype(fp, 12)
+            return fp
+        except Exception:
+            continue
+    return None
+
+@functools.lru_cache(maxsize=32)
+def load_font(size):
+    fp = _resolve_font_path()
+    if fp is None:
+        return ImageFont.load_default()
+    return ImageFont.truetype(fp, size)
+
+def measure_text(draw, text, font):
+    try:
+        l, t, r, b = draw.textbbox((0, 0), text, font=font)
+        return r - l, b - t
+    except Exception:
+        try:
+            return draw.textsize(text, font=font)
+        except Exception:
+            return len(text) * font.size, font.size
+
+def _premultiply(layer):
+    # RGBA katman → (önçarpılmış BGR uint16, 255 - alfa uint16); karışım tek adımda yapılır
+    rgba = np.asarray(layer)
+    alpha = rgba[..., 3:4].astype(np.uint16)
+    premul = cv2.cvtColor(np.ascontiguousarray(rgba[..., :3]), cv2.COLOR_RGB2BGR).astype(np.uint16) * alpha
+    premul.flags.writeable = False
+    inv_alpha = 255 - alpha
+    inv_alpha.flags.writeable = False
+    return premul, inv_alpha
+
+@functools.lru_cache(maxsize=8)
+def _logo_sprite(logo_path, mtime_ns, target_w, opacity):
+    logo = Image.open(logo_path).convert("RGBA")
+    ratio = target_w / logo.width
+    target_h = max(1, int(logo.height * ratio))
+    logo = logo.resize((target_w, target_h), Image.Resampling.LANCZOS)
+    if opacity < 100:
+        data = np.array(logo)
+        data[..., 3] = (data[..., 3].astype(np.float32) * (opacity/100.0)).astype(np.uint8)
+        logo = Image.fromarray(data, mode="RGBA")
+    # Tam kare katmana maskeyle yapıştırmanın sonucu, yalnızca logo boyutunda
+    layer = Image.new("RGBA", logo.size, (0,0,0,0))
+    layer.paste(logo, (0, 0), mask=logo)
+    return _premultiply(layer)
+
+@functools.lru_cache(maxsize=64)
+def _text_layout(text, w, h, text_size_pct):
+    # (yazı boyutu, textbbox sol/üst, genişlik, yükseklik)
+    draw = ImageDraw.Draw(Image.new("RGBA", (1, 1)))
+    desired_h = max(8, int(h * (text_size_pct / 100.0)))
+    font_size = max(8, desired_h)
+    font = load_font(font_size)
+    tw, th = measure_text(draw, text, font)
+    max_w = int(w * 0.94)
+    if tw > max_w and tw > 0:
+        scale = max_w / tw
+        font_size = max(8, int(font_size * scale))
+        font = load_font(font_size)
+        tw, th = measure_text(draw, text, font)
+    try:
+        l, t = draw.textbbox((0, 0), text, font=font)[:2]
+    except Exception:
+        l, t = 0, 0
+    return font_size, l, t, tw, th
+
+@functools.lru_cache(maxsize=64)
+def _text_sprite(text, font_size, l, t, tw, th, fill):
+    layer = Image.new("RGBA", (max(1, tw), max(1, th)), (0,0,0,0))
+    ImageDraw.Draw(layer).text((-l, -t), text, font=load_font(font_size), fill=fill)
+    return _premultiply(layer)
+
+def watermark_sprites(w, h, wm, warn=None):
+    # w×h görüntü için [(x, y, önçarpılmış BGR, 255-alfa)]; döşenecek her parça önbellekten gelir
+    enable_text = wm.get("enable_text", True)
+    enable_logo = wm.get("enable_logo", True)
+    text = wm.get("text", DEFAULT_WM_TEXT).strip()
+    text_size_pct = int(wm.get("text_size_percent", 2))
+    opacity = int(wm.get("opacity", 40))
+    color = wm.get("color", [255, 255, 255])
+    text_color = (int(color[0]), int(color[1]), int(color[2]))
+    logo_path = wm.get("logo_path", "")
+    logo_size_pct = int(wm.get("logo_size_percent", 15))
+    sprites = []
+
+    # Logo merkez
+    if enable_logo and logo_path and os.path.isfile(logo_path):
+        try:
+            target_w = max(1, int(w * (logo_size_pct / 100.0)))
+            premul, inv = _logo_sprite(logo_path, os.stat(logo_path).st_mtime_ns, target_w, opacity)
+            lh, lw = premul.shape[:2]
+            sprites.append(((w - lw)//2, (h - lh)//2, premul, inv))
+        except Exception as e:
+            if warn:
+                warn(f"Logo uygulanamadı: {e}")
+
+    # Metin sağ alt
+    if enable_text and text:
+        font_size, l, t, tw, th = _text_layout(text, w, h, text_size_pct)
+        col = (text_color[0], text_color[1], text_color[2], int(255 * (opacity/100.0)))
+        premul, inv = _text_sprite(text, font_size, l, t, tw, th, col)
+        margin = 12
+        sprites.append((w - tw - margin + l, h - th - margin + t, premul, inv))
+    return sprites
+
+def blend_sprite(image, x, y, premul, inv_alpha):
+    # Parçayı (x, y) konumuna yerinde karıştırır; değişen kutuyu ya da None döndürür
+    H, W = image.shape[:2]
+    sh, sw = premul.shape[:2]
+    x1, y1, x2, y2 = max(0, x), max(0, y), min(W, x + sw), min(H, y + sh)
+    if x2 <= x1 or y2 <= y1:
+        return None
+    sx, sy = x1 - x, y1 - y
+    roi = image[y1:y2, x1:x2]
+    acc = roi.astype(np.uint16)
+    acc *= inv_alpha[sy:sy + (y2 - y1), sx:sx + (x2 - x1)]
+    acc += premul[sy:sy + (y2 - y1), sx:sx + (x2 - x1)]
+    acc += 127
+    acc //= 255
+    roi[...] = acc
+    return x1, y1, x2, y2
+
+def _boxes_intersect(a, b):
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+def merge_boxes(boxes):
+    # Kesişen kutular birleşimleriyle değiştirilir
+    merged = [tuple(b) for b in boxes]
+    changed = True
+    while changed:
+        changed = False
+        for i in range(len(merged)):
+            for j in range(i + 1, len(merged)):
+                if _boxes_intersect(merged[i], merged[j]):
+                    a, b = merged[i], merged.pop(j)
+                    merged[i] = (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+                    changed = True
+                    break
+            if changed:
+                break
+    return merged
+
+@profiled("core.watermark_patches")
+def watermark_patches(image, wm, warn=None, cancel=None):
+    # Görüntüye dokunmadan [(kutu, filigranlı bölge)] döndürür; yalnızca logo ve
+    # metnin kutuları işlenir, çakışan parçalar tek kutuda sırayla karıştırılır
+    H, W = image.shape[:2]
+    placed = []
+    for x, y, premul, inv in watermark_sprites(W, H, wm, warn=warn):
+        sh, sw = premul.shape[:2]
+        box = (max(0, x), max(0, y), min(W, x + sw), min(H, y + sh))
+        if box[2] > box[0] and box[3] > box[1]:
+            placed.append((box, x, y, premul, inv))
+    patches = []
+    for box in merge_boxes([p[0] for p in placed]):
+        check_cancel(cancel)
+        x1, y1, x2, y2 = box
+        roi = image[y1:y2, x1:x2].copy()
+        for b, x, y, premul, inv in placed:
+            if _boxes_intersect(b, box):
+                blend_sprite(roi, x - x1, y - y1, premul, inv)
+        patches.append((box, roi))
+    return patches
+
+def apply_watermark(image, wm, warn=None, cancel=None):
+    # wm: yapılandırmadaki "watermark" bölümü; görüntü yerinde güncellenir.
+    # Değişen kutuların listesini döndürür.
+    patches = watermark_patches(image, wm, warn=warn, cancel=cancel)
+    for (x1, y1, x2, y2), roi in patches:
+        image[y1:y2, x1:x2] = roi
+    return [box for box, _ in patches]
+
+def sanitize_filename(name: str):
+    # Windows yasak karakterleri temizle
+    return re.sub(r'[\\/:*?"<>|]', '_', name)
+
+_TEMPLATE_TOKEN = re.compile(r"\{(name|date|time|w|h|ext|index)(:[^}]*)?\}")
+
+class NameTemplate:
+    """Derlenmiş ad şablonu: sabit metin ve (alan, dolgu) parçalarının listesi.
+
+    Düzenli ifade yalnızca derlemede çalışır; render() parçaları birleştirir.
+    index=None verilirse indeksin yerine "\\0" konur; bu, indeks dışındaki
+    alanları aynı olan adlar için ortak bir anahtar olarak kullanılır.
+    """
+
+    def __init__(self, tpl):
+        self.template = tpl
+        self.parts = []
+        pos = 0
+        for m in _TEMPLATE_TOKEN.finditer(tpl):
+            if m.start() > pos:
+                self.parts.append(tpl[pos:m.start()])
+            pad = 0
+            if m.group(1) == "index" and m.group(2):
+                pm = re.match(r":0(\d+)d", m.group(2))
+                pad = int(pm.group(1)) if pm else 0
+            self.parts.append((m.group(1), pad))
+            pos = m.end()
+        if pos < len(tpl):
+            self.parts.append(tpl[pos:])
+        self.fields = {p[0] for p in self.parts if isinstance(p, tuple)}
+        self.uses_index = "index" in self.fields
+
+    def render(self, name, index, w, h, ext):
+        now = datetime.now() if ("date" in self.fields or "time" in self.fields) else None
+        out = []
+        for part in self.parts:
+            if isinstance(part, str):
+                out.append(part)
+                continue
+            field, pad = part
+            if field == "name":
+                out.append(name)
+            elif field == "date":
+                out.append(now.strftime("%Y%m%d"))
+            elif field == "time":
+                out.append(now.strftime("%H%M%S"))
+            elif field == "w":
+                out.append(str(w))
+            elif field == "h":
+                out.append(str(h))
+            elif field == "ext":
+                out.append(ext)
+            elif index is None:
+                out.append("\0")
+            else:
+                out.append(str(index).zfill(pad) if pad > 0 else str(index))
+        return "".join(out)
+
+@functools.lru_cache(maxsize=64)
+def compile_name_template(tpl):
+    return NameTemplate(tpl)
+
+def render_name_template(tpl, name, index, w, h, ext):
+    # {index} veya {index:03d} gibi
+    return compile_name_template(tpl).render(name, index, w, h, ext)
+
+def output_filename(tpl, name, index, w, h, ext):
+    # tpl: şablon metni ya da NameTemplate; uzantı eklenmiş, temizlenmiş dosya adı
+    if not isinstance(tpl, NameTemplate):
+        tpl = compile_name_template(tpl)
+    return sanitize_filename(tpl.render(name, index, w, h, ext)) + f".{ext}"
+
+class OutputIndex:
+    """Çıktı klasörlerindeki dosya adlarının bellek içi dizini.
+
+    Klasör ilk kullanımda tek bir os.scandir ile okunur, sonra yalnızca bellekte
+    sorgulanır. Klasörün değişme zamanı dışarıdan bir değişiklik gösterirse
+    yeniden okunur; kendi yazmalarımız reserve()/release() ile bildirildiğinden
+    yeniden taramaya yol açmaz. next_free() dolu ardışık indeks aralığını ipucu
+    olarak sakladığından sıradaki boş indeks her seferinde baştan aranmaz.
+    """
+
+    def __init__(self):
+        self._folders = {}   # klasör -> {"names": küme, "mtime": ns, "pending": sayı}
+        self._hints = {}     # (klasör, anahtar) -> (ilk dolu, ilk boş)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(folder):
+        return os.path.normcase(os.path.abspath(folder or "."))
+
+    @staticmethod
+    def _mtime(folder):
+        try:
+            return os.stat(folder or ".").st_mtime_ns
+        except OSError:
+            return None
+
+    def _entry(self, folder):
+        key = self._key(folder)
+        entry = self._folders.get(key)
+        if entry is not None and (entry["pending"] or entry["mtime"] == self._mtime(folder)):
+            return key, entry
+        names = set()
+        try:
+            with os.scandir(folder or ".") as it:
+                names = {os.path.normcase(e.name) for e in it}
+        except OSError:
+            pass
+        entry = self._folders[key] = {"names": names, "mtime": self._mtime(folder), "pending": 0}
+        self._hints = {k: v for k, v in self._hints.items() if k[0] != key}
+        return key, entry
+
+    def exists(self, path):
+        with self._lock:
+            _, entry = self._entry(os.path.dirname(path))
+            return os.path.normcase(os.path.basename(path)) in entry["names"]
+
+    def next_free(self, folder, make_name, start=1):
+        # make_name(i) -> dosya adı; start'tan büyük/eşit ilk kullanılmayan indeks
+        with self._lock:
+            key, entry = self._entry(folder)
+            names = entry["names"]
+            hint_key = (key, make_name(None))
+            lo, hi = self._hints.get(hint_key, (start, start))
+            if not lo <= start <= hi:
+                lo = hi = start
+            i = hi
+            while os.path.normcase(make_name(i)) in names:
+                i += 1
+            self._hints[hint_key] = (lo, i)
+            return i
+
+    def reserve(self, path):
+        # Kayıt sıraya alınırken ad hemen dolu sayılır; yazma bitince release() çağrılır
+        with self._lock:
+            _, entry = self._entry(os.path.dirname(path))
+            entry["names"].add(os.path.normcase(os.path.basename(path)))
+            entry["pending"] += 1
+
+    def release(self, path, ok=True):
+        with self._lock:
+            entry = self._folders.get(self._key(os.path.dirname(path)))
+            if entry is None:
+                return
+            entry["pending"] = max(0, entry["pending"] - 1)
+            if not ok:
+                entry["mtime"] = None  # emin değiliz; bir sonraki sorguda yeniden okunur
+            elif not entry["pending"] and entry["mtime"] is not None:
+                entry["mtime"] = self._mtime(os.path.dirname(path))
+
+OUTPUT_INDEX = OutputIndex()
+
+def _area_weights(d1, d2, scale, src_len):
+    # INTER_AREA ile aynı alan ağırlıkları: hedef j, kaynakta [j*scale, (j+1)*scale) aralığını örter
+    s1 = int(np.floor(d1 * scale))
+    s2 = min(src_len, int(np.ceil(d2 * scale)))
+    j = np.arange(d1, d2, dtype=np.float64)[:, None]
+    i = np.arange(s1, s2, dtype=np.float64)[None, :]
+    overlap = np.minimum((j + 1) * scale, i + 1) - np.maximum(j * scale, i)
+    return s1, s2, (np.clip(overlap, 0, None) / scale).astype(np.float32)
+
+def _downsample2(src):
+    # Tam 2x2 ortalamasıyla yarıya küçültür; diskteki büyük kaynaklarda döşeme döşeme
+    # yapılır ve büyük sonuç da diske yazılır (2x2 bloklar birbirinden bağımsızdır)
+    h2, w2 = max(1, src.shape[0] // 2), max(1, src.shape[1] // 2)
+    if not is_disk_backed(src):
+        return cv2.resize(src[:h2 * 2, :w2 * 2], (w2, h2), interpolation=cv2.INTER_AREA)
+    shape = (h2, w2) + src.shape[2:]
+    nbytes = h2 * w2 * (src.shape[2] if src.ndim == 3 else 1)
+    dst = scratch_array(shape, src.dtype) if nbytes > SPILL_BYTES else np.empty(shape, src.dtype)
+    for x1, y1, x2, y2 in iter_tiles(h2, w2, TILE_SIZE):
+        dst[y1:y2, x1:x2] = cv2.resize(src[y1 * 2:y2 * 2, x1 * 2:x2 * 2], (x2 - x1, y2 - y1),
+                                       interpolation=cv2.INTER_AREA)
+    return dst
+
+class PreviewPyramid:
+    """Ekran önizlemesi için 2'nin kuvveti ölçekli küçültülmüş kopyalar.
+
+    0. seviye görüntünün kendisidir (kopya yapılmaz); her seviye bir öncekinin
+    yarısıdır. Ekrana çizim en yakın büyük seviyeden örneklenir, böylece
+    maliyet kaynak görüntünün boyutundan bağımsız kalır. Seviyeler tam 2x2
+    ortalamasıyla üretildiği için küçük bir bölge yerinde güncellenebilir.
+    """
+
+    def __init__(self, image, min_side=256):
+        self.levels = [image]
+        while True:
+            h, w = self.levels[-1].shape[:2]
+            if max(w, h) // 2 < min_side:
+                break
+            self.levels.append(_downsample2(self.levels[-1]))
+
+    @property
+    def source(self):
+        return self.levels[0]
+
+    def level_index_for(self, width, height):
+        # İstenen boyuttan küçük olmayan en küçük seviye
+        for k in range(len(self.levels) - 1, -1, -1):
+            h, w = self.levels[k].shape[:2]
+            if w >= width and h >= height:
+                return k
+        return 0
+
+    def level_for(self, width, height):
+        return self.levels[self.level_index_for(width, height)]
+
+    @profiled("display.pyramid_render")
+    def render(self, width, height):
+        # (width, height) boyutunda RGB dizi döndürür
+        level = self.level_for(width, height)
+        if level.shape[1] != width or level.shape[0] != height:
+            level = cv2.resize(level, (width, height), interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(level, cv2.COLOR_BGR2RGB)
+
+    def update_region(self, image, box):
+        # image: aynı boyutta yeni/yerinde düzenlenmiş kaynak; box: değişen alan (x1, y1, x2, y2)
+        self.levels[0] = image
+        x1, y1, x2, y2 = box
+        for k in range(1, len(self.levels)):
+            prev, cur = self.levels[k - 1], self.levels[k]
+            h, w = cur.shape[:2]
+            x1, y1 = x1 // 2, y1 // 2
+            x2, y2 = min(w, (x2 + 1) // 2), min(h, (y2 + 1) // 2)
+            if x2 <= x1 or y2 <= y1:
+                break
+            cur[y1:y2, x1:x2] = cv2.resize(prev[y1 * 2:y2 * 2, x1 * 2:x2 * 2], (x2 - x1, y2 - y1),
+                                           interpolation=cv2.INTER_AREA)
+
+    def render_region(self, width, height, box):
+        # render(width, height) çıktısının box'a karşılık gelen parçası: (dx, dy, RGB) veya None
+        k = self.level_index_for(width, height)
+        level = self.levels[k]
+        lh, lw = level.shape[:2]
+        f = 1 << k
+        x1, y1, x2, y2 = box[0] // f, box[1] // f, -(-box[2] // f), -(-box[3] // f)
+        sx, sy = lw / width, lh / height
+        dx1, dy1 = max(0, int(x1 / sx) - 1), max(0, int(y1 / sy) - 1)
+        dx2, dy2 = min(width, int(np.ceil(x2 / sx)) + 1), min(height, int(np.ceil(y2 / sy)) + 1)
+        if dx2 <= dx1 or dy2 <= dy1:
+            return None
+        if lw == width and lh == height:
+            patch = level[dy1:dy2, dx1:dx2]
+        else:
+            ax1, ax2, wx = _area_weights(dx1, dx2, sx, lw)
+            ay1, ay2, wy = _area_weights(dy1, dy2, sy, lh)
+            crop = level[ay1:ay2, ax1:ax2].astype(np.float32)
+            rows = (wy @ crop.reshape(crop.shape[0], -1)).reshape(wy.shape[0], crop.shape[1], -1)
+            patch = np.clip(np.rint(np.matmul(wx[None], rows)), 0, 255).astype(np.uint8)
+        return dx1, dy1, cv2.cvtColor(patch, cv2.COLOR_BGR2RGB)
+
+class EditHistory:
+    """Bayt bütçeli geri al / yinele geçmişi.
+
+    Bölgesel düzenlemelerde yalnızca değişen dikdörtgenin "öteki" hali saklanır:
+    geri alırken görüntüdeki yama kayıttakiyle yer değiştirir, yinelerken yine
+    değişir; böylece her adım tek bir yama kadar yer tutar ve tam kopya gerekmez.
+    Boyutu değiştiren işlemler (kırpma vb.) tüm kareyi anahtar kare olarak tutar.
+    Bütçe aşılınca en eski adımlar düşürülür; son adım her zaman korunur.
+    """
+
+    def __init__(self, budget_bytes=512 * 1024 * 1024):
+        self.budget_bytes = int(budget_bytes)
+        self.undo_stack, self.redo_stack = [], []
+        self.nbytes = 0
+
+    def clear(self):
+        self.undo_stack, self.redo_stack = [], []
+        self.nbytes = 0
+
+    @property
+    def can_undo(self):
+        return bool(self.undo_stack)
+
+    @property
+    def can_redo(self):
+        return bool(self.redo_stack)
+
+    def push_patch(self, box, before):
+        # box: (x1, y1, x2, y2); before: düzenlemeden önceki bölgenin kopyası
+        self.push_patches([(box, before)])
+
+    def push_patches(self, patches):
+        # Tek adımda değişen birden çok bölge: [(box, before), ...]
+        self._push({"patches": [[tuple(box), before] for box, before in patches]})
+
+    def push_frame(self, before):
+        # before: düzenlemeden önceki tüm görüntü (yeni görüntü ayrı bir dizi olmalı)
+        self._push({"frame": before})
+
+    @staticmethod
+    def _entry_bytes(entry):
+        # Diske eşlenmiş kareler/yamalar bellek bütçesinden düşülmez
+        if "frame" in entry:
+            return 0 if is_disk_backed(entry["frame"]) else entry["frame"].nbytes
+        return sum(0 if is_disk_backed(data) else data.nbytes for _, data in entry["patches"])
+
+    def undo(self, image):
+        return self._swap(image, self.undo_stack, self.redo_stack)
+
+    def redo(self, image):
+        return self._swap(image, self.redo_stack, self.undo_stack)
+
+    def _push(self, entry):
+        for old in self.redo_stack:
+            self.nbytes -= self._entry_bytes(old)
+        self.redo_stack = []
+        self.undo_stack.append(entry)
+        self.nbytes += self._entry_bytes(entry)
+        while self.nbytes > self.budget_bytes and len(self.undo_stack) > 1:
+            self.nbytes -= self._entry_bytes(self.undo_stack.pop(0))
+
+    def _swap(self, image, src, dst):
+        # (yeni görüntü, değişen kutuların listesi ya da tüm kare için None) döndürür
+        if not src:
+            return image, None
+        entry = src.pop()
+        # Kayıt artık öteki hali tutar (kırpmada boyut değişir); bütçe ona göre güncellenir
+        self.nbytes -= self._entry_bytes(entry)
+        if "frame" in entry:
+            image, entry["frame"] = entry["frame"], image
+            boxes = None
+        else:
+            # Çakışan yamalar için geri yükleme ters sırada yapılır
+            for patch in reversed(entry["patches"]):
+                x1, y1, x2, y2 = patch[0]
+                current = snapshot(image[y1:y2, x1:x2])
+                image[y1:y2, x1:x2] = patch[1]
+                patch[1] = current
+            entry["patches"].reverse()
+            boxes = [box for box, _ in entry["patches"]]
+        self.nbytes += self._entry_bytes(entry)
+        dst.append(entry)
+        return image, boxes
+
+# ==============================================================================
+# TARİF (recipe) İLE TOPLU İŞLEME (komut satırı: python miflon.py batch ...)
+# ==============================================================================
+# Tarif örneği (koordinatlar 0..1 arası, görüntü boyutuna göre normalize):
+# {
+#     "detect": {"kinds": ["face", "plate"], "max_side": 1280},
+#     "regions": [{"x": 0.40, "y": 0.10, "w": 0.20, "h": 0.25, "shape": "oval"}],
+#     "effect": {"type": "blur", "blur_value": 19, "pixel_value": 7, "feather_value": 8,
+#                "blur_backend": "auto"},
+#     "crop": {"ratio": "16:9", "x": 0.5, "y": 0.5},   // ya da {"box": [x, y, w, h]} (0..1)
+#     "watermark": {"enable_text": true, "text": "...", "opacity": 40},
+#     "save": {"format": "JPG", "jpg_quality": 95, "template": "{name}_{index:03d}", "index": 1,
+#              "target_kb": 800, "allow_downscale": true}
+# }
+# Sıra GUI adımlarıyla aynıdır: (algılama) → bölgeler → kırpma → filigran. Kırpma "x"/"y"
+# değerleri kalan boşluğun oranıdır (0 = sol/üst, 0.5 = orta, 1 = sağ/alt).
+# Bölgeler efekt ayarlarını tek tek de taşıyabilir: "effect", "blur_value",
+# "pixel_value", "feather_value", "blur_backend". "save.target_kb" verilirse JPEG
+# kalitesi dosya bu boyutun altında kalacak en yüksek değere ayarlanır.
+
+def load_recipe(path):
+    with open(path, "r", encoding="utf-8") as f:
+        recipe = json.load(f)
+    if not isinstance(recipe, dict):
+        raise ValueError("Tarif bir JSON nesnesi olmalı.")
+    for r in recipe.get("regions", []):
+        for key in ("x", "y", "w", "h"):
+            if key not in r:
+                raise ValueError(f"Bölge tanımında '{key}' eksik: {r}")
+    return recipe
+
+def recipe_from_ops(ops, save_cfg=None, source_size=None):
+    # Arayüzde uygulanan işlem kaydından çözünürlükten bağımsız bir tarif üretir.
+    # ops: [{"op": "regions"|"crop"|"watermark", "size": (W, H), ...}] (uygulama sırasıyla)
+    # Kırpmadan sonra çizilen bölgeler özgün görüntü koordinatlarına taşınır.
+    # source_size: işlemler küçültülmüş vekilde kaydedildiyse özgün boyut; piksel
+    # cinsinden efekt değerleri (kaynak pikselinde değillerse, bkz. "fx_scale") buna
+    # göre ölçeklenir.
+    # Tarif filigranı her zaman en son uyguladığından, filigrandan sonra yapılan
+    # bölge/kırpma işlemleri aynı sonucu vermez; bu durumda ValueError verilir.
+    if not ops:
+        return {}
+    kinds = [op["op"] for op in ops]
+    if "watermark" in kinds:
+        late = set(kinds[kinds.index("watermark") + 1:]) - {"watermark"}
+        if late:
+            raise ValueError("Filigrandan sonra yapılan bölge/kırpma işlemleri şablona alınamaz "
+                             "(tarifte filigran en son uygulanır). Filigranı en son ekleyin.")
+    W0, H0 = ops[0]["size"]
+    ox, oy, fw, fh = 0, 0, W0, H0
+    regions, crops, recipe = [], [], {}
+    for op in ops:
+        kind = op["op"]
+        if kind == "regions":
+            s = source_size[0] / W0 if source_size else 1.0
+            fx = scale_effect(op["fx"], s / op.get("fx_scale", 1.0))
+            for r in op["regions"]:
+                if r.get("auto"):
+                    # Algılanan bölgeler her dosyada yeniden algılanır
+                    recipe["detect"] = {"kinds": list(op.get("kinds", DEFAULT_DETECT_KINDS))}
+                    recipe["effect"] = {"type": fx["effect_type"], "blur_value": fx["blur_value"],
+                                        "pixel_value": fx["pixel_value"], "feather_value": fx["feather"],
+                                        "blur_backend": fx["blur_backend"]}
+                    continue
+                x1, y1, x2, y2 = r["box"]
+                regions.append({
+                    "x": round((ox + x1) / W0, 6), "y": round((oy + y1) / H0, 6),
+                    "w": round((x2 - x1) / W0, 6), "h": round((y2 - y1) / H0, 6),
+                    "shape": r["shape"], "effect": fx["effect_type"],
+                    "blur_value": fx["blur_value"], "pixel_value": fx["pixel_value"],
+                    "feather_value": fx["feather"], "blur_backend": fx["blur_backend"],
+                })
+        elif kind == "crop":
+            x, y, w, h = op["rect"]
+            ox, oy, fw, fh = ox + x, oy + y, w, h
+            crops.append(op.get("ratio", "original"))
+        elif kind == "watermark":
+            recipe["watermark"] = copy.deepcopy(op["wm"])
+    if regions:
+        recipe["regions"] = regions
+    if len(crops) == 1 and parse_ratio(crops[0]) is not None:
+        recipe["crop"] = {"ratio": crops[0],
+                          "x": round(ox / (W0 - fw), 6) if W0 > fw else 0.5,
+                          "y": round(oy / (H0 - fh), 6) if H0 > fh else 0.5}
+    elif crops:
+        # Art arda kırpmalar tek bir kutuya indirgenir
+        recipe["crop"] = {"box": [round(ox / W0, 6), round(oy / H0, 6), round(fw / W0, 6), round(fh / H0, 6)]}
+    if save_cfg:
+        recipe["save"] = {k: save_cfg[k] for k in ("format", "jpg_quality", "template", "index") if k in save_cfg}
+    return recipe
+
+def region_to_box(region, W, H):
+    x1 = int(round(float(region["x"]) * W))
+    y1 = int(round(float(region["y"]) * H))
+    x2 = int(round((float(region["x"]) + float(region["w"])) * W))
+    y2 = int(round((float(region["y"]) + float(region["h"])) * H))
+    return max(0, x1), max(0, y1), min(W, x2), min(H, y2)
+
+def scale_effect(fx, s):
+    # effect_params() sözlüğünü s kat büyüklükteki görüntüye uyarlar (çekirdek tek kalır)
+    if abs(s - 1.0) < 1e-6:
+        return fx
+    k = max(3, int(round(fx["blur_value"] * s)))
+    return dict(fx, blur_value=k if k % 2 == 1 else k + 1,
+                pixel_value=max(2, int(round(fx["pixel_value"] * s))),
+                feather=max(0, int(round(fx["feather"] * s))))
+
+def _ratio_crop(W, H, ratio, fx, fy):
+    # Oranın en büyük alanı; konum kayma payının kesri (0..1). Tarif (process_image) ve
+    # işlem kaydı (render_ops) aynı hesabı kullanır, böylece ikisi aynı pikselleri keser.
+    _, _, new_w, new_h = crop_rect(W, H, ratio)
+    x, y, new_w, new_h = crop_rect(W, H, ratio, round((W - new_w) * fx), round((H - new_h) * fy))
+    return x, y, x + new_w, y + new_h
+
+def _box_crop(bx, by, bw, bh, W, H):
+    # 0..1 kesirli kutu W×H görüntüde (x1, y1, x2, y2); en az 1 piksel
+    x1, y1 = max(0, min(W - 1, int(round(bx * W)))), max(0, min(H - 1, int(round(by * H))))
+    x2 = max(x1 + 1, min(W, int(round((bx + bw) * W))))
+    y2 = max(y1 + 1, min(H, int(round((by + bh) * H))))
+    return x1, y1, x2, y2
+
+def _scaled_crop(op, W, H):
+    # Kırpma işleminin dikdörtgeni W×H görüntüde (x1, y1, x2, y2)
+    W0, H0 = op["size"]
+    x, y, w, h = op["rect"]
+    ratio = parse_ratio(str(op.get("ratio", "original")))
+    if ratio is not None:
+        return _ratio_crop(W, H, ratio, x / (W0 - w) if W0 > w else 0.5, y / (H0 - h) if H0 > h else 0.5)
+    return _box_crop(x / W0, y / H0, w / W0, h / H0, W, H)
+
+@profiled("core.render_ops")
+def render_ops(image, ops, warn=None, threshold_mp=DEFAULT_TILED_THRESHOLD_MP, cancel=None):
+    # İşlem kaydını görüntüye tek geçişte uygular; görüntü değiştirilmez.
+    # Her işlem kaydedildiği boyuta göre ölçeklenir; böylece aynı kayıt önizleme
+    # vekilinde de, tam çözünürlükte de, başka bir boyutta da oynatılabilir.
+    # Bölge efektinin piksel değerleri kaynak pikselindedir: "fx_scale" kayıttaki bir
+    # pikselin kaç kaynak pikseline denk geldiğidir (yoksa 1, değerler kayıt boyutunda).
+    # Kırpma kopyasız görünümdür ve kopya ilk yazmadan hemen önce, yalnızca o anki
+    # alan için alınır; art arda gelen aynı efektli bölgeler tek region_set_patches
+    # çağrısında birleşir. cancel kurulursa sıradaki adımda Cancelled ile durulur.
+    out, owned = image, False
+    pending, pending_fx = [], None
+
+    def flush():
+        nonlocal out, owned
+        if not pending:
+            return
+        if not owned:
+            out, owned = copy_image(out, threshold_mp), True
+        for (x1, y1, x2, y2), roi in region_set_patches(out, pending, cancel=cancel, **pending_fx):
+            out[y1:y2, x1:x2] = roi
+        pending.clear()
+
+    for op in ops:
+        check_cancel(cancel)
+        H, W = out.shape[:2]
+        sx, sy = W / op["size"][0], H / op["size"][1]
+        kind = op["op"]
+        if kind == "regions":
+            fx = scale_effect(op["fx"], sx / op.get("fx_scale", 1.0))
+            if fx != pending_fx:
+                flush()
+                pending_fx = fx
+            for r in op["regions"]:
+                x1, y1, x2, y2 = r["box"]
+                box = (max(0, int(round(x1 * sx))), max(0, int(round(y1 * sy))),
+                       min(W, int(round(x2 * sx))), min(H, int(round(y2 * sy))))
+                if box[2] - box[0] >= 3 and box[3] - box[1] >= 3:
+                    pending.append((box, r["shape"]))
+        elif kind == "crop":
+            flush()
+            x1, y1, x2, y2 = _scaled_crop(op, W, H)
+            out = out[y1:y2, x1:x2]
+        elif kind == "watermark":
+            flush()
+            if not owned:
+                out, owned = copy_image(out, threshold_mp), True
+            apply_watermark(out, op["wm"], warn=warn, cancel=cancel)
+    flush()
+    return out
+
+class EditGraph:
+    """Kaynak görüntü ve üzerine kaydedilmiş işlemler (yıkıcı olmayan düzenleme).
+
+    Düzenleme sırasında işlemler küçük bir vekilde uygulanır ve kaydedilir; tam
+    çözünürlük yalnızca render() çağrılınca (kaydederken, arka planda) ve tek
+    geçişte üretilir. Sonuç saklanır; aynı nesneden yapılan sonraki istekler
+    yeniden işlemez. shape işlemeden bilinir.
+    """
+
+    def __init__(self, source, ops, threshold_mp=DEFAULT_TILED_THRESHOLD_MP):
+        self.source = source
+        self.ops = copy.deepcopy(list(ops))
+        self.threshold_mp = threshold_mp
+        self._result = None
+        self._lock = threading.Lock()
+
+    @property
+    def shape(self):
+        H, W = self.source.shape[:2]
+        for op in self.ops:
+            if op["op"] == "crop":
+                x1, y1, x2, y2 = _scaled_crop(op, W, H)
+                W, H = x2 - x1, y2 - y1
+        return (H, W) + self.source.shape[2:]
+
+    def render(self, scale=1.0, cancel=None):
+        # scale != 1: kaynak önce küçültülür, kayıt o boyutta oynatılır (saklanmaz).
+        # İptal edilen işleme (Cancelled) saklanmaz; sonraki istek baştan işler
+        if scale != 1.0:
+            h, w = self.source.shape[:2]
+            small = cv2.resize(self.source, (max(1, int(w * scale)), max(1, int(h * scale))),
+                               interpolation=cv2.INTER_AREA)
+            return render_ops(small, self.ops, threshold_mp=self.threshold_mp, cancel=cancel)
+        with self._lock:
+            if self._result is None:
+                self._result = render_ops(self.source, self.ops, threshold_mp=self.threshold_mp,
+                                          cancel=cancel)
+            return self._result
+
+def materialize(image):
+    # Dizi ya da EditGraph; her durumda tam çözünürlüklü dizi döner
+    return image.render() if isinstance(image, EditGraph) else image
+
+def make_proxy(image, max_side):
+    # Uzun kenarı max_side'ı aşmayan düzenleme vekili; küçükse görüntünün kendisi
+    h, w = image.shape[:2]
+    f = max_side / max(h, w)
+    if f >= 1.0:
+        return image
+    return cv2.resize(image, (max(1, int(round(w * f))), max(1, int(round(h * f)))),
+                      interpolation=cv2.INTER_AREA)
+
+@profiled("core.process_image")
+def process_image(image, recipe, warn=None):
+    fx = recipe.get("effect", {})
+    H, W = image.shape[:2]
+    detect = recipe.get("detect")
+    if detect:
+        # Toplu işte süreçler zaten paralel; algılama varsayılan olarak tek iş parçacığında
+        found = detect_regions(image, kinds=detect.get("kinds", DEFAULT_DETECT_KINDS),
+                               max_side=int(detect.get("max_side", 1280)),
+                               workers=int(detect.get("workers", 1)))
+        if found and not image.flags.writeable:
+            image = copy_image(image)
+        for (x1, y1, x2, y2), roi in region_set_patches(
+                image, found,
+                effect_type=fx.get("type", "blur"),
+                blur_value=int(fx.get("blur_value", 19)),
+                pixel_value=int(fx.get("pixel_value", 7)),
+                feather=int(fx.get("feather_value", 8)),
+                blur_backend=fx.get("blur_backend", "auto")):
+            image[y1:y2, x1:x2] = roi
+    # Art arda gelen aynı efektli bölgeler tek geçişte (pencere başına bir kopya) işlenir
+    groups = []
+    for region in recipe.get("regions", []):
+        x1, y1, x2, y2 = region_to_box(region, W, H)
+        if (x2 - x1) < 3 or (y2 - y1) < 3:
+            continue
+        params = dict(
+            effect_type=region.get("effect", fx.get("type", "blur")),
+            blur_value=int(region.get("blur_value", fx.get("blur_value", 19))),
+            pixel_value=int(region.get("pixel_value", fx.get("pixel_value", 7))),
+            feather=int(region.get("feather_value", fx.get("feather_value", 8))),
+            blur_backend=region.get("blur_backend", fx.get("blur_backend", "auto")),
+        )
+        shape = region.get("shape", fx.get("selection_type", "oval"))
+        if groups and groups[-1][0] == params:
+            groups[-1][1].append(((x1, y1, x2, y2), shape))
+        else:
+            groups.append((params, [((x1, y1, x2, y2), shape)]))
+    if groups and not image.flags.writeable:
+        image = copy_image(image)
+    for params, regions in groups:
+        for (x1, y1, x2, y2), roi in region_set_patches(image, regions, **params):
+            image[y1:y2, x1:x2] = roi
+
+    crop = recipe.get("crop")
+    if crop and "box" in crop:
+        x1, y1, x2, y2 = _box_crop(*(float(v) for v in crop["box"]), W, H)
+        image = image[y1:y2, x1:x2]
+    elif crop:
+        ratio = parse_ratio(str(crop.get("ratio", "original")))
+        if ratio is not None:
+            x1, y1, x2, y2 = _ratio_crop(W, H, ratio, float(crop.get("x", 0.5)), float(crop.get("y", 0.5)))
+            image = image[y1:y2, x1:x2]
+
+    wm = recipe.get("watermark")
+    if wm:
+        if not image.flags.writeable:
+            image = copy_image(image)
+        apply_watermark(image, wm, warn=warn)
+    return image
+
+def output_path_for(src_path, size, out_folder, save_cfg, index):
+    # size: kaydedilecek görüntünün (genişlik, yükseklik) değeri
+    fmt = str(save_cfg.get("format", "JPG")).lower()
+    name = os.path.splitext(os.path.basename(src_path))[0]
+    w, h = size
+    tpl = save_cfg.get("template", "{name}_{index:03d}")
+    return os.path.join(out_folder, output_filename(tpl, name, index, w, h, fmt))
+
+def _process_file(job):
+    # Süreç havuzunda çalışır; yalnızca seçilebilir (picklable) veri alır/döner
+    src_path, recipe, out_folder, index, out_name = job
+    t0 = time.perf_counter()
+    warnings = []
+    save_cfg = recipe.get("save", {})
+    # Çıktı önce gizli bir ara dosyaya yazılır, var olan dosyanın üzerine yazılmaz; süreçler
+    # arası çakışmayı publish_once'ın tek adımlı varlık denetimi yakalar. save.overwrite
+    # (komut satırında --overwrite) açıkça verilirse doğrudan yazılır; save.write_once
+    # (izleme kipi) her durumda üzerine yazmaz.
+    no_clobber = bool(save_cfg.get("write_once")) or not save_cfg.get("overwrite")
+
+    def output_path(w, h, i=None):
+        if out_name:
+            return os.path.join(out_folder, out_name)
+        return output_path_for(src_path, (w, h), out_folder, save_cfg, index if i is None else i)
+
+    def staging(path):
+        if not no_clobber:
+            return path
+        return os.path.join(os.path.dirname(path), f".miflon_{os.getpid()}_{os.path.basename(path)}")
+
+    image = load_image_tiled(src_path)
+    image = process_image(image, recipe, warn=warnings.append)
+    target_kb = int(save_cfg.get("target_kb", 0) or 0)
+    if target_kb > 0 and str(save_cfg.get("format", "JPG")).upper() == "JPG":
+        scales = DOWNSCALE_STEPS if save_cfg.get("allow_downscale") else (1.0,)
+        search = JpegSizeSearch(image, workers=1)
+        found = search.find(target_kb * 1024, scales=scales)
+        if found is None:
+            raise IOError(f"{target_kb} KB sınırına sığdırılamadı.")
+        quality, scale, data = found
+        h, w = search.scaled(scale).shape[:2]
+        if scale != 1.0:
+            warnings.append(f"{target_kb} KB için %{int(scale * 100)} ölçeğe küçültüldü (kalite {quality}).")
+        out_path = output_path(w, h)
+        stage = staging(out_path)
+        write_bytes(stage, data)
+    else:
+        h, w = image.shape[:2]
+        out_path = output_path(w, h)
+        stage = staging(out_path)
+        write_image(stage, image, save_cfg.get("jpg_quality", 95))
+    if no_clobber:
+        # Boyuta bağlı ad doluysa sıradaki indeks denenir; önceden ayrılmış ad değişmez
+        tpl = compile_name_template(save_cfg.get("template", "{name}_{index:03d}"))
+        wanted = out_path
+        out_path, index = publish_free(stage, out_folder, lambda i: os.path.basename(output_path(w, h, i)),
+                                       index, tpl.uses_index and not out_name)
+        if out_path != wanted:
+            warnings.append(f"{os.path.basename(wanted)} zaten vardı; {os.path.basename(out_path)} olarak kaydedildi.")
+    return out_path, time.perf_counter() - t0, warnings, index
+
+def list_images(folder, recursive=False):
+    found = []
+    if recursive:
+        for dirpath, _, files in os.walk(folder):
+            found.extend(os.path.join(dirpath, f) for f in files)
+    else:
+        found = [e.path for e in os.scandir(folder) if e.is_file()]
+    return sorted(p for p in found if os.path.splitext(p)[1].lower() in IMAGE_EXTS)
+
+def run_batch(files, recipe, out_folder, workers=None, log=print, progress=None, cancel=None):
+    # progress(bitti, toplam) her dosyadan sonra; cancel (threading.Event) kurulursa
+    # henüz başlamamış dosyalar iptal edilir, çalışanların bitmesi beklenir.
+    # Var olan çıktıların üzerine yalnızca save.overwrite ile yazılır; yoksa o dosya hatalı sayılır.
+    # Döndürür: (başarılı sayısı, [(dosya, hata)], yazılan çıktılarda kullanılan en
+    # büyük indeks ya da hiçbir şey yazılmadıysa None)
+    os.makedirs(out_folder, exist_ok=True)
+    save_cfg = recipe.get("save", {})
+    start_index = int(save_cfg.get("index", 1))
+    tpl = compile_name_template(save_cfg.get("template", "{name}_{index:03d}"))
+    fmt = str(save_cfg.get("format", "JPG")).lower()
+    overwrite = bool(save_cfg.get("overwrite"))
+    jobs, reserved, existing = [], [], []
+    if tpl.fields & {"w", "h"}:
+        # Ad çıktı boyutuna bağlı; yalnızca işlendikten sonra belli olur
+        jobs = [(p, recipe, out_folder, start_index + i, None) for i, p in enumerate(files)]
+    else:
+        # Adlar önceden, klasördeki mevcut dosyalarla çakışmayacak şekilde ayrılır
+        index = start_index
+        for p in files:
+            name = os.path.splitext(os.path.basename(p))[0]
+            make = lambda i, name=name: output_filename(tpl, name, i, 0, 0, fmt)
+            if tpl.uses_index:
+                index = OUTPUT_INDEX.next_free(out_folder, make, index)
+            out_name = make(index)
+            if not tpl.uses_index and OUTPUT_INDEX.exists(os.path.join(out_folder, out_name)):
+                if not overwrite:
+                    existing.append((p, f"Çıktı zaten var, üzerine yazılmadı: {os.path.join(out_folder, out_name)}"))
+                    index += 1
+                    continue
+                log(f"    uyarı: {out_name} zaten var, üzerine yazılacak (--overwrite)")
+            OUTPUT_INDEX.reserve(os.path.join(out_folder, out_name))
+            reserved.append(os.path.join(out_folder, out_name))
+            jobs.append((p, recipe, out_folder, index, out_name))
+            index += 1
+    total = len(jobs) + len(existing)
+    done, failures, skipped = 0, [], 0
+    for src, err in existing:
+        done += 1
+        failures.append((src, err))
+        log(f"[{done}/{total}] HATA {src}: {err}")
+    if existing and progress:
+        progress(done, total)
+    last_index = None
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_process_file, job): job[0] for job in jobs}
+        pending = set(futures)
+        while pending:
+            finished, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                src = futures[fut]
+                if fut.cancelled():
+                    skipped += 1
+                    continue
+                done += 1
+                try:
+                    out_path, dt, warnings, index = fut.result()
+                    last_index = index if last_index is None else max(last_index, index)
+                    log(f"[{done}/{total}] {src} -> {out_path} ({dt:.2f} sn)")
+                    for w in warnings:
+                        log(f"    uyarı: {w}")
+                except Exception as e:
+                    failures.append((src, str(e)))
+                    log(f"[{done}/{total}] HATA {src}: {e}")
+                if progress:
+                    progress(done, total)
+            if cancel is not None and cancel.is_set():
+                for fut in pending:
+                    fut.cancel()
+    failed_srcs = {src for src, _ in failures}
+    for job, path in zip(jobs, reserved):
+        OUTPUT_INDEX.release(path, ok=job[0] not in failed_srcs)
+    elapsed = time.perf_counter() - t0
+    ok = done - len(failures)
+    rate = ok / elapsed if elapsed > 0 else 0.0
+    extra = f", {skipped} iptal" if skipped else ""
+    log(f"Özet: {ok}/{total} başarılı, {len(failures)} hatalı{extra}, {elapsed:.1f} sn ({rate:.2f} dosya/sn)")
+    for src, err in failures:
+        log(f"    {src}: {err}")
+    return ok, failures, last_index
+
+def recipe_from_config(config=None):
+    # Arayüzde kayıtlı ayarlardan tarif: efekt (app), filigran ve kayıt (ad şablonu, biçim)
+    config = config or CONFIG
+    app = config.section("app")
+    recipe = {
+        "effect": {"type": app.get("effect_type", "blur"), "blur_value": int(app.get("blur_value", 19)),
+                   "pixel_value": int(app.get("pixel_value", 7)), "feather_value": int(app.get("feather_value", 8)),
+                   "blur_backend": app.get("blur_backend", "auto")},
+        "save": {k: v for k, v in config.section("save").items()
+                 if k in ("format", "jpg_quality", "template", "index", "target_kb", "allow_downscale")},
+    }
+    if not config.section("save").get("target_enabled", False):
+        recipe["save"].pop("target_kb", None)
+    wm = config.section("watermark")
+    if wm:
+        recipe["watermark"] = wm
+    return recipe
+
+# -------------------------------------------------------------
+# Sıcak klasör (python miflon.py watch ...)
+# -------------------------------------------------------------
+# Girdi klasörü düzenli aralıklarla taranır (stdlib'de taşınabilir bir dosya
+# olayı API'si olmadığından yoklama). Boyutu ve değişme zamanı "settle" saniye
+# boyunca değişmeyen dosya yazılmış sayılır ve sınırlı kuyruğa girer; kuyruktan
+# süreç havuzuna en fazla 2×işçi kadar iş verilir. Çıktılar bir kez yazılır
+# (var olan dosyanın üzerine yazılmaz); işlenen her dosya çıktı klasöründeki
+# defterde (JSON satırları) kayıtlıdır, böylece yeniden başlatınca tekrar işlenmez.
+WATCH_LEDGER = ".miflon_watch.jsonl"
+
+class HotFolderWatcher:
+    """Girdi klasörüne düşen görselleri tarifle işleyen uzun ömürlü döngü.
+
+    stats() üretilen/başarısız dosya sayılarını, kuyruk ve işlemdeki iş sayısını,
+    son dakikadaki ve toplam hızı, ortalama bekleme + işleme süresini verir;
+    makine boyutlandırmak için düzenli olarak günlüğe ve istenirse JSON'a yazılır.
+    """
+
+    def __init__(self, in_folder, recipe, out_folder, workers=None, poll=1.0, settle=2.0,
+                 queue_size=64, recursive=False, stats_path=None, stats_interval=30.0, log=print):
+        if os.path.normcase(os.path.abspath(in_folder)) == os.path.normcase(os.path.abspath(out_folder)):
+            raise ValueError("Girdi ve çıktı klasörü aynı olamaz.")
+        self.in_folder, self.out_folder = in_folder, out_folder
+        self.recipe = copy.deepcopy(recipe)
+        self.recipe.setdefault("save", {})["write_once"] = True
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.poll, self.settle = float(poll), float(settle)
+        self.queue_size = max(1, int(queue_size))
+        self.recursive = recursive
+        self.stats_path, self.stats_interval = stats_path, float(stats_interval)
+        self.log = log
+
+        save_cfg = self.recipe["save"]
+        self.template = compile_name_template(save_cfg.get("template", "{name}_{index:03d}"))
+        self.fmt = str(save_cfg.get("format", "JPG")).lower()
+        self.next_index = int(save_cfg.get("index", 1))
+
+        self.ledger_path = os.path.join(out_folder, WATCH_LEDGER)
+        self.done_keys = set()
+        self.queue = deque()           # (anahtar, yol, bulunma zamanı)
+        self.inflight = {}             # future -> (anahtar, yol, bulunma zamanı, ayrılan yol)
+        self._candidates = {}          # yol -> (boyut, mtime_ns, değişmeden beri)
+        self._rejected = set()         # kuyruk dolu olduğu için beklediği zaten sayılmış yollar
+        self._finished = deque()       # son bitenlerin zamanları (dakikalık hız için)
+        self.counters = {"processed": 0, "failed": 0, "rejected_full": 0}
+        self._latency_sum = 0.0
+        self._t0 = time.monotonic()
+
+    # ----- defter -----
+    @staticmethod
+    def _key(path, size, mtime_ns):
+        return f"{os.path.normcase(os.path.abspath(path))}|{size}|{mtime_ns}"
+
+    def load_ledger(self):
+        try:
+            with open(self.ledger_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        self.done_keys.add(json.loads(line)["key"])
+                    except (ValueError, KeyError, TypeError):
+                        continue  # yarım kalmış son satır
+        except FileNotFoundError:
+            pass
+        return len(self.done_keys)
+
+    def _append_ledger(self, entry):
+        with open(self.ledger_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.done_keys.add(entry["key"])
+
+    # ----- tarama -----
+    def _listing(self):
+        if self.recursive:
+            for dirpath, _, files in os.walk(self.in_folder):
+                for name in files:
+                    yield os.path.join(dirpath, name), name
+        else:
+            with os.scandir(self.in_folder) as it:
+                for e in it:
+                    if e.is_file():
+                        yield e.path, e.name
+
+    def scan(self):
+        # Yeni ve durulmuş dosyaları kuyruğa ekler; kuyruk doluysa sonraki taramaya kalır
+        now = time.monotonic()
+        busy = {item[1] for item in self.queue} | {item[1] for item in self.inflight.values()}
+        seen = set()
+        for path, name in self._listing():
+            if name.startswith((".", "~")) or os.path.splitext(name)[1].lower() not in IMAGE_EXTS:
+                continue
+            if path in busy:
+                continue
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            seen.add(path)
+            key = self._key(path, st.st_size, st.st_mtime_ns)
+            if key in self.done_keys:
+                continue
+            prev = self._candidates.get(path)
+            if prev is None or prev[:2] != (st.st_size, st.st_mtime_ns):
+                self._candidates[path] = (st.st_size, st.st_mtime_ns, now)
+                continue
+            if now - prev[2] < self.settle:
+                continue
+            if len(self.queue) >= self.queue_size:
+                # Aynı dosya her taramada yeniden beklemeye düşer; yalnızca bir kez sayılır
+                if path not in self._rejected:
+                    self._rejected.add(path)
+                    self.counters["rejected_full"] += 1
+                continue
+            del self._candidates[path]
+            self._rejected.discard(path)
+            self.queue.append((key, path, prev[2]))
+        for path in list(self._candidates):
+            if path not in seen:
+                del self._candidates[path]
+                self._rejected.discard(path)
+
+    def _allocate(self, path):
+        # Ad önceden ayrılabiliyorsa (şablonda {w}/{h} yoksa) klasör diziniyle çakışmasız seçilir
+        if self.template.fields & {"w", "h"}:
+            index, out_name = self.next_index, None
+        else:
+            name = os.path.splitext(os.path.basename(path))[0]
+            make = lambda i: output_filename(self.template, name, i, 0, 0, self.fmt)
+            index = self.next_index
+            if self.template.uses_index:
+                index = OUTPUT_INDEX.next_free(self.out_folder, make, index)
+            out_name = make(index)
+            OUTPUT_INDEX.reserve(os.path.join(self.out_folder, out_name))
+        self.next_index = index + 1
+        return index, out_name
+
+    # ----- sayaçlar -----
+    def stats(self):
+        now = time.monotonic()
+        while self._finished and now - self._finished[0] > 60:
+            self._finished.popleft()
+        elapsed = now - self._t0
+        done = self.counters["processed"] + self.counters["failed"]
+        return {
+            "processed": self.counters["processed"],
+            "failed": self.counters["failed"],
+            "queued": len(self.queue),
+            "in_progress": len(self.inflight),
+            "settling": len(self._candidates),
+            "backlog": len(self.queue) + len(self.inflight) + len(self._candidates),
+            "queue_full_skips": self.counters["rejected_full"],
+            "files_per_min_last_minute": len(self._finished),
+            "files_per_s_total": round(done / elapsed, 3) if elapsed > 0 else 0.0,
+            "avg_latency_s": round(self._latency_sum / done, 3) if done else 0.0,
+            "uptime_s": round(elapsed, 1),
+            "workers": self.workers,
+        }
+
+    def report(self):
+        st = self.stats()
+        self.log(f"Durum: {st['processed']} işlendi, {st['failed']} hatalı, birikmiş {st['backlog']} "
+                 f"(kuyruk {st['queued']}, işlemde {st['in_progress']}), son dakika {st['files_per_min_last_minute']} dosya, "
+                 f"ort. {st['avg_latency_s']:.2f} sn")
+        if self.stats_path:
+            try:
+                atomic_write(self.stats_path, json.dumps(st, indent=2).encode("utf-8"))
+            except OSError as e:
+                self.log(f"    uyarı: sayaç dosyası yazılamadı: {e}")
+
+    # ----- döngü -----
+    def _collect(self, finished):
+        for fut in finished:
+            key, path, found_at, reserved = self.inflight.pop(fut)
+            entry = {"key": key, "src": path, "time": datetime.now().isoformat(timespec="seconds")}
+            try:
+                out_path, dt, warnings, index = fut.result()
+                # {w}/{h} adlarında çakışma indeksi ileri almış olabilir
+                self.next_index = max(self.next_index, index + 1)
+                entry.update(ok=True, out=out_path)
+                self.counters["processed"] += 1
+                self.log(f"{path} -> {out_path} ({dt:.2f} sn)")
+                for w in warnings:
+                    self.log(f"    uyarı: {w}")
+            except Exception as e:
+                entry.update(ok=False, error=str(e))
+                self.counters["failed"] += 1
+                self.log(f"HATA {path}: {e}")
+            if reserved:
+                OUTPUT_INDEX.release(reserved, ok=entry["ok"])
+            # Hatalı dosya da deftere yazılır; dosya değişirse (yeni anahtar) yeniden denenir
+            self._append_ledger(entry)
+            self._finished.append(time.monotonic())
+            self._latency_sum += time.monotonic() - found_at
+
+    def run(self, stop=None, once=False):
+        # stop: threading.Event; once: mevcut dosyalar bitince çık
+        stop = stop or threading.Event()
+        os.makedirs(self.out_folder, exist_ok=True)
+        known = self.load_ledger()
+        self.log(f"İzleniyor: {self.in_folder} -> {self.out_folder} ({self.workers} işçi, "
+                 f"kuyruk {self.queue_size}, defterde {known} dosya)")
+        if once:
+            self.settle = 0.0
+        last_report = time.monotonic()
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            while True:
+                if not stop.is_set():
+                    try:
+                        self.scan()
+                        if once:
+                            self.scan()  # durulma süresi yok; ikinci taramada kuyruğa girer
+                    except OSError as e:
+                        self.log(f"    uyarı: girdi klasörü okunamadı: {e}")
+                    while self.queue and len(self.inflight) < 2 * self.workers:
+                        key, path, found_at = self.queue.popleft()
+                        index, out_name = self._allocate(path)
+                        job = (path, self.recipe, self.out_folder, index, out_name)
+                        reserved = os.path.join(self.out_folder, out_name) if out_name else None
+                        self.inflight[pool.submit(_process_file, job)] = (key, path, found_at, reserved)
+                if self.inflight:
+                    finished, _ = wait(set(self.inflight), timeout=self.poll, return_when=FIRST_COMPLETED)
+                    self._collect(finished)
+                elif stop.is_set() or (once and not self.queue and not self._candidates):
+                    break
+                else:
+                    stop.wait(self.poll)
+                if stop.is_set() and not self.inflight:
+                    break
+                if time.monotonic() - last_report >= self.stats_interval:
+                    self.report()
+                    last_report = time.monotonic()
+        self.report()
+        return self.stats()
+
+def parse_detect_kinds(value):
+    # --detect değeri: virgülle ayrılmış algılama türleri; argparse tür dönüştürücüsü
+    kinds = [k.strip() for k in value.split(",") if k.strip()]
+    unknown = [k for k in kinds if k not in DETECT_KINDS]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"Bilinmeyen algılama türü: {', '.join(unknown)}")
+    return kinds
+
+def cli_main(argv=None):
+    parser = argparse.ArgumentParser(prog="miflon", description="Miflon komut satırı (arayüzsüz) modu")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    pb = sub.add_parser("batch", help="Bir klasördeki tüm görsellere tarif uygula")
+    pb.add_argument("--recipe", required=True, help="Tarif JSON dosyası")
+    pb.add_argument("--input", required=True, help="Girdi klasörü")
+    pb.add_argument("--output", required=True, help="Çıktı klasörü")
+    pb.add_argument("--workers", type=int, default=None, help="Süreç sayısı (varsayılan: CPU sayısı)")
+    pb.add_argument("--recursive", action="store_true", help="Alt klasörleri de tara")
+    pb.add_argument("--overwrite", action="store_true",
+                    help="Var olan çıktıların üzerine yaz (varsayılan: o dosya atlanıp hatalı sayılır)")
+    pb.add_argument("--detect", type=parse_detect_kinds, default=None,
+                    help="Otomatik algılanıp efekt uygulanacak türler, ör. face,profile,plate")
+
+    pw = sub.add_parser("watch", help="Bir klasörü izle; gelen görsellere tarif uygula (Ctrl+C ile durur)")
+    pw.add_argument("--input", required=True, help="İzlenecek girdi klasörü")
+    pw.add_argument("--output", required=True, help="Çıktı klasörü (defter de buraya yazılır)")
+    pw.add_argument("--recipe", default=None, help="Tarif JSON dosyası")
+    pw.add_argument("--from-config", action="store_true",
+                    help="Tarif yerine arayüzde kayıtlı efekt, filigran ve ad şablonu ayarlarını kullan")
+    pw.add_argument("--detect", type=parse_detect_kinds, default=None,
+                    help="Otomatik algılanacak türler, ör. face,plate")
+    pw.add_argument("--workers", type=int, default=None, help="Süreç sayısı (varsayılan: CPU sayısı)")
+    pw.add_argument("--poll", type=float, default=1.0, help="Tarama aralığı (sn)")
+    pw.add_argument("--settle", type=float, default=2.0, help="Dosyanın değişmeden beklemesi gereken süre (sn)")
+    pw.add_argument("--queue", type=int, default=64, help="Kuyruk sınırı (dosya)")
+    pw.add_argument("--recursive", action="store_true", help="Alt klasörleri de izle")
+    pw.add_argument("--stats", default=None, help="Sayaçların düzenli yazılacağı JSON dosyası")
+    pw.add_argument("--stats-interval", type=float, default=30.0, help="Sayaç raporu aralığı (sn)")
+    pw.add_argument("--once", action="store_true", help="Klasördekileri işle ve çık")
+
+    args = parser.parse_args(argv)
+    if args.command == "watch":
+        if bool(args.recipe) == bool(args.from_config):
+            print("--recipe ya da --from-config seçeneklerinden biri verilmeli.", file=sys.stderr)
+            return 2
+        try:
+            recipe = load_recipe(args.recipe) if args.recipe else recipe_from_config()
+        except Exception as e:
+            print(f"Tarif okunamadı: {e}", file=sys.stderr)
+            return 2
+        if args.detect:
+            recipe.setdefault("detect", {})["kinds"] = args.detect
+        if not os.path.isdir(args.input):
+            print(f"Girdi klasörü bulunamadı: {args.input}", file=sys.stderr)
+            return 2
+        try:
+            watcher = HotFolderWatcher(args.input, recipe, args.output, workers=args.workers,
+                                       poll=args.poll, settle=args.settle, queue_size=args.queue,
+                                       recursive=args.recursive, stats_path=args.stats,
+                                       stats_interval=args.stats_interval)
+        except ValueError as e:
+            print(str(e), file=sys.stderr)
+            return 2
+        stop = threading.Event()
+        for sig in (signal.SIGINT, getattr(signal, "SIGTERM", None)):
+            if sig is not None:
+                signal.signal(sig, lambda *a: (print("Durduruluyor; işlemdeki dosyalar bitiriliyor...",
+                                                     file=sys.stderr), stop.set()))
+        stats = watcher.run(stop=stop, once=args.once)
+        return 1 if stats["failed"] else 0
+    if args.command == "batch":
+        try:
+            recipe = load_recipe(args.recipe)
+        except Exception as e:
+            print(f"Tarif okunamadı: {e}", file=sys.stderr)
+            return 2
+        if args.detect:
+            recipe.setdefault("detect", {})["kinds"] = args.detect
+        if args.overwrite:
+            recipe.setdefault("save", {})["overwrite"] = True
+        files = list_images(args.input, recursive=args.recursive)
+        if not files:
+            print("Girdi klasöründe görsel bulunamadı.", file=sys.stderr)
+            return 1
+        _, failures, _ = run_batch(files, recipe, args.output, workers=args.workers)
+        return 1 if failures else 0
+    return 2
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(cli_main())
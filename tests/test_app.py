@@ -0,0 +1,35 @@
+from types import SimpleNamespace
+
+import pytest
+
+miflon = pytest.importorskip("miflon")  # tkinter gerektirir; pencere açılmaz
+
+
+@pytest.fixture
+def errors(monkeypatch):
+    shown = []
+    monkeypatch.setattr(miflon.messagebox, "showerror", lambda title, msg, **k: shown.append(msg))
+    return shown
+
+
+def stub_app(current_path):
+    app = SimpleNamespace(current_path=current_path, batch_files=["a.jpg", "bad.jpg", "c.jpg"],
+                          batch_index=1, cleared=0)
+    app.clear_image = lambda: setattr(app, "cleared", app.cleared + 1)
+    return app
+
+
+def test_load_failure_keeps_batch(errors):
+    app = stub_app("bad.jpg")
+    miflon.ImageToolApp._on_load_failed(app, "bad.jpg", IOError("bozuk dosya"))
+    assert app.cleared == 1
+    assert app.batch_files == ["a.jpg", "bad.jpg", "c.jpg"] and app.batch_index == 1
+    assert len(errors) == 1 and "bozuk dosya" in errors[0]
+
+
+def test_stale_load_failure_leaves_current_image(errors):
+    # Kullanıcı bu arada başka bir dosyaya geçtiyse o dosya temizlenmez
+    app = stub_app("c.jpg")
+    miflon.ImageToolApp._on_load_failed(app, "bad.jpg", IOError("bozuk dosya"))
+    assert app.cleared == 0 and app.batch_index == 1
+    assert len(errors) == 1
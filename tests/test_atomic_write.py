@@ -0,0 +1,71 @@
+import os
+import stat
+import sys
+
+import numpy as np
+import pytest
+
+import miflon_core as core
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="POSIX izinleri")
+
+
+def mode_of(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+def test_new_file_gets_umask_default(tmp_path):
+    path = tmp_path / "out.bin"
+    core.atomic_write(str(path), b"data")
+    assert mode_of(path) == 0o666 & ~core._UMASK
+    plain = tmp_path / "plain.bin"
+    plain.write_bytes(b"data")
+    assert mode_of(path) == mode_of(plain)
+
+
+def test_existing_file_mode_is_kept(tmp_path):
+    path = tmp_path / "out.bin"
+    path.write_bytes(b"old")
+    os.chmod(path, 0o640)
+    core.atomic_write(str(path), b"new")
+    assert path.read_bytes() == b"new"
+    assert mode_of(path) == 0o640
+
+
+def test_write_image_and_config_modes(tmp_path):
+    image = np.zeros((8, 8, 3), np.uint8)
+    out = tmp_path / "out.jpg"
+    core.write_image(str(out), image)
+    assert mode_of(out) == 0o666 & ~core._UMASK
+
+    big = core.scratch_array((8, 8, 3))
+    assert core.is_disk_backed(big)
+    disk = tmp_path / "disk.png"
+    core.write_image(str(disk), big)
+    assert mode_of(disk) == 0o666 & ~core._UMASK
+
+    store = core.ConfigStore(str(tmp_path / "cfg.json"))
+    store.update({"app": {"x": 1}})
+    store.flush()
+    assert mode_of(tmp_path / "cfg.json") == 0o666 & ~core._UMASK
+
+
+def test_publish_free_skips_taken_indices(tmp_path):
+    (tmp_path / "a_1.jpg").write_bytes(b"old")
+    tmp = tmp_path / ".stage"
+    tmp.write_bytes(b"new")
+    path, index = core.publish_free(str(tmp), str(tmp_path), lambda i: f"a_{i}.jpg", 1, True)
+    assert (path, index) == (str(tmp_path / "a_2.jpg"), 2)
+    assert (tmp_path / "a_1.jpg").read_bytes() == b"old"
+    assert (tmp_path / "a_2.jpg").read_bytes() == b"new"
+    assert not tmp.exists()
+
+
+def test_publish_free_without_index_refuses_and_cleans_up(tmp_path):
+    (tmp_path / "a.jpg").write_bytes(b"old")
+    tmp = tmp_path / ".stage"
+    tmp.write_bytes(b"new")
+    with pytest.raises(FileExistsError):
+        core.publish_free(str(tmp), str(tmp_path), lambda i: "a.jpg", 1, False)
+    assert (tmp_path / "a.jpg").read_bytes() == b"old"
+    assert not tmp.exists()
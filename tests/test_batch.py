@@ -0,0 +1,118 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+import miflon_core as core
+
+
+def make_inputs(folder, names, size=(40, 30)):
+    folder.mkdir()
+    for n in names:
+        core.write_image(str(folder / f"{n}.png"), np.full((size[1], size[0], 3), 100, np.uint8))
+    return core.list_images(str(folder))
+
+
+def recipe(template):
+    return {"save": {"format": "PNG", "template": template, "index": 1}}
+
+
+def test_size_template_advances_index_on_collision(tmp_path):
+    files = make_inputs(tmp_path / "in", ["a"])
+    out = tmp_path / "out"
+    out.mkdir()
+    (out / "a_40x30_01.png").write_bytes(b"existing")
+    result = core.run_batch(files, recipe("{name}_{w}x{h}_{index:02d}"), str(out),
+                            workers=1, log=lambda *_: None)
+    assert result == (1, [], 2)
+    assert (out / "a_40x30_01.png").read_bytes() == b"existing"
+    assert os.path.exists(out / "a_40x30_02.png")
+    assert not [n for n in os.listdir(out) if n.startswith(".miflon_")]
+
+
+def test_size_template_without_index_is_not_overwritten(tmp_path):
+    files = make_inputs(tmp_path / "in", ["a", "b"])
+    out = tmp_path / "out"
+    out.mkdir()
+    (out / "a_40x30.png").write_bytes(b"existing")
+    ok, failures, _ = core.run_batch(files, recipe("{name}_{w}x{h}"), str(out),
+                                     workers=1, log=lambda *_: None)
+    assert ok == 1
+    assert [os.path.basename(src) for src, _ in failures] == ["a.png"]
+    assert (out / "a_40x30.png").read_bytes() == b"existing"
+    assert os.path.exists(out / "b_40x30.png")
+
+
+def test_last_index_skips_taken_names(tmp_path):
+    files = make_inputs(tmp_path / "in", ["a", "b"])
+    out = tmp_path / "out"
+    out.mkdir()
+    (out / "a_002.png").write_bytes(b"existing")
+    ok, failures, last = core.run_batch(files, recipe("{name}_{index:03d}"), str(out),
+                                        workers=1, log=lambda *_: None)
+    # a -> 001, b -> 002 boş olduğundan 002 (ad farklı); sıradaki indeks 3
+    assert (ok, failures, last) == (2, [], 2)
+    assert sorted(os.listdir(out)) == ["a_001.png", "a_002.png", "b_002.png"]
+
+
+def test_last_index_is_none_when_nothing_written(tmp_path):
+    files = make_inputs(tmp_path / "in", ["a"])
+    out = tmp_path / "out"
+    out.mkdir()
+    (out / "a_40x30.png").write_bytes(b"existing")
+    ok, failures, last = core.run_batch(files, recipe("{name}_{w}x{h}"), str(out),
+                                        workers=1, log=lambda *_: None)
+    assert ok == 0 and len(failures) == 1 and last is None
+
+
+def test_existing_outputs_follow_one_policy_for_all_templates(tmp_path):
+    files = make_inputs(tmp_path / "in", ["a", "b"])
+    out = tmp_path / "out"
+    out.mkdir()
+    (out / "a_fixed.png").write_bytes(b"existing")
+    (out / "a_40x30.png").write_bytes(b"existing")
+    for template in ("{name}_fixed", "{name}_{w}x{h}"):
+        ok, failures, _ = core.run_batch(files, recipe(template), str(out), workers=1, log=lambda *_: None)
+        assert ok == 1
+        assert [(os.path.basename(src), "zaten var" in err) for src, err in failures] == [("a.png", True)]
+    assert (out / "a_fixed.png").read_bytes() == b"existing"
+    assert (out / "a_40x30.png").read_bytes() == b"existing"
+
+
+def test_overwrite_replaces_existing_outputs(tmp_path):
+    files = make_inputs(tmp_path / "in", ["a"])
+    out = tmp_path / "out"
+    out.mkdir()
+    for template, name in (("{name}_fixed", "a_fixed.png"), ("{name}_{w}x{h}", "a_40x30.png")):
+        (out / name).write_bytes(b"existing")
+        rec = recipe(template)
+        rec["save"]["overwrite"] = True
+        assert core.run_batch(files, rec, str(out), workers=1, log=lambda *_: None)[:2] == (1, [])
+        assert (out / name).read_bytes() != b"existing"
+
+
+def test_cli_overwrite_flag(tmp_path):
+    make_inputs(tmp_path / "in", ["a"])
+    out = tmp_path / "out"
+    out.mkdir()
+    (out / "a_fixed.png").write_bytes(b"existing")
+    path = tmp_path / "r.json"
+    path.write_text(json.dumps(recipe("{name}_fixed")))
+    args = ["batch", "--recipe", str(path), "--input", str(tmp_path / "in"), "--output", str(out), "--workers", "1"]
+    assert core.cli_main(args) == 1
+    assert (out / "a_fixed.png").read_bytes() == b"existing"
+    assert core.cli_main(args + ["--overwrite"]) == 0
+    assert (out / "a_fixed.png").read_bytes() != b"existing"
+
+
+def test_detect_kinds_are_parsed_once_for_both_commands(tmp_path, capsys):
+    assert core.parse_detect_kinds(" face, plate,") == ["face", "plate"]
+    path = tmp_path / "r.json"
+    path.write_text(json.dumps(recipe("{name}")))
+    common = ["--recipe", str(path), "--input", str(tmp_path), "--output", str(tmp_path / "out")]
+    for command in ("batch", "watch"):
+        with pytest.raises(SystemExit) as e:
+            core.cli_main([command, *common, "--detect", "face,yuz"])
+        assert e.value.code == 2
+        assert "Bilinmeyen algılama türü: yuz" in capsys.readouterr().err
@@ -0,0 +1,43 @@
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+import miflon_core as core
+
+# Hızlı arka uçların Gauss bulanıklığından sapması için alt sınır (dB)
+MIN_PSNR = 40.0
+
+
+@pytest.fixture(scope="module")
+def photo():
+    img = cv2.imread(os.path.join(os.path.dirname(__file__), "data", "face.jpg"))
+    img = cv2.resize(img, (512, 384), interpolation=cv2.INTER_CUBIC)
+    noise = np.random.default_rng(1).integers(0, 40, img.shape, dtype=np.uint8)
+    return cv2.add(img, noise)
+
+
+@pytest.mark.parametrize("backend", ["box", "pyramid"])
+@pytest.mark.parametrize("k", [9, 21, 41, 81, 151])
+def test_fast_backends_stay_close_to_gaussian(photo, backend, k):
+    ref = cv2.GaussianBlur(photo, (k, k), 0)
+    out = core.blur_image(photo, k, backend)
+    assert out.shape == ref.shape and out.dtype == ref.dtype
+    assert cv2.PSNR(ref, out) >= MIN_PSNR
+
+
+def test_auto_uses_gaussian_for_small_kernels(photo):
+    k = core.AUTO_BLUR_MAX_GAUSSIAN_K
+    assert np.array_equal(core.blur_image(photo, k, "auto"), cv2.GaussianBlur(photo, (k, k), 0))
+    assert core.resolve_blur_backend(k + 2) == "pyramid"
+
+
+@pytest.mark.parametrize("backend", ["box", "pyramid"])
+def test_region_blur_backends_stay_close(photo, backend):
+    box = (100, 80, 400, 300)
+    ref = core.region_effect_patch(photo, box, "blur", 61, selection_type="oval",
+                                   feather=8, blur_backend="gaussian")
+    out = core.region_effect_patch(photo, box, "blur", 61, selection_type="oval",
+                                   feather=8, blur_backend=backend)
+    assert cv2.PSNR(ref, out) >= MIN_PSNR
@@ -0,0 +1,75 @@
+import threading
+
+import numpy as np
+import pytest
+
+import miflon_core as core
+
+FX = {"effect_type": "blur", "blur_value": 9, "pixel_value": 4, "feather": 4, "blur_backend": "auto"}
+
+
+class CountingEvent:
+    # İlk `after` denetimden sonra kurulmuş görünür; kaç adım atıldığını sayar
+    def __init__(self, after):
+        self.after, self.calls = after, 0
+
+    def is_set(self):
+        self.calls += 1
+        return self.calls > self.after
+
+
+def image(w=320, h=240):
+    return np.random.default_rng(3).integers(0, 256, (h, w, 3), dtype=np.uint8)
+
+
+def cancelled():
+    ev = threading.Event()
+    ev.set()
+    return ev
+
+
+def test_region_set_stops_between_regions():
+    img = image()
+    regions = [((x, 10, x + 30, 50), "rectangle") for x in range(0, 300, 60)]
+    ev = CountingEvent(after=2)
+    with pytest.raises(core.Cancelled):
+        core.region_set_patches(img, regions, cancel=ev, **FX)
+    assert ev.calls == 3  # üçüncü bölgeden önce durdu
+
+
+def test_tiled_region_stops_between_tiles(monkeypatch):
+    monkeypatch.setattr(core, "TILED_REGION_PIXELS", 0)
+    img = image(2600, 40)
+    ev = CountingEvent(after=1)
+    with pytest.raises(core.Cancelled):
+        core.region_effect_patch(img, (0, 0, 2600, 40), cancel=ev, selection_type="oval",
+                                 effect_type="blur", blur_value=9, feather=4)
+    assert ev.calls == 2
+
+
+def test_render_ops_and_graph_stop_and_keep_no_result():
+    img = image()
+    ops = [{"op": "regions", "size": (320, 240), "fx": FX,
+            "regions": [{"box": (10, 10, 80, 80), "shape": "oval"}]}]
+    with pytest.raises(core.Cancelled):
+        core.render_ops(img, ops, cancel=cancelled())
+    graph = core.EditGraph(img, ops)
+    with pytest.raises(core.Cancelled):
+        graph.render(cancel=cancelled())
+    # İptal edilen işleme saklanmaz; sonraki istek tam sonucu üretir
+    assert np.array_equal(graph.render(), core.render_ops(img, ops))
+
+
+def test_size_search_and_detect_stop():
+    with pytest.raises(core.Cancelled):
+        core.JpegSizeSearch(image()).find(20 * 1024, cancel=cancelled())
+    with pytest.raises(core.Cancelled):
+        core.detect_regions(image(), cancel=cancelled())
+
+
+def test_unset_event_changes_nothing():
+    img = image()
+    regions = [((10, 10, 80, 80), "oval"), ((60, 40, 150, 120), "rectangle")]
+    assert all(np.array_equal(a[1], b[1]) and a[0] == b[0] for a, b in zip(
+        core.region_set_patches(img, regions, cancel=threading.Event(), **FX),
+        core.region_set_patches(img, regions, **FX)))
@@ -0,0 +1,62 @@
+import json
+import os
+import time
+
+import miflon_core as core
+
+
+def store(tmp_path, delay=60.0):
+    return core.ConfigStore(str(tmp_path / "config.json"), delay=delay)
+
+
+def read(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_updates_are_debounced_into_one_write(tmp_path, monkeypatch):
+    cfg = store(tmp_path, delay=0.05)
+    writes = []
+    real = cfg._write_atomic
+    monkeypatch.setattr(cfg, "_write_atomic", lambda data: (writes.append(data), real(data)))
+    cfg.update({"app": {"a": 1}})
+    cfg.update({"app": {"b": 2}})
+    assert cfg.get("app", "a") == 1 and not os.path.exists(cfg.path)
+    deadline = time.monotonic() + 2
+    while not writes and time.monotonic() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.1)
+    assert len(writes) == 1
+    assert read(cfg.path) == {"app": {"a": 1, "b": 2}}
+
+
+def test_flush_merges_with_file_changed_by_another_instance(tmp_path):
+    cfg = store(tmp_path)
+    cfg.update({"app": {"a": 1}})
+    other = store(tmp_path)
+    other.update({"app": {"b": 2}, "save": {"q": 90}})
+    other.flush()
+    cfg.flush()
+    assert read(cfg.path) == {"app": {"a": 1, "b": 2}, "save": {"q": 90}}
+
+
+def test_failed_write_keeps_old_file_and_pending_changes(tmp_path, monkeypatch, capsys):
+    cfg = store(tmp_path)
+    cfg.update({"app": {"a": 1}})
+    cfg.flush()
+
+    def broken(src, dst):
+        raise OSError("disk dolu")
+    monkeypatch.setattr(core, "replace_file", broken)
+    cfg.update({"app": {"a": 2}})
+    cfg.flush()
+    assert read(cfg.path) == {"app": {"a": 1}}  # yarım yazma hedefi bozmadı
+    assert os.listdir(tmp_path) == ["config.json"]  # geçici dosya kalmadı
+    assert "disk dolu" in capsys.readouterr().err
+    assert cfg._timer is not None  # yeniden deneme zamanlandı
+
+    monkeypatch.undo()
+    cfg.update({"app": {"b": 3}})
+    cfg.flush()
+    assert read(cfg.path) == {"app": {"a": 2, "b": 3}}
+    assert cfg._timer is None
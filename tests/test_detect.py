@@ -0,0 +1,29 @@
+import os
+
+import pytest
+
+import miflon_core as core
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "data", "face.jpg")
+
+# Haar sınıflandırıcıları OpenCV 5'te yok (requirements.txt 4.x'e sabitler)
+pytestmark = pytest.mark.skipif(not hasattr(core.cv2, "CascadeClassifier"),
+                                reason="opencv-python 4.x gerekli")
+
+
+def test_detects_face_in_fixture():
+    # NASA astronot portresinden (kamu malı) 128x128 yüz kesiti
+    image = core.load_image(FIXTURE)
+    found = core.detect_regions(image, kinds=("face",), workers=1)
+    assert len(found) == 1
+    (x1, y1, x2, y2), shape = found[0]
+    assert shape == "oval"
+    # Yüz kesitin ortasında; kutu kenar payıyla birlikte merkezi kapsamalı
+    assert x1 < 64 < x2 and y1 < 50 < y2
+    assert 40 <= x2 - x1 <= 110
+
+
+def test_cascade_path_resolves_existing_file():
+    for name, *_ in core.DETECT_KINDS.values():
+        assert os.path.exists(core._cascade_path(name))
+
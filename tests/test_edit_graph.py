@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+import miflon_core as core
+
+FX = {"effect_type": "pixel", "blur_value": 9, "pixel_value": 4, "feather": 0, "blur_backend": "auto"}
+
+
+def source(w=601, h=397):
+    # Kenarları tek sayılı, düzgün olmayan içerik: yuvarlama farkları piksel farkı olarak görünür
+    rng = np.random.default_rng(7)
+    return rng.integers(0, 256, (h, w, 3), dtype=np.uint8)
+
+
+def crop_op(image, ratio, fx, fy):
+    # CropDialog gibi: en büyük alan, önizlemedeki konumdan
+    H, W = image.shape[:2]
+    _, _, w, h = core.crop_rect(W, H, core.parse_ratio(ratio))
+    rect = core.crop_rect(W, H, core.parse_ratio(ratio), (W - w) * fx, (H - h) * fy)
+    return {"op": "crop", "size": (W, H), "rect": rect, "ratio": ratio}
+
+
+def replay_both(src, ops):
+    H, W = src.shape[:2]
+    graph = core.EditGraph(src, ops).render()
+    recipe = core.recipe_from_ops(ops, source_size=(W, H))
+    # process_image sahip olduğu görüntüyü yerinde değiştirir; kaynak korunur
+    return graph, core.process_image(src.copy(), recipe)
+
+
+@pytest.mark.parametrize("ratio,fx,fy", [
+    ("1:1", 0.37, 0.5), ("16:9", 0.0, 0.83), ("4:5", 0.91, 0.13), ("3:2", 1.0, 0.29),
+])
+def test_crop_matches_recipe_at_source_size(ratio, fx, fy):
+    src = source()
+    ops = [crop_op(src, ratio, fx, fy)]
+    graph, recipe = replay_both(src, ops)
+    x, y, w, h = ops[0]["rect"]
+    assert np.array_equal(graph, src[y:y + h, x:x + w])
+    assert np.array_equal(graph, recipe)
+
+
+@pytest.mark.parametrize("effect", ["pixel", "blur"])
+@pytest.mark.parametrize("ratio,fx", [("1:1", 0.37), ("9:16", 0.71), ("original", 0.5)])
+def test_proxy_ops_match_recipe_at_full_size(ratio, fx, effect):
+    src = source()
+    proxy = core.make_proxy(src, 256)
+    ph, pw = proxy.shape[:2]
+    ops = [
+        {"op": "regions", "size": (pw, ph), "fx": dict(FX, effect_type=effect),
+         "regions": [{"box": (40, 30, 120, 90), "shape": "rectangle"}]},
+        crop_op(proxy, ratio, fx, 0.4),
+    ]
+    graph, recipe = replay_both(src, ops)
+    assert graph.shape == recipe.shape
+    assert np.array_equal(graph, recipe)
+    x1, y1, x2, y2 = core._scaled_crop(ops[1], src.shape[1], src.shape[0])
+    assert not np.array_equal(graph, src[y1:y2, x1:x2])  # bölge efekti uygulandı
+
+
+@pytest.mark.parametrize("effect", ["pixel", "blur"])
+def test_lazy_effect_values_are_source_pixels(effect):
+    # Vekilde kaydedilen efekt değerleri kaynak pikselindedir: tam çözünürlükte kayıt,
+    # aynı değerlerle doğrudan (vekilsiz) düzenlemeyle aynı sonucu verir
+    src = source(1203, 795)
+    proxy = core.make_proxy(src, 256)
+    k = src.shape[1] / proxy.shape[1]
+    fx = dict(FX, effect_type=effect, blur_value=31, pixel_value=12, feather=10)
+    op = {"op": "regions", "size": (proxy.shape[1], proxy.shape[0]), "fx": fx, "fx_scale": k,
+          "regions": [{"box": (40, 30, 160, 110), "shape": "oval"}]}
+    box = tuple(int(round(v * k)) for v in (40, 30, 160, 110))
+
+    eager = src.copy()
+    core.apply_region_effect(eager, box, selection_type="oval", **fx)
+    graph, recipe = replay_both(src, [op])
+    assert np.array_equal(graph, eager)
+    assert np.array_equal(recipe, eager)
+    assert core.recipe_from_ops([op], source_size=(src.shape[1], src.shape[0]))["regions"][0]["blur_value"] == 31
+
+    # Vekil önizlemesi aynı değerleri vekil boyutuna indirir
+    preview = proxy.copy()
+    core.apply_region_effect(preview, (40, 30, 160, 110), selection_type="oval",
+                             **core.scale_effect(fx, 1 / k))
+    assert np.array_equal(core.EditGraph(proxy, [op]).render(), preview)
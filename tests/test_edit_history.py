@@ -0,0 +1,46 @@
+import numpy as np
+
+import miflon_core as core
+
+
+def accounted(history):
+    return sum(core.EditHistory._entry_bytes(e) for e in history.undo_stack + history.redo_stack)
+
+
+def test_nbytes_follows_frame_swaps():
+    history = core.EditHistory()
+    image = np.zeros((100, 200, 3), np.uint8)
+
+    # Kırpma: önceki tam kare saklanır, görüntü küçülür
+    history.push_frame(image)
+    image = image[10:60, 20:120].copy()
+    assert history.nbytes == accounted(history) == 100 * 200 * 3
+
+    # Geri al: kayıt artık küçük kareyi tutar
+    image, boxes = history.undo(image)
+    assert boxes is None and image.shape == (100, 200, 3)
+    assert history.nbytes == accounted(history) == 50 * 100 * 3
+
+    image, _ = history.redo(image)
+    assert history.nbytes == accounted(history) == 100 * 200 * 3
+    image, _ = history.undo(image)
+
+    # Yeni düzenleme yineleme yığınını siler; sayaç gerçek boyuta eşit kalmalı
+    before = core.snapshot(image[0:10, 0:10])
+    image[0:10, 0:10] = 255
+    history.push_patch((0, 0, 10, 10), before)
+    assert not history.redo_stack
+    assert history.nbytes == accounted(history) == 10 * 10 * 3
+
+
+def test_patch_undo_redo_roundtrip():
+    history = core.EditHistory()
+    image = np.zeros((20, 20, 3), np.uint8)
+    before = core.snapshot(image[5:15, 5:15])
+    image[5:15, 5:15] = 7
+    history.push_patch((5, 5, 15, 15), before)
+    image, boxes = history.undo(image)
+    assert boxes == [(5, 5, 15, 15)] and not image.any()
+    image, _ = history.redo(image)
+    assert (image[5:15, 5:15] == 7).all()
+    assert history.nbytes == accounted(history)
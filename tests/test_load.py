@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+import miflon_core as core
+
+
+@pytest.fixture
+def rotated_jpeg(tmp_path):
+    # 64×32 piksel kayıtlı, EXIF yönü 6 (90° saat yönünde): doğru gösterim 32×64
+    path = tmp_path / "rotated.jpg"
+    im = Image.new("RGB", (64, 32), (200, 30, 30))
+    exif = im.getexif()
+    exif[0x0112] = 6
+    im.save(path, exif=exif)
+    return str(path)
+
+
+def test_pil_fallback_applies_exif_orientation(rotated_jpeg):
+    image = core._load_image_pil(rotated_jpeg)
+    assert image.shape == (64, 32, 3)
+    assert image.shape == core.load_image(rotated_jpeg).shape
+
+
+def test_preview_applies_exif_orientation(rotated_jpeg):
+    assert core.load_image_preview(rotated_jpeg).shape == (64, 32, 3)
+
+
+def test_preview_reads_file_once(tmp_path, monkeypatch):
+    path = str(tmp_path / "big.jpg")
+    core.write_image(path, np.full((400, 600, 3), 90, np.uint8))
+    reads, opened = [], []
+    fromfile, pil_open = core.np.fromfile, core.Image.open
+    monkeypatch.setattr(core.np, "fromfile", lambda *a, **k: reads.append(a[0]) or fromfile(*a, **k))
+    monkeypatch.setattr(core.Image, "open", lambda src, *a, **k: opened.append(src) or pil_open(src, *a, **k))
+    image = core.load_image_preview(path, max_side=100)
+    assert image.shape == (100, 150, 3)
+    assert reads == [path]
+    assert not any(isinstance(src, str) for src in opened)
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+import miflon_core as core
+
+
+def float_blend(dst, src, mask):
+    # Önceki yol: kayan noktalı ağırlıklarla cv2.blendLinear
+    wf = mask.astype(np.float32) / 255.0
+    return core.cv2.blendLinear(src, dst, wf, 1.0 - wf)
+
+
+@pytest.mark.parametrize("shape", [(97, 131, 3), (64, 80)])
+def test_fixed_point_blend_matches_float_path(shape):
+    rng = np.random.default_rng(3)
+    src = rng.integers(0, 256, shape, dtype=np.uint8)
+    dst = rng.integers(0, 256, shape, dtype=np.uint8)
+    mask = core.MaskCache().mask(shape[0], shape[1], "oval", 8)
+    expected = float_blend(dst, src, mask)
+    out = core.blend_masked(dst.copy(), src, mask)
+    assert np.abs(out.astype(int) - expected.astype(int)).max() <= 1
+    # Tam ağırlıklarda birebir
+    assert np.array_equal(out[mask == 255], src[mask == 255])
+    assert np.array_equal(out[mask == 0], dst[mask == 0])
+
+
+def test_blend_writes_into_view():
+    rng = np.random.default_rng(4)
+    big = rng.integers(0, 256, (50, 60, 3), dtype=np.uint8)
+    src = np.zeros((20, 30, 3), np.uint8)
+    mask = np.full((20, 30), 255, np.uint8)
+    core.blend_masked(big[10:30, 5:35], src, mask)
+    assert not big[10:30, 5:35].any() and big[:10].any()
+
+
+def test_cache_stores_one_uint8_mask_per_key():
+    cache = core.MaskCache(budget_bytes=100 * 100 * 2)
+    m = cache.mask(100, 100, "oval", 4)
+    assert m.dtype == np.uint8 and m.shape == (100, 100) and not m.flags.writeable
+    assert cache.mask(100, 100, "oval", 4) is m
+    assert cache._nbytes == 100 * 100
+    cache.mask(100, 100, "oval", 5)
+    cache.mask(100, 100, "oval", 6)  # bütçe iki maske; en eskisi düşer
+    assert cache._nbytes == 2 * 100 * 100 and (100, 100, 4) not in cache._items
+    assert cache.mask(10, 10, "rectangle", 4) is None
+
+
+def test_live_preview_masks_are_not_cached(monkeypatch):
+    cache = core.MaskCache()
+    monkeypatch.setattr(core, "MASK_CACHE", cache)
+    image = np.random.default_rng(5).integers(0, 256, (80, 120, 3), dtype=np.uint8)
+    for x2 in range(60, 70):
+        core.region_effect_patch(image, (10, 10, x2, 50), selection_type="oval", cache_mask=False)
+    assert cache._nbytes == 0 and not cache._items
+    core.region_effect_patch(image, (10, 10, 60, 50), selection_type="oval")
+    assert len(cache._items) == 1
+
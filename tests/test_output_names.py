@@ -0,0 +1,74 @@
+import os
+import re
+
+import pytest
+
+import miflon_core as core
+
+
+def make(tpl, ext="jpg", w=640, h=480, name="foto"):
+    t = core.compile_name_template(tpl)
+    return lambda i: core.output_filename(t, name, i, w, h, ext)
+
+
+@pytest.mark.parametrize("tpl, index, expected", [
+    ("{name}_{w}x{h}", 3, "foto_640x480"),
+    ("{name}_{index}", 7, "foto_7"),
+    ("{name}_{index:03d}", 7, "foto_007"),
+    ("{index:03d}", 1234, "1234"),
+    ("{name}.{ext}_{x}", 1, "foto.jpg_{x}"),  # bilinmeyen alan olduğu gibi kalır
+    ("sabit", 1, "sabit"),
+])
+def test_render(tpl, index, expected):
+    assert core.compile_name_template(tpl).render("foto", index, 640, 480, "jpg") == expected
+
+
+def test_render_date_time_and_index_key():
+    t = core.compile_name_template("{date}-{time}_{index:02d}")
+    assert t.uses_index and t.fields == {"date", "time", "index"}
+    assert re.fullmatch(r"\d{8}-\d{6}_05", t.render("x", 5, 1, 1, "png"))
+    assert t.render("x", None, 1, 1, "png").endswith("_\0")
+    assert not core.compile_name_template("{name}").uses_index
+
+
+def test_output_filename_sanitizes_and_adds_extension():
+    assert core.output_filename("{name}:{index}", 'a<b>?"c', 2, 1, 1, "png") == "a_b___c_2.png"
+
+
+def touch(folder, *names):
+    for n in names:
+        (folder / n).write_bytes(b"")
+
+
+def test_next_free_skips_existing_and_reserved(tmp_path):
+    index = core.OutputIndex()
+    name = make("{name}_{index}")
+    touch(tmp_path, "foto_1.jpg", "foto_2.jpg", "foto_4.jpg")
+    assert index.next_free(str(tmp_path), name) == 3
+    index.reserve(str(tmp_path / name(3)))
+    assert index.exists(str(tmp_path / name(3)))
+    assert index.next_free(str(tmp_path), name) == 5
+    assert index.next_free(str(tmp_path), name, start=10) == 10
+    # Başka bir şablonun indeks aralığı karışmaz
+    assert index.next_free(str(tmp_path), make("{name}_{index}", ext="png")) == 1
+
+
+def test_failed_write_frees_the_name(tmp_path):
+    index = core.OutputIndex()
+    name = make("{name}_{index:02d}")
+    path = str(tmp_path / name(1))
+    index.reserve(path)
+    assert index.next_free(str(tmp_path), name) == 2
+    index.release(path, ok=False)  # dosya yazılmadı; klasör yeniden okunur
+    assert not index.exists(path)
+    assert index.next_free(str(tmp_path), name) == 1
+
+
+def test_external_changes_are_seen(tmp_path):
+    index = core.OutputIndex()
+    name = make("{name}_{index}")
+    assert index.next_free(str(tmp_path), name) == 1
+    touch(tmp_path, "foto_1.jpg", "foto_2.jpg")
+    st = os.stat(tmp_path)
+    os.utime(tmp_path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert index.next_free(str(tmp_path), name) == 3
@@ -0,0 +1,54 @@
+import json
+import tracemalloc
+
+import numpy as np
+import pytest
+
+import miflon_core as core
+
+
+@pytest.mark.parametrize("env", ["", "0", "false", "no"])
+def test_disabled_by_default(monkeypatch, env):
+    monkeypatch.setenv("MIFLON_PROFILE", env)
+    monkeypatch.setattr(core.CONFIG, "section", lambda name: {})
+    assert core._make_profiler() is None
+
+
+def test_disabled_decorator_returns_the_function(monkeypatch):
+    monkeypatch.setattr(core, "PROFILER", None)
+
+    def f(x):
+        return x + 1
+    assert core.profiled("test.f")(f) is f
+
+
+@pytest.mark.skipif(core.PROFILER is not None, reason="profil bu süreçte açık")
+def test_core_functions_are_not_wrapped_when_disabled():
+    for func in (core.blur_image, core.region_effect_patch, core.load_image):
+        assert not hasattr(func, "__wrapped__")
+    assert not tracemalloc.is_tracing()
+
+
+def test_enabled_records_nested_events(monkeypatch, tmp_path):
+    profiler = core.Profiler(track_alloc=False)
+    monkeypatch.setattr(core, "PROFILER", profiler)
+
+    @core.profiled("test.inner")
+    def inner(img):
+        return img.sum()
+
+    @core.profiled("test.outer")
+    def outer(img):
+        return inner(img) + inner(img)
+
+    outer(np.ones((20, 30, 3), np.uint8))
+    names = [e["name"] for e in profiler.events]
+    assert names == ["test.inner", "test.inner", "test.outer"]
+    outer_ev = profiler.events[-1]
+    assert outer_ev["args"] == {"w": 30, "h": 20, "mp": 0.0} and outer_ev["cat"] == "test"
+    assert all(outer_ev["ts"] <= e["ts"] and e["ts"] + e["dur"] <= outer_ev["ts"] + outer_ev["dur"]
+               for e in list(profiler.events)[:2])
+    path = profiler.export(str(tmp_path / "trace.json"))
+    with open(path, encoding="utf-8") as f:
+        trace = json.load(f)
+    assert [e["name"] for e in trace["traceEvents"] if e["ph"] == "X"] == names
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+import miflon_core as core
+
+
+def image(w, h, seed=4):
+    return np.random.default_rng(seed).integers(0, 256, (h, w, 3), dtype=np.uint8)
+
+
+@pytest.mark.parametrize("size", [(1537, 1023), (1024, 768), (700, 2049)])
+@pytest.mark.parametrize("box", [(0, 0, 1, 1), (13, 7, 301, 199), (511, 383, 700, 700),
+                                 (0, 0, 700, 1023)])
+def test_update_region_matches_rebuild(size, box):
+    w, h = size
+    img = image(w, h)
+    pyr = core.PreviewPyramid(img, min_side=64)
+    x1, y1, x2, y2 = box[0], box[1], min(w, box[2]), min(h, box[3])
+    img[y1:y2, x1:x2] = image(x2 - x1, y2 - y1, seed=9)
+    pyr.update_region(img, (x1, y1, x2, y2))
+    fresh = core.PreviewPyramid(img, min_side=64)
+    assert len(pyr.levels) == len(fresh.levels) > 2
+    for got, want in zip(pyr.levels, fresh.levels):
+        assert np.array_equal(got, want)
+
+
+@pytest.mark.parametrize("view", [(800, 533), (301, 200), (1537, 1023)])
+def test_render_region_matches_full_render(view):
+    img = image(1537, 1023)
+    pyr = core.PreviewPyramid(img, min_side=64)
+    box = (200, 150, 640, 480)
+    img[150:480, 200:640] = 255 - img[150:480, 200:640]
+    pyr.update_region(img, box)
+    full = pyr.render(*view)
+    dx, dy, patch = pyr.render_region(*view, box)
+    ph, pw = patch.shape[:2]
+    diff = np.abs(full[dy:dy + ph, dx:dx + pw].astype(int) - patch.astype(int))
+    assert diff.max() <= 1
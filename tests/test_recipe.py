@@ -0,0 +1,26 @@
+import pytest
+
+import miflon_core as core
+
+FX = {"effect_type": "blur", "blur_value": 19, "pixel_value": 7, "feather": 8, "blur_backend": "auto"}
+WM = {"enable_text": True, "text": "miflon", "opacity": 40}
+
+
+def regions_op(box, size=(200, 100)):
+    return {"op": "regions", "size": size, "fx": FX, "regions": [{"box": box, "shape": "rectangle"}]}
+
+
+def test_watermark_last_is_accepted():
+    ops = [regions_op((10, 10, 50, 50)), {"op": "watermark", "size": (200, 100), "wm": WM}]
+    recipe = core.recipe_from_ops(ops)
+    assert recipe["watermark"] == WM and len(recipe["regions"]) == 1
+
+
+@pytest.mark.parametrize("late", [
+    regions_op((10, 10, 50, 50)),
+    {"op": "crop", "size": (200, 100), "rect": (0, 0, 100, 100), "ratio": "1:1"},
+])
+def test_edits_after_watermark_are_refused(late):
+    ops = [{"op": "watermark", "size": (200, 100), "wm": WM}, late]
+    with pytest.raises(ValueError):
+        core.recipe_from_ops(ops)
@@ -0,0 +1,45 @@
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+import miflon_core as core
+
+
+@pytest.fixture(scope="module")
+def photo():
+    img = cv2.imread(os.path.join(os.path.dirname(__file__), "data", "face.jpg"))
+    img = cv2.resize(img, (480, 360), interpolation=cv2.INTER_CUBIC)
+    noise = np.random.default_rng(2).integers(0, 24, img.shape, dtype=np.uint8)
+    return cv2.add(img, noise)
+
+
+def jpeg_size(img, q):
+    return len(cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, q])[1])
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+@pytest.mark.parametrize("frac", [0.15, 0.4, 0.7, 0.95])
+def test_finds_highest_quality_under_limit(photo, workers, frac):
+    lo_size, hi_size = jpeg_size(photo, 40), jpeg_size(photo, 100)
+    limit = int(lo_size + (hi_size - lo_size) * frac)
+    q, scale, data = core.JpegSizeSearch(photo, workers=workers).find(limit)
+    assert scale == 1.0
+    assert len(data) <= limit
+    assert q == 100 or jpeg_size(photo, q + 1) > limit
+    assert len(data) == jpeg_size(photo, q)
+
+
+def test_limit_above_max_quality_returns_100(photo):
+    q, _, _ = core.JpegSizeSearch(photo).find(jpeg_size(photo, 100) + 1)
+    assert q == 100
+
+
+def test_falls_back_to_smaller_scales(photo):
+    limit = jpeg_size(photo, 40) // 2
+    search = core.JpegSizeSearch(photo)
+    assert search.find(limit) is None
+    q, scale, data = search.find(limit, scales=core.DOWNSCALE_STEPS)
+    assert scale < 1.0 and len(data) <= limit
+    assert q == 100 or len(search.encode(q + 1, scale)) > limit
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+import miflon_core as core
+
+
+@pytest.fixture(scope="module")
+def image():
+    # Döşeme sınırlarını (1024) birkaç kez aşan, düzgün olmayan içerik
+    rng = np.random.default_rng(6)
+    small = rng.integers(0, 256, (150, 230, 3), dtype=np.uint8)
+    return core.cv2.resize(small, (2300, 1500), interpolation=core.cv2.INTER_CUBIC)
+
+
+def both(monkeypatch, image, box, **fx):
+    monkeypatch.setattr(core, "TILED_REGION_PIXELS", 1 << 62)
+    whole = core.region_effect_patch(image, box, cache_mask=False, **fx)
+    monkeypatch.setattr(core, "TILED_REGION_PIXELS", 0)
+    tiled = core.region_effect_patch(image, box, **fx)
+    return whole, tiled
+
+
+@pytest.mark.parametrize("fx", [
+    {"effect_type": "blur", "blur_value": 31, "selection_type": "oval", "feather": 8,
+     "blur_backend": "gaussian"},
+    {"effect_type": "blur", "blur_value": 15, "selection_type": "rectangle", "feather": 0},
+    {"effect_type": "pixel", "pixel_value": 9, "selection_type": "oval", "feather": 3},
+    {"effect_type": "pixel", "pixel_value": 16, "selection_type": "oval", "feather": 0},
+])
+@pytest.mark.parametrize("box", [(0, 0, 2300, 1500), (37, 41, 2251, 1466)])
+def test_tiled_region_matches_untiled(monkeypatch, image, box, fx):
+    whole, tiled = both(monkeypatch, image, box, **fx)
+    assert np.array_equal(whole, tiled)
+
+
+@pytest.mark.parametrize("feather", [0, 5, 20])
+def test_mask_tiles_match_cached_mask(feather):
+    h, w = 1900, 2300
+    full = core.MaskCache().mask(h, w, "oval", feather, store=False)
+    for x1, y1, x2, y2 in core.iter_tiles(h, w, 700):
+        tile = core._mask_tile(h, w, "oval", feather, x1, y1, x2 - x1, y2 - y1)
+        assert np.array_equal(tile, full[y1:y2, x1:x2])
@@ -0,0 +1,48 @@
+import numpy as np
+
+import miflon_core as core
+
+
+def make_watcher(tmp_path, names, queue_size=1):
+    src = tmp_path / "in"
+    src.mkdir()
+    for n in names:
+        core.write_image(str(src / f"{n}.png"), np.zeros((8, 8, 3), np.uint8))
+    return core.HotFolderWatcher(str(src), {"save": {"format": "PNG"}}, str(tmp_path / "out"),
+                                 settle=0, queue_size=queue_size, log=lambda *_: None)
+
+
+def dispatch(watcher):
+    # Kuyruğun başındaki iş havuza verilmiş gibi işlemdekilere taşınır
+    key, path, found_at = watcher.queue.popleft()
+    watcher.inflight[object()] = (key, path, found_at, None)
+    return path
+
+
+def test_queue_full_counts_each_file_once(tmp_path):
+    watcher = make_watcher(tmp_path, ["a", "b", "c"])
+    watcher.scan()  # ilk görüş: aday
+    for _ in range(5):
+        watcher.scan()
+    assert len(watcher.queue) == 1
+    assert watcher.counters["rejected_full"] == 2
+
+    # Yer açılınca bekleyenlerden biri girer; beklediği süre yeniden sayılmaz
+    dispatch(watcher)
+    for _ in range(3):
+        watcher.scan()
+    assert len(watcher.queue) == 1
+    assert watcher.queue[0][1] not in watcher._rejected
+    assert watcher.counters["rejected_full"] == 2
+
+    dispatch(watcher)
+    watcher.scan()
+    assert len(watcher.queue) == 1 and not watcher._rejected
+    assert watcher.counters["rejected_full"] == 2
+
+
+def test_stats_reports_queue_full_skips(tmp_path):
+    watcher = make_watcher(tmp_path, ["a", "b"])
+    for _ in range(4):
+        watcher.scan()
+    assert watcher.stats()["queue_full_skips"] == 1
@@ -0,0 +1,72 @@
+import cv2
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+
+import miflon_core as core
+
+
+def composite_reference(image, wm):
+    # Önceki yol: tam kare RGBA katman + Image.alpha_composite
+    opacity = int(wm.get("opacity", 40))
+    base = Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB)).convert("RGBA")
+    w, h = base.size
+    layer = Image.new("RGBA", (w, h), (0, 0, 0, 0))
+    logo_path = wm.get("logo_path", "")
+    if logo_path:
+        logo = Image.open(logo_path).convert("RGBA")
+        target_w = max(1, int(w * (int(wm.get("logo_size_percent", 15)) / 100.0)))
+        logo = logo.resize((target_w, max(1, int(logo.height * target_w / logo.width))),
+                           Image.Resampling.LANCZOS)
+        if opacity < 100:
+            data = np.array(logo)
+            data[..., 3] = (data[..., 3].astype(np.float32) * (opacity/100.0)).astype(np.uint8)
+            logo = Image.fromarray(data, mode="RGBA")
+        layer.paste(logo, ((w - logo.width)//2, (h - logo.height)//2), mask=logo)
+    text = wm.get("text", "").strip()
+    if text:
+        draw = ImageDraw.Draw(layer)
+        font_size = max(8, int(h * (int(wm.get("text_size_percent", 2)) / 100.0)))
+        font = core.load_font(font_size)
+        tw, th = core.measure_text(draw, text, font)
+        if tw > int(w * 0.94):
+            font_size = max(8, int(font_size * int(w * 0.94) / tw))
+            font = core.load_font(font_size)
+            tw, th = core.measure_text(draw, text, font)
+        color = wm.get("color", [255, 255, 255])
+        fill = (*map(int, color), int(255 * (opacity/100.0)))
+        draw.text((w - tw - 12, h - th - 12), text, font=font, fill=fill)
+    out = Image.alpha_composite(base, layer).convert("RGB")
+    return cv2.cvtColor(np.array(out), cv2.COLOR_RGB2BGR)
+
+
+@pytest.fixture
+def logo(tmp_path):
+    # Yarı saydam kenarlı, renkli logo
+    rgba = np.zeros((60, 90, 4), dtype=np.uint8)
+    rgba[..., 0] = np.linspace(0, 255, 90, dtype=np.uint8)
+    rgba[..., 1] = 200
+    rgba[10:50, 15:75, 3] = 255
+    rgba[5:55, 8:82, 3] = np.maximum(rgba[5:55, 8:82, 3], 120)
+    path = tmp_path / "logo.png"
+    Image.fromarray(rgba, mode="RGBA").save(path)
+    return str(path)
+
+
+@pytest.mark.parametrize("opacity", [100, 40])
+@pytest.mark.parametrize("size", [(640, 400), (333, 517)])
+def test_watermark_matches_alpha_composite(logo, opacity, size):
+    w, h = size
+    img = np.random.default_rng(5).integers(0, 256, (h, w, 3), dtype=np.uint8)
+    wm = {"enable_text": True, "enable_logo": True, "text": "© miflon", "text_size_percent": 4,
+          "opacity": opacity, "color": [250, 40, 10], "logo_path": logo, "logo_size_percent": 20}
+    expected = composite_reference(img, wm)
+    out = img.copy()
+    boxes = core.apply_watermark(out, wm)
+    assert boxes
+    assert np.array_equal(out, expected)
+    # Kutuların dışı hiç değişmedi
+    outside = np.ones((h, w), bool)
+    for x1, y1, x2, y2 in boxes:
+        outside[y1:y2, x1:x2] = False
+    assert np.array_equal(out[outside], img[outside])